@@ -50,6 +50,7 @@ setup(
     entry_points={
         'console_scripts': [
             'simcore_analysis = simcore_analysis.simcore_analysis:main',
+            'ot_movie = simcore_analysis.ot_movie:main',
         ],
     }
 )
@@ -2,10 +2,33 @@
 
 """Top-level package for SimcoreAnalysis."""
 
-from . import sc_animation_funcs
-from .sc_seed_data import SeedData
-from .simcore_analysis import run_seed_scan_analysis
+import importlib
 
 __author__ = """Adam Reay Lamson"""
 __email__ = 'adam.lamson@colorado.edu'
 __version__ = '0.1.0'
+
+# Attributes are imported on first access so that importing the package (and
+# running the command line analysis) does not load matplotlib or scipy.
+_LAZY_ATTRS = {
+    'sc_animation_funcs': ('.sc_animation_funcs', None),
+    'SeedData': ('.sc_seed_data', 'SeedData'),
+    'SeedViewer': ('.sc_viewer', 'SeedViewer'),
+    'run_seed_scan_analysis': ('.simcore_analysis', 'run_seed_scan_analysis'),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    mod_name, attr = _LAZY_ATTRS[name]
+    value = importlib.import_module(mod_name, __name__)
+    if attr is not None:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
@@ -6,10 +6,25 @@ Author: Adam Lamson
 Email: adam.lamson@colorado.edu
 Description:
 """
+import os
+import json
+import hashlib
+from pathlib import Path
 import numpy as np
 from scipy.special import erf
 from scipy.integrate import quad
 
+# Number of intervals used to tabulate the region 2 integral
+FP_TABLE_SIZE = 4096
+# Gauss-Legendre nodes used to integrate each interval of the table
+FP_GL_ORDER = 16
+# Default location of tabulated solutions shared between runs
+FP_CACHE_DIR = Path(os.environ.get(
+    'SIMCORE_ANALYSIS_CACHE',
+    Path.home() / '.cache' / 'simcore_analysis')) / 'fp_tables'
+# Tables already loaded or computed in this process
+_fp_table_cache = {}
+
 
 def fp_steady_state_antipara(s_i, s_j, y, p_dict):
     L, ks, fs, ko, co, vo, beta = (p_dict['L'], p_dict['ks'], p_dict['fs'], p_dict['ko'],
@@ -47,6 +62,185 @@ def fp_steady_state_antipara(s_i, s_j, y, p_dict):
     return sol
 
 
+def get_apara_consts(p_dict):
+    """!Get constants of the antiparallel solution that do not depend on the
+    separation between filaments.
+
+    @param p_dict: Dictionary of dimensional parameters
+    @return: lo, ls, a
+
+    """
+    lo = 2. * p_dict['vo'] / p_dict['ko']
+    ls = p_dict['fs'] / p_dict['ks']
+    a = p_dict['beta'] * p_dict['ks']
+    return lo, ls, a
+
+
+def hash_fp_table_params(p_dict, n_grid=FP_TABLE_SIZE):
+    """!Hash the parameters the region 2 table depends on.
+
+    @param p_dict: Dictionary of dimensional parameters
+    @param n_grid: Number of intervals in the table
+    @return: Hexadecimal hash string
+
+    """
+    keys = ['L', 'ks', 'fs', 'ko', 'vo', 'beta']
+    h_dict = {k: float(p_dict[k]) for k in keys}
+    h_dict['n_grid'] = int(n_grid)
+    return hashlib.sha1(json.dumps(h_dict, sort_keys=True).encode()).hexdigest()
+
+
+def make_fp_region_2_table(p_dict, n_grid=FP_TABLE_SIZE):
+    """!Tabulate the integral in region 2 of the antiparallel solution,
+    I(z) = int_0^z (ls - x)^(-ls/lo) exp(-a x^2 / 2) dx, on a uniform grid.
+    Each interval is integrated with Gauss-Legendre quadrature so only the
+    interval touching the singularity at ls needs adaptive quadrature.
+
+    If ls/lo < 1, I(z) is finite everywhere and is tabulated directly.
+    Otherwise I(z) diverges at ls and J(z) = (ls - z)^(ls/lo - 1) I(z) is
+    tabulated instead. J is accumulated with a recursion that only uses
+    ratios smaller than one, so large exponents cannot overflow.
+
+    @param p_dict: Dictionary of dimensional parameters
+    @param n_grid: Number of intervals in the table
+    @return: z_arr, tab_arr (I(z) if ls/lo < 1 else J(z))
+
+    """
+    L = p_dict['L']
+    lo, ls, a = get_apara_consts(p_dict)
+    p = ls / lo
+    # Heads can be at most L apart so xi never exceeds L
+    z_max = min(ls, L)
+    z_arr = np.linspace(0, z_max, n_grid + 1)
+    h = z_arr[1] - z_arr[0]
+
+    gl_x, gl_w = np.polynomial.legendre.leggauss(FP_GL_ORDER)
+    x_nodes = z_arr[:-1, None] + .5 * h * (gl_x[None, :] + 1.)
+
+    if p < 1.:
+        def integrand(x):
+            return np.power(ls - x, -p) * np.exp(-.5 * a * x * x)
+        pieces = .5 * h * np.dot(integrand(x_nodes), gl_w)
+        if z_max == ls:
+            # Last interval ends on an integrable singularity
+            pieces[-1] = quad(integrand, z_arr[-2], z_arr[-1])[0]
+        tab_arr = np.zeros(z_arr.size)
+        tab_arr[1:] = np.cumsum(pieces)
+        return z_arr, tab_arr
+
+    # J(z_k+1) = r_k^(p-1) J(z_k) + int_{z_k}^{z_k+1}
+    #            ((ls - z_k+1) / (ls - x))^(p-1) exp(-a x^2 / 2) / (ls - x) dx
+    # with r_k = (ls - z_k+1) / (ls - z_k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (ls - z_arr[1:, None]) / (ls - x_nodes)
+        pieces = .5 * h * np.dot(np.power(ratio, p - 1.)
+                                 * np.exp(-.5 * a * x_nodes * x_nodes)
+                                 / (ls - x_nodes), gl_w)
+        r_arr = np.power((ls - z_arr[1:]) / (ls - z_arr[:-1]), p - 1.)
+    tab_arr = np.zeros(z_arr.size)
+    for k in range(n_grid):
+        tab_arr[k + 1] = r_arr[k] * tab_arr[k] + pieces[k]
+    if z_max == ls:
+        # Limit of J as z -> ls
+        tab_arr[-1] = (np.exp(-.5 * a * ls * ls) / (p - 1.)
+                       if p > 1. else np.inf)
+    return z_arr, tab_arr
+
+
+def get_fp_region_2_table(p_dict, n_grid=FP_TABLE_SIZE, cache_dir=None):
+    """!Get the region 2 table from memory, the on-disk cache, or compute and
+    store it.
+
+    @param p_dict: Dictionary of dimensional parameters
+    @param n_grid: Number of intervals in the table
+    @param cache_dir: Directory of cached tables. Uses FP_CACHE_DIR if None and
+                      does not touch the disk if False.
+    @return: z_arr, tab_arr (see make_fp_region_2_table)
+
+    """
+    key = hash_fp_table_params(p_dict, n_grid)
+    if key in _fp_table_cache:
+        return _fp_table_cache[key]
+
+    if cache_dir is None:
+        cache_dir = FP_CACHE_DIR
+    table_path = (Path(cache_dir) / 'fp_table_{}.npz'.format(key)
+                  if cache_dir is not False else None)
+
+    table = None
+    if table_path is not None and table_path.exists():
+        try:
+            with np.load(table_path) as npz:
+                table = (npz['z_arr'], npz['tab_arr'])
+        except (OSError, ValueError, KeyError):
+            print("!!! Could not read cached table {} !!!".format(table_path))
+    if table is None:
+        table = make_fp_region_2_table(p_dict, n_grid)
+        if table_path is not None:
+            try:
+                table_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a unique name and rename so concurrent processes
+                # never read a partially written table.
+                tmp_path = table_path.with_name(
+                    '{}.{}.tmp.npz'.format(table_path.stem, os.getpid()))
+                np.savez(tmp_path, z_arr=table[0], tab_arr=table[1])
+                os.replace(tmp_path, table_path)
+            except OSError:
+                print("!!! Could not cache table {} !!!".format(table_path))
+
+    _fp_table_cache[key] = table
+    return table
+
+
+def fp_steady_state_antipara_tab(s_i, s_j, y, p_dict,
+                                 n_grid=FP_TABLE_SIZE, cache_dir=None):
+    """!Evaluate the antiparallel steady-state solution using a tabulated
+    region 2 integral. Gives the same result as fp_steady_state_antipara up to
+    the interpolation error of the table.
+
+    @param s_i: Head positions on filament i
+    @param s_j: Head positions on filament j
+    @param y: Perpendicular separation of filaments
+    @param p_dict: Dictionary of dimensional parameters
+    @param n_grid: Number of intervals in the table
+    @param cache_dir: Directory of cached tables (see get_fp_region_2_table)
+    @return: Solution array with the broadcast shape of s_i and s_j
+
+    """
+    L, co = p_dict['L'], p_dict['co']
+    lo, ls, a = get_apara_consts(p_dict)
+    p = ls / lo
+    alpha = co * np.exp(-.5 * a * y * y) / lo
+    xi = np.asarray(s_i + s_j, dtype=np.double)
+    sol = np.zeros(xi.shape)
+
+    erf_fact = 1. / (lo * np.sqrt(2. * a))
+    erf_low = erf((-a * lo * L - 1.) * erf_fact)
+    pre_fact_1 = alpha * np.sqrt(.5 * np.pi / a) * np.exp(.5 / (a * lo * lo))
+    psi_0 = pre_fact_1 * (erf(-erf_fact) - erf_low)
+
+    reg_1 = xi <= 0
+    z = xi[reg_1]
+    sol[reg_1] = (pre_fact_1 * np.exp(-z / lo)
+                  * (erf((a * lo * z - 1.) * erf_fact) - erf_low))
+
+    reg_2 = (0 < xi) & (xi <= ls)
+    if np.any(reg_2):
+        z_arr, tab_arr = get_fp_region_2_table(p_dict, n_grid, cache_dir)
+        z = xi[reg_2]
+        if p < 1.:
+            j_arr = np.power(ls - z, p - 1.) * np.interp(z, z_arr, tab_arr)
+        else:
+            j_arr = np.interp(z, z_arr, tab_arr)
+        sol[reg_2] = (alpha * ls * j_arr
+                      + np.power(1. - (z / ls), p - 1.) * psi_0)
+
+    reg_3 = ls < xi
+    z = xi[reg_3]
+    sol[reg_3] = co * np.exp(-.5 * a * (z * z + y * y))
+    return sol
+
+
 ##########################################
 if __name__ == "__main__":
     print("Not implemented yet")
@@ -2,29 +2,121 @@
 
 import sys
 import re
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from pathlib import Path
 # Analysis
 # import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 # from math import *
 # from spindle_unit_dict import SpindleUnitDict
-# Image stuff
-import cv2
 """@package docstring
 File: ot_movie.py
 Author: Adam Lamson
 Email: adam.lamson@colorado.edu
-Description:
+Description: Assemble frame images written by a simulation into a movie.
+Frames are sorted by frame number, decoded and resized in a thread pool with
+bounded read-ahead and encoded in order by a single writer thread.
 """
 
+try:
+    from .sc_video import VideoSink
+except ImportError:
+    # Run as a script, python ot_movie.py, sc_video sits next to this file
+    from sc_video import VideoSink
+
+
+def get_frame_number(frame_path):
+    """!Get the frame number of a frame image, the last number in its name
+
+    @param frame_path: Path of the frame image
+    @return: Frame number, or -1 if the name has no number
+
+    """
+    nums = re.findall(r'\d+', Path(frame_path).stem)
+    return int(nums[-1]) if nums else -1
+
+
+def get_sorted_frames(frame_dir, pattern='*.bmp', start=None, stop=None,
+                      step=1):
+    """!List the frame images of a directory in frame number order
+
+    @param frame_dir: Directory of frame images
+    @param pattern: Glob pattern of frame images
+    @param start: Smallest frame number to include
+    @param stop: Frame number to stop before
+    @param step: Take every step-th of the remaining frames
+    @return: List of (frame number, path)
+
+    """
+    frames = sorted((get_frame_number(f), f)
+                    for f in Path(frame_dir).glob(pattern))
+    frames = [(n, f) for n, f in frames
+              if (start is None or n >= start) and (stop is None or n < stop)]
+    return frames[::step]
+
+
+def read_frame(frame_path, size=None):
+    """!Decode a frame image, resized if it does not match the movie size
+
+    @param frame_path: Path of the frame image
+    @param size: (width, height) of the movie, or None to keep the size
+    @return: BGR image array
+
+    """
+    import cv2
+    img = cv2.imread(str(frame_path))
+    if img is None:
+        raise IOError("Could not read frame image {}".format(frame_path))
+    if size is not None and (img.shape[1], img.shape[0]) != tuple(size):
+        img = cv2.resize(img, tuple(size))
+    return img
+
+
+def write_frames(sink, frame_queue, errors):
+    """!Encode images from a queue until None is received. Runs in the writer
+    thread. After an error the queue is still drained so readers never block.
+
+    @param sink: VideoSink of the movie
+    @param frame_queue: Queue of images in movie order
+    @param errors: List the first error is appended to
+    @return: void
+
+    """
+    while True:
+        img = frame_queue.get()
+        if img is None:
+            return
+        if errors:
+            continue
+        try:
+            sink.write(img)
+        except BaseException as err:
+            errors.append(err)
+
 
 def make_generic_movie(work_dir, frame_dir='images/', name='ot_movie.mp4',
-                       fps=60.0,):
+                       fps=60.0, start=None, stop=None, step=1,
+                       n_threads=4, read_ahead=16, backend='cv2'):
+    """!Make a movie from the frame images in a directory
 
-    fps = float(fps)
+    @param work_dir: Directory to write the movie in
+    @param frame_dir: Directory of frame images relative to work_dir
+    @param name: Name of the movie
+    @param fps: Frame rate of the movie
+    @param start: Smallest frame number to include
+    @param stop: Frame number to stop before
+    @param step: Take every step-th frame
+    @param n_threads: Number of threads decoding frames
+    @param read_ahead: Number of frames decoded ahead of the writer
+    @param backend: VideoSink backend, 'cv2' or 'ffmpeg'
+    @return: Number of frames written
+
+    """
+    fps = float(fps)  # must be a float
     # uc = SpindleUnitDict()
 
     work_dir = Path(work_dir)
@@ -35,48 +127,78 @@ def make_generic_movie(work_dir, frame_dir='images/', name='ot_movie.mp4',
     if mov_path.exists():
         mov_path.unlink()
 
-    # Get necessary directory path names
-    frame_dir = work_dir / frame_dir
-
-    # Format for video
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-
-    # Make list of all the frames in the frame directory
-    frame_list = [
-        f for f in frame_dir.glob('*.bmp')]
-    frame_num_list = [int(re.findall(r'\d+', str(f))[0]) for f in frame_list]
-    # Make sure frame list is properly sorted based on frame number
-
-    vid = None
-    size = None
-    fps = 60.0  # must be a float
-
-    for f, n in zip(frame_list, frame_num_list):
-        img = cv2.imread(str(frame_dir / f))
-        # Find the size of these frames if not defined
-        if size is None:
-            size = img.shape[1], img.shape[0]
-        # Resize image to correct size if size was defined
-        elif size[0] != img.shape[1] and size[1] != img.shape[0]:
-            img = cv2.resize(img, size)
-
-        # Initialize video writer at the beginning
-        if vid is None:
-            vid = cv2.VideoWriter(
-                str(mov_path),
-                1900,
-                fourcc=fourcc,
-                fps=fps,
-                frameSize=list(size))
-        print("-- Frame number: {} --".format(n))
-        # num += 1
-        vid.write(img)
-    return vid
+    # Make list of all the frames in the frame directory sorted by number
+    frame_list = get_sorted_frames(work_dir / frame_dir, start=start,
+                                   stop=stop, step=step)
+    if not frame_list:
+        print("!!! No frames found in {} !!!".format(work_dir / frame_dir))
+        return 0
+
+    # The first frame sets the size of the movie
+    first = read_frame(frame_list[0][1])
+    size = first.shape[1], first.shape[0]
+
+    frame_queue = queue.Queue(maxsize=read_ahead)
+    errors = []
+    with VideoSink(mov_path, size, fps, backend=backend,
+                   codec='mp4v' if backend == 'cv2' else 'libx264',
+                   pix_fmt='bgr24') as sink:
+        writer = threading.Thread(target=write_frames,
+                                  args=(sink, frame_queue, errors))
+        writer.start()
+        try:
+            frame_queue.put(first)
+            with ThreadPoolExecutor(n_threads) as executor:
+                pending = deque()
+                for _, frame_path in frame_list[1:]:
+                    pending.append(executor.submit(read_frame, frame_path,
+                                                   size))
+                    if len(pending) >= read_ahead:
+                        frame_queue.put(pending.popleft().result())
+                while pending:
+                    frame_queue.put(pending.popleft().result())
+        finally:
+            frame_queue.put(None)
+            writer.join()
+        if errors:
+            raise errors[0]
+    print("Wrote {} frames ({} to {}) to {}".format(
+        len(frame_list), frame_list[0][0], frame_list[-1][0], mov_path))
+    return len(frame_list)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog='ot_movie.py')
+    parser.add_argument("frame_dir", nargs='?', default='images/',
+                        help="Directory of frame images.")
+    parser.add_argument("-o", "--name", default='ot_movie.mp4',
+                        help="Name of the movie.")
+    parser.add_argument("--fps", type=float, default=60.,
+                        help="Frame rate of the movie.")
+    parser.add_argument("--start", type=int, default=None,
+                        help="Smallest frame number to include.")
+    parser.add_argument("--stop", type=int, default=None,
+                        help="Frame number to stop before.")
+    parser.add_argument("--step", type=int, default=1,
+                        help="Take every step-th frame.")
+    parser.add_argument("-n", "--n_threads", type=int, default=4,
+                        help="Number of threads decoding frames.")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """!Make a movie of the frame images named on the command line
+
+    @param args: Command line arguments, defaults to sys.argv
+    @return: Exit status, 1 if there were no frames
+
+    """
+    opts = parse_args(args)
+    return int(make_generic_movie(Path.cwd(), opts.frame_dir, opts.name,
+                                  opts.fps, opts.start, opts.stop, opts.step,
+                                  opts.n_threads) == 0)
 
 
 ##########################################
 if __name__ == "__main__":
-    if len(sys.argv) == 1:
-        make_generic_movie(Path.cwd())
-    elif len(sys.argv) == 2:
-        make_generic_movie(Path.cwd(), sys.argv[1])
+    sys.exit(main())
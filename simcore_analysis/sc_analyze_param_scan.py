@@ -7,46 +7,135 @@ Email: adam.lamson@colorado.edu
 Description:
 """
 
+import os
 from pathlib import Path
+from multiprocessing import Pool
 import numpy as np
-import yaml
 import h5py
 
+from .sc_helpers import nm, make_pde_dict_from_sc_h5
+from .sc_param_index import ParamIndex, get_param_key
+from .sc_analyze_run import analyze_run
+from .sc_analyze_seed_scan import get_ss_distr_error, is_stationary_antipara
 
-def get_param_from_dict(h5_data, param, spec=None):
-    """!TODO: Docstring for get_param_from_dict.
+# Columns of the error table written by analyze_param_scan_error
+SS_ERROR_DT = np.dtype([('param_value', np.double),
+                        ('error', np.double),
+                        ('sol_sem', np.double),
+                        ('n_seeds', np.int32),
+                        ('steady_state_time', np.double),
+                        ('valid', np.bool_),
+                        ('y', np.double),
+                        ('L', np.double),
+                        ('ks', np.double),
+                        ('fs', np.double),
+                        ('ko', np.double),
+                        ('co', np.double),
+                        ('vo', np.double),
+                        ])
 
-    @param param: TODO
-    @return: TODO
+
+def analyze_param_scan(sim_dir_path, param, spec=None, out_path=None,
+                       n_procs=None):
+    """!Reduce all seed scan files of a parameter scan into one run file.
+
+    @param sim_dir_path: Directory holding the parameter directories
+    @param param: Name of the scanned parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @param out_path: Path of the run file. Defaults to <current dir name>.h5
+    @param n_procs: Number of worker processes. Defaults to the cpu count.
+    @return: Dictionary of summary columns
 
     """
-    if spec is None:
-        return h5_data.attrs[param]
-    else:
-        param_dict = yaml.safe_load(h5_data.attrs['param_file'])
-        # A little cludgy because you only check the parameters of the first
-        # in the list in a given species.
-        return param_dict[spec][0][param]
+    h5_path_lst = get_scan_files(ParamIndex(sim_dir_path), param, spec)
+    return analyze_run(h5_path_lst, param, spec, out_path, n_procs)
+
 
+def get_scan_files(index, param, spec=None):
+    """!Get the seed scan files of a parameter scan that set the scanned
+    parameter, sorted by its value. Files that do not set it are skipped.
 
-def collect_param_h5_files(dir_path, param, spec=None):
-    """ Spider through directory structure to collect and put h5 files in a list"""
-    h5_data_lst = sorted([h5py.File(hf, 'r+')
-                          for hf in dir_path.glob('*/*.h5')],
-                         key=lambda x: get_param_from_dict(x, param, spec))
-    return h5_data_lst
+    @param index: ParamIndex of the parameter scan
+    @param param: Name of the scanned parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @return: List of paths sorted by parameter value
+
+    """
+    h5_path_lst = index.filter(param, lambda val: True, spec)
+    n_skipped = len(index.paths) - len(h5_path_lst)
+    if n_skipped:
+        print("!!! Skipping {} files that do not set {} !!!".format(
+            n_skipped, get_param_key(param, spec)))
+    return index.sort(param, spec, h5_path_lst)
 
 
-def analyze_param_scan(sim_dir_path, param, spec=None):
-    """!TODO: Docstring for analyze_run.
+def get_ss_error_row(args):
+    """!Get one row of the error table from a seed scan file. Opens the file
+    read only so it can run in a worker process.
 
-    @param sim_dir_path: TODO
-    @param param: TODO
-    @return: TODO
+    @param args: (path to seed scan h5 file, value of the scanned parameter)
+    @return: Row of the error table as a tuple with SS_ERROR_DT fields
 
     """
-    h5_data_lst = collect_param_h5_files(sim_dir_path, param, spec=None)
-    pass
+    h5_path, param_value = args
+    param_value = float(param_value)
+    with h5py.File(h5_path, 'r') as h5_scan:
+        n_seeds = h5_scan.attrs['n_seeds']
+        p_dict = make_pde_dict_from_sc_h5(h5_scan)
+        y = h5_scan['filament_data/fil_avg_sep_mean'][-1, 2] * nm
+        p_vals = (y, p_dict['L'], p_dict['ks'], p_dict['fs'], p_dict['ko'],
+                  p_dict['co'], p_dict['vo'])
+        if 'average_steady_state_doubly_bound_distr_mean' not in h5_scan:
+            return (param_value, np.nan, np.nan, n_seeds, np.nan,
+                    False) + p_vals
+        error, sol_sem = get_ss_distr_error(h5_scan)
+        return (param_value, error, sol_sem, n_seeds,
+                h5_scan.attrs['steady_state_time'],
+                is_stationary_antipara(h5_scan)) + p_vals
+
+
+def analyze_param_scan_error(sim_dir_path, param, spec=None,
+                             out_path=None, n_procs=None):
+    """!Compare the mean steady state distribution of every parameter point
+    in a scan to the analytic solution. Points are evaluated in parallel and
+    the results are written as a tidy csv table sorted by parameter value.
+    Points whose geometry does not match the analytic solution are still
+    evaluated but are marked as not valid.
+
+    @param sim_dir_path: Directory holding the parameter directories
+    @param param: Name of the scanned parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @param out_path: Path of the csv table. Defaults to ss_distr_error.csv in
+                     the current directory. No file is written if False.
+    @param n_procs: Number of worker processes. Defaults to the cpu count.
+    @return: Structured array of the table with SS_ERROR_DT fields
+
+    """
+    # Parameter values come from the cached index instead of each file
+    index = ParamIndex(sim_dir_path)
+    args_lst = [(hp, index.get(hp, param, spec))
+                for hp in get_scan_files(index, param, spec)]
+    if n_procs is None:
+        n_procs = os.cpu_count()
+    n_procs = max(1, min(n_procs, len(args_lst)))
+
+    if n_procs == 1:
+        rows = [get_ss_error_row(args) for args in args_lst]
+    else:
+        with Pool(n_procs) as pool:
+            rows = pool.map(get_ss_error_row, args_lst)
+
+    error_arr = np.asarray(rows, dtype=SS_ERROR_DT)
+
+    if out_path is None:
+        out_path = Path('ss_distr_error.csv')
+    if out_path is not False:
+        np.savetxt(out_path, error_arr, delimiter=',',
+                   header=','.join(SS_ERROR_DT.names), comments='',
+                   fmt=['%.8g', '%.8g', '%.8g', '%d', '%.8g', '%d',
+                        '%.8g', '%.8g', '%.8g', '%.8g', '%.8g', '%.8g',
+                        '%.8g'])
+    return error_arr
 
 
 ##########################################
@@ -7,21 +7,134 @@ Email: adam.lamson@colorado.edu
 Description:
 """
 
+import os
 from pathlib import Path
+from multiprocessing import Pool
 import numpy as np
-import yaml
 import h5py
 
+from .sc_helpers import get_param_from_dict
+from .sc_profile import profile_stage
 
-def analyze_run(h5_data_list, param, spec):
-    """!TODO: Docstring for analyze_run.
 
-    @param sim_dir_path: TODO
-    @param param: TODO
-    @return: TODO
+def seed_ss_avg(h5_scan, seed_dset_path, mean_dset_path, start_ind):
+    """!Average a time series over the steady state of every seed and return
+    the mean and standard deviation over seeds. Falls back to the seed
+    averaged time series, with a nan standard deviation, if per-seed data is
+    not linked in the seed scan.
+
+    @param h5_scan: Seed scan h5 file
+    @param seed_dset_path: Path of the per-seed virtual dataset
+    @param mean_dset_path: Path of the seed averaged dataset
+    @param start_ind: Index of the first steady state frame
+    @return: mean, std
+
+    """
+    if seed_dset_path in h5_scan:
+        seed_avg = np.nanmean(h5_scan[seed_dset_path][:, start_ind:], axis=1)
+        return seed_avg.mean(axis=0), seed_avg.std(axis=0)
+    mean = h5_scan[mean_dset_path][start_ind:].mean(axis=0)
+    return mean, np.full(np.shape(mean), np.nan)
+
+
+def get_run_summary(args):
+    """!Reduce a seed scan file to the summary values stored in the run file.
+    Opens the file read only so it can run in a worker process.
+
+    @param args: (path to seed scan h5 file, param, spec)
+    @return: Dictionary of summary values
+
+    """
+    h5_path, param, spec = args
+    summary = {}
+    with h5py.File(h5_path, 'r') as h5_scan:
+        summary['param_value'] = float(
+            get_param_from_dict(h5_scan, param, spec))
+        summary['n_seeds'] = h5_scan.attrs['n_seeds']
+        start_ind = int(h5_scan.attrs.get('steady_state_ind', 0))
+        time = h5_scan['time'][...]
+        summary['steady_state_time'] = time[start_ind]
+
+        # Steady state force and moments
+        for name, seed_path, mean_path in [
+                ('xl_force', 'seed_data/xl_forces', 'xl_forces_mean'),
+                ('zeroth_moment', 'seed_data/xl_zeroth_moment',
+                 'xl_data/zeroth_moment_mean'),
+                ('first_moments', 'seed_data/xl_first_moments',
+                 'xl_data/first_moments_mean'),
+                ('second_moments', 'seed_data/xl_second_moments',
+                 'xl_data/second_moments_mean')]:
+            (summary[name + '_mean'],
+             summary[name + '_std']) = seed_ss_avg(h5_scan, seed_path,
+                                                   mean_path, start_ind)
+
+        # Work rates are the work done on each filament per unit time
+        ss_duration = time[-1] - time[start_ind]
+        for name, mean_path in [('lin_work_rate', 'xl_lin_work_mean'),
+                                ('rot_work_rate', 'xl_rot_work_mean')]:
+            work = h5_scan[mean_path][start_ind + 1:].sum(axis=0)
+            summary[name] = (work / ss_duration if ss_duration > 0
+                             else np.full(np.shape(work), np.nan))
+
+        # Error metrics
+        summary['error'] = h5_scan.attrs.get('error', np.nan)
+        summary['sol_sem'] = h5_scan.attrs.get('sol_sem', np.nan)
+
+        # Cpu time
+        time_attrs = (h5_scan['time_analysis'].attrs
+                      if 'time_analysis' in h5_scan else {})
+        for key in ['cpu_time_mean', 'cpu_time_std',
+                    'steps_per_cpu_sec_mean', 'frames_per_cpu_sec_mean']:
+            summary[key] = time_attrs.get(key, np.nan)
+    return summary
+
+
+@profile_stage()
+def analyze_run(h5_data_lst, param, spec=None, out_path=None, n_procs=None):
+    """!Reduce the seed scan files of every parameter point in parallel and
+    write the results into one columnar run file. Each summary value is a
+    dataset with the parameter points along the first axis, sorted by
+    parameter value.
+
+    @param h5_data_lst: List of seed scan h5 files or paths to them
+    @param param: Name of the scanned parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @param out_path: Path of the run file. Defaults to <current dir name>.h5
+    @param n_procs: Number of worker processes. Defaults to the cpu count.
+    @return: Dictionary of summary columns
 
     """
-    pass
+    h5_path_lst = [Path(h5d.filename) if isinstance(h5d, h5py.File)
+                   else Path(h5d) for h5d in h5_data_lst]
+    if len(h5_path_lst) == 0:
+        print("No seed scan files to analyze.")
+        return {}
+    args_lst = [(hp, param, spec) for hp in h5_path_lst]
+    if n_procs is None:
+        n_procs = os.cpu_count()
+    n_procs = max(1, min(n_procs, len(args_lst)))
+
+    if n_procs == 1:
+        summary_lst = [get_run_summary(args) for args in args_lst]
+    else:
+        with Pool(n_procs) as pool:
+            summary_lst = pool.map(get_run_summary, args_lst)
+
+    order = np.argsort([smry['param_value'] for smry in summary_lst])
+    columns = {key: np.asarray([summary_lst[i][key] for i in order])
+               for key in summary_lst[0]}
+
+    if out_path is None:
+        out_path = Path('{}.h5'.format(Path.cwd().name))
+    with h5py.File(out_path, 'w') as h5_out:
+        h5_out.attrs['param'] = param
+        h5_out.attrs['spec'] = spec if spec is not None else ''
+        h5_out.attrs['n_params'] = len(summary_lst)
+        h5_out.create_dataset('param_dirs', data=[
+            str(h5_path_lst[i].parent) for i in order])
+        for key, col in columns.items():
+            h5_out.create_dataset(key, data=col)
+    return columns
 
 
 ##########################################
@@ -9,6 +9,8 @@ Description:
 import numpy as np
 from pathlib import Path
 
+from .sc_profile import PROFILER, profile_stage
+
 
 def normalize(vec):
     """!TODO: Docstring for normalize.
@@ -52,10 +54,13 @@ def xl_zrl_stretch(r_i, r_j, u_i, u_j, s_i, s_j):
     return np.linalg.norm(r_j + (u_j * s_j) - r_i - (u_i * s_i))
 
 
+@profile_stage()
 def analyze_seed(h5_data):
     if 'analysis' in h5_data:
         del h5_data['analysis']  # Start clean
     h5_data.create_group('analysis')
+    if 'xl_data/time' in h5_data:
+        PROFILER.add_frames(h5_data['xl_data/time'].size)
     # analyze xlinks
     analyze_singly_bound_xlinks(h5_data)
     analyze_xlink_moments(h5_data)
@@ -67,6 +72,7 @@ def analyze_seed(h5_data):
     # analyze filaments (maybe)
 
 
+@profile_stage()
 def analyze_xlink_moments(h5_data):
     anal_grp = h5_data['analysis']
     dbl_xlink_dset = h5_data['xl_data/doubly_bound']
@@ -87,6 +93,7 @@ def analyze_xlink_moments(h5_data):
     anal_grp.create_dataset('xl_second_moments', data=xl_second_mom_arr.T)
 
 
+@profile_stage()
 def analyze_singly_bound_xlinks(h5_data):
     """!TODO: Docstring for analyze_singly_bound_xlink_num.
 
@@ -120,6 +127,7 @@ def analyze_singly_bound_xlinks(h5_data):
     xl_sgl_distr_dset.attrs['bin_edges'] = bin_edges
 
 
+@profile_stage()
 def analyze_avg_xlink_distr(h5_data):
     """!TODO: Docstring for analyze_average_xlink_distr.
 
@@ -149,6 +157,7 @@ def analyze_avg_xlink_distr(h5_data):
     xl_avg_distr_dset.attrs['yedges'] = yedges
 
 
+@profile_stage()
 def analyze_xlink_force(h5_data):
     """!Analyze the force on filament_j by crosslinkers attached to filament_i
 
@@ -182,6 +191,7 @@ def analyze_xlink_force(h5_data):
     h5_data['analysis'].create_dataset('xl_torques', data=torque_arr)
 
 
+@profile_stage()
 def analyze_xlink_stretch_distr(h5_data):
     """!TODO: Docstring for analyze_xlink_stretch_distr.
 
@@ -229,6 +239,7 @@ def analyze_xlink_stretch_distr(h5_data):
     h5_data['analysis'].create_dataset('xl_stretch_bin_edges', data=fil_bins)
 
 
+@profile_stage()
 def analyze_xlink_work(h5_data):
     """!TODO: Docstring for analyze_xlink_work.
 
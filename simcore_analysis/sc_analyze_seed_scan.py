@@ -6,21 +6,40 @@ Author: Adam Lamson
 Email: adam.lamson@colorado.edu
 Description:
 """
+import os
 from pathlib import Path
 import numpy as np
 import yaml
 import h5py
 
-from .sc_helpers import find_start_time, nm, make_pde_dict_from_sc_h5
+from .sc_helpers import nm, make_pde_dict_from_sc_h5
 from .sc_analyze_seed import flatten_dset
-from .fp_steady_state import fp_steady_state_antipara
+from .sc_equilibration import find_seed_equilibration_index
+from .fp_steady_state import fp_steady_state_antipara_tab
+from .sc_profile import PROFILER, profile_stage
+from .sc_lazy import ARRAY_BACKEND, stack_seed_dsets, compute
+from .sc_prefetch import Prefetcher
+
+# Per-seed datasets exposed in seed scan files as virtual datasets stacked
+# along a leading seed axis.
+SEED_VDS_PATHS = ['analysis/xl_forces',
+                  'analysis/xl_torques',
+                  'analysis/xl_zeroth_moment',
+                  'analysis/xl_first_moments',
+                  'analysis/xl_second_moments',
+                  'analysis/xl_linear_work',
+                  'analysis/xl_rotational_work',
+                  'analysis/singly_bound_number',
+                  'filament_data/filament_position',
+                  'filament_data/filament_orientation',
+                  ]
 
 
 def collect_seed_h5_files(dir_path):
     """ Spider through directory structure to collect and put h5 files in a list"""
     h5_data_lst = []
     for hf in dir_path.glob('[!.]*/*.h5'):
-        h5d = h5py.File(hf, 'r+')
+        h5d = h5py.File(hf, 'r')
         if 'seed' not in h5d.attrs:
             print("!!! {} does not have seed attribute.", hf)
         else:
@@ -33,6 +52,7 @@ def collect_seed_h5_files(dir_path):
     return h5_data_lst
 
 
+@profile_stage()
 def analyze_seed_scan(h5_out, h5_data_lst):
     """!TODO: Docstring for analyze_seed_scan_data.
 
@@ -53,6 +73,10 @@ def analyze_seed_scan(h5_out, h5_data_lst):
     for key, val in h5_data_lst[0]['filament_data'].attrs.items():
         fil_grp.attrs[key] = val
     h5_out.create_dataset('time', data=h5_data_lst[0]['xl_data/time'][...])
+    PROFILER.add_frames(h5_out['time'].size * len(h5_data_lst))
+
+    # Link per-seed data without copying it
+    make_seed_virtual_dsets(h5_out, h5_data_lst)
 
     # analyze forces and torques
     analyze_avg_forces(h5_out, h5_data_lst)
@@ -69,16 +93,129 @@ def analyze_seed_scan(h5_out, h5_data_lst):
     analyze_avg_fil_ang(fil_grp, h5_data_lst)
 
     # Check if you can perform error analysis on code
-    if (fil_grp.attrs['stationary_flag'] and
-        (np.absolute(fil_grp['fil_avg_sep_mean'][-1, 2]) ==
-         np.linalg.norm(fil_grp['fil_avg_sep_mean'][-1, :])) and
-            np.isclose(np.absolute(fil_grp['fil_avg_theta_mean'][-1]), np.pi)):
+    if is_stationary_antipara(h5_out):
         analyze_ss_distr_error(h5_out)
 
     # Analyze cpu times
     analyze_avg_cpu_time(h5_out, h5_data_lst)
 
 
+@profile_stage()
+def make_seed_virtual_dsets(h5_out, h5_data_lst, dset_paths=None):
+    """!Create virtual datasets in the seed_data group of h5_out that stack a
+    per-seed dataset of every seed along a new leading axis. No data is
+    copied, HDF5 reads from the seed files on access. Source files are stored
+    relative to h5_out so the simulation tree can be moved. Seeds with fewer
+    frames are padded with the fill value.
+
+    @param h5_out: Seed scan h5 file
+    @param h5_data_lst: List of seed h5 files sorted by seed
+    @param dset_paths: Paths of datasets in seed files. Defaults to
+                       SEED_VDS_PATHS.
+    @return: seed_data group
+
+    """
+    if dset_paths is None:
+        dset_paths = SEED_VDS_PATHS
+    vds_grp = h5_out.create_group('seed_data')
+    vds_grp.create_dataset('seeds',
+                           data=[h5d.attrs['seed'] for h5d in h5_data_lst])
+    out_dir = Path(h5_out.filename).resolve().parent
+    src_files = [os.path.relpath(Path(h5d.filename).resolve(), out_dir)
+                 for h5d in h5_data_lst]
+    vds_grp.attrs['source_files'] = src_files
+
+    for dset_path in dset_paths:
+        if not all(dset_path in h5d for h5d in h5_data_lst):
+            print("!!! {} missing from some seeds, skipping virtual "
+                  "dataset !!!".format(dset_path))
+            continue
+        dset_lst = [h5d[dset_path] for h5d in h5_data_lst]
+        max_frames = max(dset.shape[0] for dset in dset_lst)
+        layout = h5py.VirtualLayout(
+            shape=(len(dset_lst), max_frames) + dset_lst[0].shape[1:],
+            dtype=dset_lst[0].dtype)
+        for i, (dset, src) in enumerate(zip(dset_lst, src_files)):
+            layout[i, :dset.shape[0]] = h5py.VirtualSource(
+                src, dset_path, shape=dset.shape, dtype=dset.dtype)
+        fill = np.nan if np.issubdtype(dset_lst[0].dtype, np.floating) else 0
+        vds_grp.create_virtual_dataset(dset_path.split('/')[-1], layout,
+                                       fillvalue=fill)
+    return vds_grp
+
+
+def load_seed_dsets(args):
+    """!Load datasets of a seed
+
+    @param args: (path to seed h5 file, list of dataset paths)
+    @return: List of arrays
+
+    """
+    h5_path, dset_paths = args
+    with h5py.File(h5_path, 'r') as h5_data:
+        return [h5_data[dset_path][...] for dset_path in dset_paths]
+
+
+def seed_dsets_mean_std(h5_data_lst, dset_paths, func=None):
+    """!Mean and standard deviation over seeds of per-seed datasets. Seeds are
+    read through a Prefetcher and accumulated one at a time while the next
+    seeds load. With the lazy array backend dask reads and reduces them
+    instead.
+
+    @param h5_data_lst: List of seed h5 files
+    @param dset_paths: Paths of datasets in each seed file
+    @param func: Function applied to the list of arrays of each seed before
+                 averaging, or to the stacked arrays with the lazy backend.
+                 Must return a list of arrays.
+    @return: List of (mean, std) for each dataset, or each array func returns
+
+    """
+    if ARRAY_BACKEND['lazy']:
+        arrs = [stack_seed_dsets(h5_data_lst, dset_path)
+                for dset_path in dset_paths]
+        if func is not None:
+            arrs = func(arrs)
+        # One pass so data shared between datasets is read once
+        stats = compute(*[stat for arr in arrs
+                          for stat in (arr.mean(axis=0), arr.std(axis=0))])
+        return list(zip(stats[::2], stats[1::2]))
+
+    prefetcher = Prefetcher([(h5d.filename, dset_paths)
+                             for h5d in h5_data_lst], load_seed_dsets)
+    # Running mean and sum of squared deviations (Welford)
+    means, sq_devs = None, None
+    for n, (_, arrs) in enumerate(prefetcher, 1):
+        if func is not None:
+            arrs = func(arrs)
+        if means is None:
+            means = [np.zeros(arr.shape) for arr in arrs]
+            sq_devs = [np.zeros(arr.shape) for arr in arrs]
+        for arr, mean, sq_dev in zip(arrs, means, sq_devs):
+            delta = arr - mean
+            mean += delta / n
+            sq_dev += delta * (arr - mean)
+    return [(mean, np.sqrt(sq_dev / len(h5_data_lst)))
+            for mean, sq_dev in zip(means, sq_devs)]
+
+
+def is_stationary_antipara(h5_scan):
+    """!Check if the filaments of a seed scan are stationary, antiparallel and
+    separated only perpendicular to their orientation, i.e. the geometry the
+    analytic steady-state solution is derived for.
+
+    @param h5_scan: Seed scan h5 file
+    @return: True if the analytic solution applies
+
+    """
+    fil_grp = h5_scan['filament_data']
+    return bool(fil_grp.attrs.get('stationary_flag', False) and
+                (np.absolute(fil_grp['fil_avg_sep_mean'][-1, 2]) ==
+                 np.linalg.norm(fil_grp['fil_avg_sep_mean'][-1, :])) and
+                np.isclose(np.absolute(fil_grp['fil_avg_theta_mean'][-1]),
+                           np.pi))
+
+
+@profile_stage()
 def analyze_avg_moments(xl_grp, h5_data_lst):
     """!TODO: Docstring for analyze_avg_moments.
 
@@ -87,44 +224,37 @@ def analyze_avg_moments(xl_grp, h5_data_lst):
     @return: TODO
 
     """
-    # Collect data to analyze by combining all h5 data arrays in a 2D array
-    mu00_arr = np.asarray([h5d['analysis/xl_zeroth_moment'][...]
-                           for h5d in h5_data_lst])
-    mu10_arr = np.asarray([h5d['analysis/xl_first_moments'][:, 0][...]
-                           for h5d in h5_data_lst])
-    mu01_arr = np.asarray([h5d['analysis/xl_first_moments'][:, 1][...]
-                           for h5d in h5_data_lst])
-    mu11_arr = np.asarray([h5d['analysis/xl_second_moments'][:, 0][...]
-                           for h5d in h5_data_lst])
-    mu20_arr = np.asarray([h5d['analysis/xl_second_moments'][:, 1][...]
-                           for h5d in h5_data_lst])
-    mu02_arr = np.asarray([h5d['analysis/xl_second_moments'][:, 2][...]
-                           for h5d in h5_data_lst])
-
-    xl_grp.create_dataset('zeroth_moment_mean', data=mu00_arr.mean(axis=0))
-    xl_grp.create_dataset('zeroth_moment_std', data=mu00_arr.std(axis=0))
-
-    first_mom_mean_arr = np.vstack((mu10_arr.mean(axis=0),
-                                    mu01_arr.mean(axis=0)))
-    first_mom_std_arr = np.vstack((mu10_arr.std(axis=0),
-                                   mu01_arr.std(axis=0)))
+    # Moments stay together so each seed file is read once
+    ((mu00_mean, mu00_std), (first_mom_mean, first_mom_std),
+     (second_mom_mean, second_mom_std)) = seed_dsets_mean_std(
+        h5_data_lst, ['analysis/xl_zeroth_moment', 'analysis/xl_first_moments',
+                      'analysis/xl_second_moments'])
+
+    xl_grp.create_dataset('zeroth_moment_mean', data=mu00_mean)
+    xl_grp.create_dataset('zeroth_moment_std', data=mu00_std)
+
+    first_mom_mean_arr = np.vstack((first_mom_mean[:, 0],
+                                    first_mom_mean[:, 1]))
+    first_mom_std_arr = np.vstack((first_mom_std[:, 0],
+                                   first_mom_std[:, 1]))
     xl_grp.create_dataset(
         'first_moments_mean', data=first_mom_mean_arr.T)
     xl_grp.create_dataset(
         'first_moments_std', data=first_mom_std_arr.T)
 
-    second_mom_mean_arr = np.vstack((mu11_arr.mean(axis=0),
-                                     mu20_arr.mean(axis=0),
-                                     mu02_arr.mean(axis=0)))
-    second_mom_std_arr = np.vstack((mu11_arr.std(axis=0),
-                                    mu20_arr.std(axis=0),
-                                    mu02_arr.std(axis=0)))
+    second_mom_mean_arr = np.vstack((second_mom_mean[:, 0],
+                                     second_mom_mean[:, 1],
+                                     second_mom_mean[:, 2]))
+    second_mom_std_arr = np.vstack((second_mom_std[:, 0],
+                                    second_mom_std[:, 1],
+                                    second_mom_std[:, 2]))
     xl_grp.create_dataset(
         'second_moments_mean', data=second_mom_mean_arr.T)
     xl_grp.create_dataset(
         'second_moments_std', data=second_mom_std_arr.T)
 
 
+@profile_stage()
 def analyze_avg_sgl_distr(xl_grp, h5_data_lst):
     """!TODO: Docstring for analyze_avg_moments.
 
@@ -134,14 +264,9 @@ def analyze_avg_sgl_distr(xl_grp, h5_data_lst):
 
     """
     xl_grp.attrs['sgl_bin_edges'] = h5_data_lst[0]['analysis/singly_bound_distr'].attrs['bin_edges']
-    fil0_sgl_avg_distr = np.asarray([h5d['analysis/singly_bound_distr'][0][...]
-                                     for h5d in h5_data_lst])
-    fil1_sgl_avg_distr = np.asarray([h5d['analysis/singly_bound_distr'][1][...]
-                                     for h5d in h5_data_lst])
-    sgl_avg_distr_mean = np.vstack((fil0_sgl_avg_distr.mean(axis=0),
-                                    fil1_sgl_avg_distr.mean(axis=0)))
-    sgl_avg_distr_std = np.vstack((fil0_sgl_avg_distr.std(axis=0),
-                                   fil1_sgl_avg_distr.std(axis=0)))
+    # Distributions of both filaments are stacked along the second axis
+    [(sgl_avg_distr_mean, sgl_avg_distr_std)] = seed_dsets_mean_std(
+        h5_data_lst, ['analysis/singly_bound_distr'])
 
     xl_grp.create_dataset('average_singly_bound_distr_mean',
                           data=sgl_avg_distr_mean)
@@ -149,6 +274,7 @@ def analyze_avg_sgl_distr(xl_grp, h5_data_lst):
                           data=sgl_avg_distr_std)
 
 
+@profile_stage()
 def analyze_avg_dbl_distr(h5_out, h5_data_lst):
     """!TODO: Docstring for analyze_avg_moments.
 
@@ -161,13 +287,12 @@ def analyze_avg_dbl_distr(h5_out, h5_data_lst):
     xl_grp.attrs['xedges'] = h5_data_lst[0]['analysis/average_doubly_bound_distr'].attrs['xedges']
     xl_grp.attrs['yedges'] = h5_data_lst[0]['analysis/average_doubly_bound_distr'].attrs['yedges']
 
-    # Collect data to analyze by combining all h5 data arrays in a 2D array
-    xl_dbl_distr = np.asarray([h5d['analysis/average_doubly_bound_distr'][...]
-                               for h5d in h5_data_lst])
+    [(xl_dbl_distr_mean, xl_dbl_distr_std)] = seed_dsets_mean_std(
+        h5_data_lst, ['analysis/average_doubly_bound_distr'])
     xl_grp.create_dataset('average_doubly_bound_distr_mean',
-                          data=xl_dbl_distr.mean(axis=0))
+                          data=xl_dbl_distr_mean)
     xl_grp.create_dataset('average_doubly_bound_distr_std',
-                          data=xl_dbl_distr.std(axis=0))
+                          data=xl_dbl_distr_std)
 
     # Get steady state distr from all the runs if filaments are stationary
     if h5_data_lst[0]['filament_data'].attrs.get('stationary_flag', False):
@@ -175,6 +300,24 @@ def analyze_avg_dbl_distr(h5_out, h5_data_lst):
         analyze_avg_dbl_distr_steady_state(h5_out, h5_data_lst)
 
 
+def load_ss_dbl_lambdas(args):
+    """!Load the positions of doubly bound heads of a seed from its first
+    steady state frame on.
+
+    @param args: (path to seed h5 file, index of first steady state frame)
+    @return: (heads on fil_i, heads on fil_j, number of frames)
+
+    """
+    h5_path, start_ind = args
+    with h5py.File(h5_path, 'r') as h5_data:
+        dbl_xlink_dset = h5_data['xl_data/doubly_bound']
+        fil0_lambdas = np.asarray(flatten_dset(dbl_xlink_dset[start_ind:, 0]))
+        fil1_lambdas = np.asarray(flatten_dset(dbl_xlink_dset[start_ind:, 1]))
+        n_frames = dbl_xlink_dset.shape[0] - start_ind
+    return fil0_lambdas, fil1_lambdas, n_frames
+
+
+@profile_stage()
 def analyze_avg_dbl_distr_steady_state(h5_out, h5_data_lst):
     """!Analyze the average of the steady state doubly bound distribution
 
@@ -183,32 +326,40 @@ def analyze_avg_dbl_distr_steady_state(h5_out, h5_data_lst):
     @return: TODO
 
     """
-    # n_seeds = len(h5_data_lst)
     n_seeds = h5_out.attrs['n_seeds']
-    xl_grp = h5_out['xl_data']
-    num_ind = find_start_time(xl_grp['zeroth_moment_mean'][:], 10)
-    force_ind = find_start_time(np.linalg.norm(
-        h5_out['xl_forces_mean'][...], axis=1), 10)
-    start_ind = max(num_ind, force_ind) * 2
+    # Find when each seed equilibrates with respect to both the number of
+    # doubly bound crosslinkers and the magnitude of the crosslinker force.
+    obs_arr = np.asarray(
+        [[h5d['analysis/xl_zeroth_moment'][...],
+          np.linalg.norm(h5d['analysis/xl_forces'][...], axis=1)]
+         for h5d in h5_data_lst])
+    seed_ind_arr, obs_ind_arr = find_seed_equilibration_index(obs_arr)
+    ss_ind_dset = h5_out.create_dataset('steady_state_inds', data=obs_ind_arr)
+    ss_ind_dset.attrs['observables'] = ['xl_zeroth_moment', 'xl_forces_norm']
+    h5_out.create_dataset('seed_steady_state_ind', data=seed_ind_arr)
+    # Latest start over all seeds is used for quantities averaged over seeds
+    start_ind = int(seed_ind_arr.max())
     h5_out.attrs['steady_state_ind'] = start_ind
     h5_out.attrs['steady_state_time'] = h5_out['time'][start_ind]
 
     length = h5_data_lst[0]['filament_data'].attrs['lengths'][0]
-    fil_bins = np.linspace(-.5 * length, .5 * length, length * 25. / 4.)
+    fil_bins = np.linspace(-.5 * length, .5 * length,
+                           int(length * 25. / 4.))
 
     dbl_2d_ss_distr_arr = np.zeros(
         (n_seeds, fil_bins.size - 1, fil_bins.size - 1))
     xedges, yedges = None, None
 
-    for i, h5_data in enumerate(h5_data_lst):
-        dbl_xlink_dset = h5_data['xl_data/doubly_bound']
-        fil0_lambdas = flatten_dset(dbl_xlink_dset[start_ind:, 0])
-        fil1_lambdas = flatten_dset(dbl_xlink_dset[start_ind:, 1])
+    # Read the next seeds while the current one is histogrammed
+    prefetcher = Prefetcher(
+        [(h5d.filename, int(seed_ind_arr[i]))
+         for i, h5d in enumerate(h5_data_lst)], load_ss_dbl_lambdas)
+    for i, (_, (fil0_lambdas, fil1_lambdas, n_frames)) in enumerate(
+            prefetcher):
         dbl_2d_ss_distr_arr[i], xedges, yedges = np.histogram2d(
-            np.asarray(fil0_lambdas), np.asarray(fil1_lambdas), fil_bins)
+            fil0_lambdas, fil1_lambdas, fil_bins)
         ds_i, ds_j = (xedges[1] - xedges[0], yedges[1] - yedges[0])
-        dbl_2d_ss_distr_arr[i] *= float(
-            1. / (dbl_xlink_dset[start_ind:, 0].size * ds_i * ds_j))
+        dbl_2d_ss_distr_arr[i] *= float(1. / (n_frames * ds_i * ds_j))
 
     xl_avg_distr_ss_mean_dset = h5_out.create_dataset(
         'average_steady_state_doubly_bound_distr_mean',
@@ -223,6 +374,7 @@ def analyze_avg_dbl_distr_steady_state(h5_out, h5_data_lst):
     xl_avg_distr_ss_std_dset.attrs['yedges'] = yedges
 
 
+@profile_stage()
 def analyze_ss_distr_error(h5_out):
     """!Analyze the error of the mean distribution of doubly bound motors.
     Does this in dimensional units.
@@ -232,35 +384,40 @@ def analyze_ss_distr_error(h5_out):
 
     """
     print('Running error analysis')
+    h5_out.attrs['error'], h5_out.attrs['sol_sem'] = get_ss_distr_error(h5_out)
 
-    n_seeds = h5_out.attrs['n_seeds']
-    ss_dbl_distr_mean = h5_out['average_steady_state_doubly_bound_distr_mean']
-    ss_dbl_distr_std = h5_out['average_steady_state_doubly_bound_distr_std']
+
+def get_ss_distr_error(h5_scan):
+    """!Calculate the integrated absolute difference between the mean steady
+    state distribution of doubly bound motors and the analytic solution, as
+    well as the integrated standard error of the mean distribution.
+
+    @param h5_scan: Seed scan h5 file with a steady state distribution
+    @return: error, sol_sem
+
+    """
+    n_seeds = h5_scan.attrs['n_seeds']
+    ss_dbl_distr_mean = h5_scan['average_steady_state_doubly_bound_distr_mean']
+    ss_dbl_distr_std = h5_scan['average_steady_state_doubly_bound_distr_std']
     s_i, s_j = (ss_dbl_distr_mean.attrs['xedges'] * nm,
                 ss_dbl_distr_mean.attrs['yedges'] * nm)
     sol = ss_dbl_distr_mean[...] / (nm * nm)
     sol_sem = ss_dbl_distr_std[...] / np.sqrt(n_seeds) / (nm * nm)
-    y = h5_out['filament_data/fil_avg_sep_mean'][-1, 2] * nm
+    y = h5_scan['filament_data/fil_avg_sep_mean'][-1, 2] * nm
 
-    p_dict = make_pde_dict_from_sc_h5(h5_out)
-    # print(p_dict)
+    p_dict = make_pde_dict_from_sc_h5(h5_scan)
 
     ds_i = s_i[1] - s_i[0]
     ds_j = s_j[1] - s_j[0]
     S_i, S_j = np.meshgrid(s_i[:-1] + (ds_i * .5),
                            s_j[:-1] + (ds_i * .5), indexing='ij')
-    sol_analytic = fp_steady_state_antipara(S_i, S_j, y, p_dict)
+    sol_analytic = fp_steady_state_antipara_tab(S_i, S_j, y, p_dict)
 
     comp = np.absolute(sol - sol_analytic)
-    # print(ds_i)
-    # np.sum(sol) * ds_i * ds_j)
-    # print(np.sum(sol_sem) * ds_i * ds_j)
-    # print(np.sum(sol_analytic) * ds_i * ds_j)
-    # print(np.sum(comp) * ds_i * ds_j)
-    h5_out.attrs['error'] = np.sum(comp) * ds_i * ds_j
-    h5_out.attrs['sol_sem'] = np.sum(sol_sem) * ds_i * ds_j
+    return np.sum(comp) * ds_i * ds_j, np.sum(sol_sem) * ds_i * ds_j
 
 
+@profile_stage()
 def analyze_avg_sgl_num(xl_grp, h5_data_lst):
     """!Analyze the number of singly bound motors or crosslinkers per step
 
@@ -269,20 +426,13 @@ def analyze_avg_sgl_num(xl_grp, h5_data_lst):
     @return: TODO
 
     """
-    sgl_fil0_num_arr = np.asarray([h5d['analysis/singly_bound_number'][:, 0]
-                                   for h5d in h5_data_lst])
-    sgl_fil1_num_arr = np.asarray([h5d['analysis/singly_bound_number'][:, 1]
-                                   for h5d in h5_data_lst])
-    sgl_num_arr_mean = np.vstack((sgl_fil0_num_arr.mean(axis=0),
-                                  sgl_fil1_num_arr.mean(axis=0)))
-    sgl_num_arr_std = np.vstack((sgl_fil0_num_arr.std(axis=0),
-                                 sgl_fil1_num_arr.std(axis=0)))
-    xl_grp.create_dataset('singly_bound_number_mean',
-                          data=sgl_num_arr_mean.T)
-    xl_grp.create_dataset('singly_bound_number_std',
-                          data=sgl_num_arr_std.T)
+    [(sgl_num_arr_mean, sgl_num_arr_std)] = seed_dsets_mean_std(
+        h5_data_lst, ['analysis/singly_bound_number'])
+    xl_grp.create_dataset('singly_bound_number_mean', data=sgl_num_arr_mean)
+    xl_grp.create_dataset('singly_bound_number_std', data=sgl_num_arr_std)
 
 
+@profile_stage()
 def analyze_avg_forces(h5_out, h5_data_lst):
     """!TODO: Docstring for analyze_avg_moments.
 
@@ -291,16 +441,16 @@ def analyze_avg_forces(h5_out, h5_data_lst):
     @return: TODO
 
     """
-    force_arr = np.asarray(
-        [h5d['analysis/xl_forces'][...] for h5d in h5_data_lst])
-    torque_arr = np.asarray(
-        [h5d['analysis/xl_torques'][...] for h5d in h5_data_lst])
-    h5_out.create_dataset('xl_forces_mean', data=force_arr.mean(axis=0))
-    h5_out.create_dataset('xl_forces_std', data=force_arr.std(axis=0))
-    h5_out.create_dataset('xl_torques_mean', data=torque_arr.mean(axis=0))
-    h5_out.create_dataset('xl_torques_std', data=torque_arr.std(axis=0))
+    ((force_mean, force_std), (torque_mean, torque_std)) = \
+        seed_dsets_mean_std(h5_data_lst,
+                            ['analysis/xl_forces', 'analysis/xl_torques'])
+    h5_out.create_dataset('xl_forces_mean', data=force_mean)
+    h5_out.create_dataset('xl_forces_std', data=force_std)
+    h5_out.create_dataset('xl_torques_mean', data=torque_mean)
+    h5_out.create_dataset('xl_torques_std', data=torque_std)
 
 
+@profile_stage()
 def analyze_avg_work(h5_out, h5_data_lst):
     """!TODO: Docstring for analyze_avg_moments.
 
@@ -309,16 +459,16 @@ def analyze_avg_work(h5_out, h5_data_lst):
     @return: TODO
 
     """
-    lin_work_arr = np.asarray(
-        [h5d['analysis/xl_linear_work'][...] for h5d in h5_data_lst])
-    rot_work_arr = np.asarray(
-        [h5d['analysis/xl_rotational_work'][...] for h5d in h5_data_lst])
-    h5_out.create_dataset('xl_lin_work_mean', data=lin_work_arr.mean(axis=0))
-    h5_out.create_dataset('xl_lin_work_std', data=lin_work_arr.std(axis=0))
-    h5_out.create_dataset('xl_rot_work_mean', data=rot_work_arr.mean(axis=0))
-    h5_out.create_dataset('xl_rot_work_std', data=rot_work_arr.std(axis=0))
+    ((lin_work_mean, lin_work_std), (rot_work_mean, rot_work_std)) = \
+        seed_dsets_mean_std(h5_data_lst, ['analysis/xl_linear_work',
+                                          'analysis/xl_rotational_work'])
+    h5_out.create_dataset('xl_lin_work_mean', data=lin_work_mean)
+    h5_out.create_dataset('xl_lin_work_std', data=lin_work_std)
+    h5_out.create_dataset('xl_rot_work_mean', data=rot_work_mean)
+    h5_out.create_dataset('xl_rot_work_std', data=rot_work_std)
 
 
+@profile_stage()
 def analyze_avg_fil_dist(fil_grp, h5_data_lst):
     """!Analyze the separation vectors between filament centers.
 
@@ -327,17 +477,26 @@ def analyze_avg_fil_dist(fil_grp, h5_data_lst):
     @return: TODO
 
     """
-    r_ij_arr = []
-    for h5d in h5_data_lst:
-        fil_pos_dset = h5d['filament_data/filament_position']
-        r_ij_arr += [fil_pos_dset[:, :, 1] - fil_pos_dset[:, :, 0]]
+    [(r_ij_mean, r_ij_std)] = seed_dsets_mean_std(
+        h5_data_lst, ['filament_data/filament_position'],
+        lambda arrs: [arrs[0][..., 1] - arrs[0][..., 0]])
+
+    fil_grp.create_dataset('fil_avg_sep_mean', data=r_ij_mean)
+    fil_grp.create_dataset('fil_avg_sep_std', data=r_ij_std)
+
+
+def load_fil_orientation(h5_path):
+    """!Load the filament orientations of a seed
 
-    r_ij_arr = np.asarray(r_ij_arr)
+    @param h5_path: Path to seed h5 file
+    @return: Array of orientations (n_frames, 3, n_fils)
 
-    fil_grp.create_dataset('fil_avg_sep_mean', data=r_ij_arr.mean(axis=0))
-    fil_grp.create_dataset('fil_avg_sep_std', data=r_ij_arr.std(axis=0))
+    """
+    with h5py.File(h5_path, 'r') as h5_data:
+        return h5_data['filament_data/filament_orientation'][...]
 
 
+@profile_stage()
 def analyze_avg_fil_ang(fil_grp, h5_data_lst):
     """!Analyze the separation vectors between filament centers.
 
@@ -349,26 +508,59 @@ def analyze_avg_fil_ang(fil_grp, h5_data_lst):
     uiuj_arr = np.zeros(
         (h5_data_lst[0]['filament_data/filament_orientation'].shape[0],
          len(h5_data_lst)))
-    for i, h5d in enumerate(h5_data_lst):
-        fil_orient_dset = h5d['filament_data/filament_orientation']
-        uiuj_arr[:, i] = np.einsum('ij,ij->i', fil_orient_dset[:, :, 0],
-                                   fil_orient_dset[:, :, 1])
+    prefetcher = Prefetcher([h5d.filename for h5d in h5_data_lst],
+                            load_fil_orientation)
+    for i, (_, fil_orient_arr) in enumerate(prefetcher):
+        uiuj_arr[:, i] = np.einsum('ij,ij->i', fil_orient_arr[:, :, 0],
+                                   fil_orient_arr[:, :, 1])
     theta_arr = np.arccos(uiuj_arr)
     fil_grp.create_dataset('fil_avg_theta_mean', data=theta_arr.mean(axis=0))
     fil_grp.create_dataset('fil_avg_theta_std', data=theta_arr.std(axis=0))
 
 
+@profile_stage()
 def analyze_avg_cpu_time(h5_out, h5_data_lst):
-    """!Collect cpu time of runs and create an area as wells as mean value and
-    standard deviation
+    """!Collect cpu time and other log timings of runs along with the derived
+    throughput, simulated steps and output frames per cpu second. Stores
+    per-seed arrays in the time_analysis group and their mean and standard
+    deviation as attributes. Seeds without a timing are stored as nan and
+    ignored in the statistics.
 
-    @param h5_out: TODO
-    @param h5_data_lst: TODO
-    @return: TODO
+    @param h5_out: Seed scan h5 file
+    @param h5_data_lst: List of seed h5 files
+    @return: void
 
     """
-    cpu_time_arr = []
-    pass
+    timing_keys = sorted({key for h5d in h5_data_lst
+                          for key in h5d['analysis'].attrs.keys()
+                          if key.endswith('_time')})
+    if 'cpu_time' not in timing_keys:
+        print("No cpu times found in seeds.")
+        return
+
+    time_grp = h5_out.create_group('time_analysis')
+    time_dict = {}
+    for key in timing_keys:
+        time_dict[key] = np.asarray(
+            [h5d['analysis'].attrs.get(key, np.nan) for h5d in h5_data_lst],
+            dtype=np.double)
+
+    n_steps_arr = np.asarray([h5d.attrs.get('n_steps', np.nan)
+                              for h5d in h5_data_lst], dtype=np.double)
+    n_frames_arr = np.asarray([h5d['xl_data/time'].size
+                               for h5d in h5_data_lst], dtype=np.double)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        time_dict['steps_per_cpu_sec'] = n_steps_arr / time_dict['cpu_time']
+        time_dict['frames_per_cpu_sec'] = (n_frames_arr /
+                                           time_dict['cpu_time'])
+
+    for key, arr in time_dict.items():
+        time_grp.create_dataset(key, data=arr)
+        if np.any(np.isfinite(arr)):
+            time_grp.attrs[key + '_mean'] = np.nanmean(arr)
+            time_grp.attrs[key + '_std'] = np.nanstd(arr)
+    time_grp.attrs['n_timed_seeds'] = np.count_nonzero(
+        np.isfinite(time_dict['cpu_time']))
 
 
 ##########################################
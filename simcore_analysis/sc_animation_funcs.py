@@ -7,18 +7,38 @@ Email: adam.lamson@colorado.edu
 Description:
 """
 
+import os
 import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, FFMpegWriter, MovieWriter
 from pathlib import Path
 
 from .sc_graphs import sc_graph_all_data_2d
+from .sc_keyframes import select_keyframes
+from .sc_video import VideoSink
+
+MIN_GRAPH_STL = {
+    "axes.titlesize": 18,
+    "axes.labelsize": 15,
+    "xtick.labelsize": 15,
+    "ytick.labelsize": 15,
+    "font.size": 18,
+    "font.sans-serif": 'Helvetica',
+    "text.usetex": False,
+    'mathtext.fontset': 'cm',
+}
+
+# Figure and seed data of a movie rendering worker process
+_RENDER_WORKER = {}
 
 
 def make_sc_animation(sd_data, writer='ffmpeg',
-                      save_path=Path('./'), save_name=None):
+                      save_path=Path('./'), save_name=None, frame_list=None):
     """!Make animation of time slices
+    @param frame_list: Frames of the movie. Defaults to 200 keyframes.
     @return: TODO
 
     """
@@ -43,9 +63,9 @@ def make_sc_animation(sd_data, writer='ffmpeg',
                             fig.add_subplot(gs[1, 1]),
                             ])
         fig.suptitle(' ')
-        nframes = sd_data.time.size
-        frame_list = range(0, nframes, int(nframes / 200))
-        print("  Number of frames =", nframes)
+        if frame_list is None:
+            frame_list = select_keyframes(sd_data.h5_data, 200)
+        print("  Number of frames =", len(frame_list))
         # print(" Fig dpi =", fig.dpi)
         t0 = time.time()
         anim = FuncAnimation(
@@ -62,34 +82,35 @@ def make_sc_animation(sd_data, writer='ffmpeg',
     return anim
 
 
-def make_sc_animation_min(sd_data, writer='ffmpeg',
-                          save_path=Path('./'), save_name=None):
-    """!Make animation of time slices
-    @return: TODO
+def make_min_figure():
+    """!Make the figure and axes of the minimal seed movie
+    @return: (figure, array of axes)
 
     """
-    graph_stl = {
-        "axes.titlesize": 18,
-        "axes.labelsize": 15,
-        "xtick.labelsize": 15,
-        "ytick.labelsize": 15,
-        "font.size": 18,
-        "font.sans-serif": 'Helvetica',
-        "text.usetex": False,
-        'mathtext.fontset': 'cm',
-    }
-    # with plt.style.context(graph_stl):
-    plt.style.use(graph_stl)
-    # fig, axarr = plt.subplots(1, 2, figsize=(10, 4))
+    plt.style.use(MIN_GRAPH_STL)
     fig = plt.figure(constrained_layout=True, figsize=(10, 5))
     gs = fig.add_gridspec(1, 2)
     axarr = np.asarray([fig.add_subplot(gs[0]),
                         fig.add_subplot(gs[1]),
                         ])
     fig.suptitle(' ')
-    nframes = sd_data.time.size
-    frame_list = range(0, nframes, int(nframes / 100))
-    print("  Number of frames =", nframes)
+    return fig, axarr
+
+
+def make_sc_animation_min(sd_data, writer='ffmpeg',
+                          save_path=Path('./'), save_name=None,
+                          frame_list=None):
+    """!Make animation of time slices
+    @param frame_list: Frames of the movie. Defaults to 100 keyframes.
+    @return: TODO
+
+    """
+    fig, axarr = make_min_figure()
+    # Lay out the figure before FuncAnimation draws it empty
+    sc_graph_all_data_2d(0, fig, axarr, sd_data)
+    if frame_list is None:
+        frame_list = select_keyframes(sd_data.h5_data)
+    print("  Number of frames =", len(frame_list))
     t0 = time.time()
     anim = FuncAnimation(
         fig,
@@ -107,3 +128,139 @@ def make_sc_animation_min(sd_data, writer='ffmpeg',
     t1 = time.time()
     print("Movie saved in: ", t1 - t0)
     return anim
+
+
+def make_sc_movie(sd_data, save_path=Path('./'), save_name=None, fps=20,
+                  frame_list=None, **sink_kwargs):
+    """!Make the movie of make_sc_animation_min by blitting each frame and
+    streaming the canvas buffer straight into the encoder, with no savefig
+    or image files in between.
+
+    @param sd_data: SeedData of the seed
+    @param save_path: Directory to save the movie in
+    @param save_name: Name of the movie. Defaults to the run name.
+    @param fps: Frame rate of the movie
+    @param frame_list: Frames of the movie. Defaults to 100 keyframes chosen
+                       by select_keyframes.
+    @param sink_kwargs: Arguments passed to VideoSink, e.g. bitrate
+    @return: Path to the movie
+
+    """
+    fig, axarr = make_min_figure()
+    sc_graph_all_data_2d(0, fig, axarr, sd_data)
+    if frame_list is None:
+        frame_list = select_keyframes(sd_data.h5_data)
+    movie_path = save_path / '{}_min.mp4'.format(
+        save_name if save_name else sd_data.run_name)
+    print("  Number of frames =", len(frame_list))
+    t0 = time.time()
+    with VideoSink(movie_path, fig.canvas.get_width_height(), fps,
+                   **sink_kwargs) as sink:
+        for n in frame_list:
+            sd_data.frame_artists.blit(n)
+            sink.write_canvas(fig.canvas)
+    plt.close(fig)
+    t1 = time.time()
+    print("Movie saved in: ", t1 - t0)
+    return movie_path
+
+
+def init_render_worker(param_file, figsize, dpi, frames=None):
+    """!Set up the figure and seed data of a movie rendering worker process
+
+    @param param_file: Path to the parameter file of the seed
+    @param figsize: Size of the movie figure in inches
+    @param dpi: Resolution of the movie figure
+    @param frames: Frame subset of the SeedData of the movie, None for all
+    @return: void
+
+    """
+    from .sc_seed_data import SeedData
+    plt.switch_backend('Agg')
+    fig, axarr = make_min_figure()
+    fig.set_size_inches(figsize)
+    fig.set_dpi(dpi)
+    param_file = Path(param_file)
+    sd_data = SeedData(param_file.name, param_file.parent, frames=frames)
+    # Lay out the figure the same way make_sc_movie does
+    sc_graph_all_data_2d(0, fig, axarr, sd_data)
+    _RENDER_WORKER.update(fig=fig, sd_data=sd_data)
+
+
+def render_frame_chunk(frames, raw_path):
+    """!Render frames of the minimal seed movie to a file of raw RGBA frames
+    in a worker process set up by init_render_worker.
+
+    @param frames: Frame indices to render
+    @param raw_path: Path of the raw frame file
+    @return: raw_path
+
+    """
+    fig = _RENDER_WORKER['fig']
+    frame_artists = _RENDER_WORKER['sd_data'].frame_artists
+    with open(raw_path, 'wb') as rf:
+        for n in frames:
+            frame_artists.blit(n)
+            rf.write(fig.canvas.buffer_rgba())
+    return raw_path
+
+
+def make_sc_animation_parallel(sd_data, save_path=Path('./'), save_name=None,
+                               n_procs=None, frames_per_chunk=None, fps=20,
+                               frame_list=None, **sink_kwargs):
+    """!Make the movie of make_sc_movie with frames rendered in parallel. The
+    frame list is split into chunks of consecutive frames that worker
+    processes render with Agg to raw RGBA files. Chunks are streamed to the
+    encoder in order as they finish, so the movie is frame-identical to the
+    serial one.
+
+    @param sd_data: SeedData of the seed
+    @param save_path: Directory to save the movie in
+    @param save_name: Name of the movie. Defaults to the run name.
+    @param n_procs: Number of worker processes. Defaults to the cpu count.
+    @param frames_per_chunk: Number of frames rendered per chunk. Defaults to
+                             a quarter of an equal share of each process.
+    @param fps: Frame rate of the movie
+    @param frame_list: Frames of the movie. Defaults to 100 keyframes chosen
+                       by select_keyframes.
+    @param sink_kwargs: Arguments passed to VideoSink, e.g. bitrate
+    @return: Path to the movie
+
+    """
+    if n_procs is None:
+        n_procs = os.cpu_count()
+    if frame_list is None:
+        frame_list = select_keyframes(sd_data.h5_data)
+    frame_list = [int(n) for n in frame_list]
+    if frames_per_chunk is None:
+        frames_per_chunk = max(1, -(-len(frame_list) // (4 * n_procs)))
+    chunks = [frame_list[i:i + frames_per_chunk]
+              for i in range(0, len(frame_list), frames_per_chunk)]
+    movie_path = save_path / '{}_min.mp4'.format(
+        save_name if save_name else sd_data.run_name)
+    print("  Number of frames =", len(frame_list))
+    t0 = time.time()
+
+    fig, _ = make_min_figure()
+    frame_size = fig.canvas.get_width_height()
+    init_args = (str(sd_data.param_file), tuple(fig.get_size_inches()),
+                 fig.dpi, (sd_data.frames
+                           if sd_data.frames.size < sd_data.n_frames
+                           else None))
+    plt.close(fig)
+    with tempfile.TemporaryDirectory(dir=save_path) as tmp_dir, \
+            VideoSink(movie_path, frame_size, fps, **sink_kwargs) as sink, \
+            ProcessPoolExecutor(n_procs, initializer=init_render_worker,
+                                initargs=init_args) as executor:
+        futures = [executor.submit(
+            render_frame_chunk, chunk,
+            Path(tmp_dir) / 'chunk_{}.rgba'.format(i))
+            for i, chunk in enumerate(chunks)]
+        # Stream chunks in order, later chunks keep rendering meanwhile
+        for future in futures:
+            raw_path = future.result()
+            sink.write_raw_file(raw_path)
+            raw_path.unlink()
+    t1 = time.time()
+    print("Movie saved in: ", t1 - t0)
+    return movie_path
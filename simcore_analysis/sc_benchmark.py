@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_benchmark.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Benchmarks of the analysis pipeline on synthetic CGLASS output.
+Ingest, seed analysis, seed scan aggregation and animation frame rendering are
+timed at several scales and reported as frames per second. Results can be
+stored as a baseline and later runs compared against it.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+import h5py
+
+from .sc_synthetic import write_synthetic_seed_scan
+from .sc_parse_data import collect_data
+from .sc_analyze_seed import analyze_seed
+from .sc_analyze_seed_scan import analyze_seed_scan, collect_seed_h5_files
+from .sc_work_queue import work_dir
+
+# Sizes of the synthetic runs of each scale
+SCALES = {
+    'small': {'n_frames': 200, 'xl_density': .25, 'n_seeds': 2},
+    'medium': {'n_frames': 1000, 'xl_density': .5, 'n_seeds': 3},
+    'large': {'n_frames': 4000, 'xl_density': 1., 'n_seeds': 4},
+}
+
+BENCHMARKS = ['ingest', 'analyze_seed', 'seed_scan', 'render']
+
+# Number of animation frames drawn in the render benchmark
+N_RENDER_FRAMES = 20
+
+# Baseline kept in the repository, found wherever the benchmark is run from
+BASELINE_PATH = (Path(__file__).resolve().parents[1] / 'benchmarks' /
+                 'baseline.json')
+
+
+def get_data_file(param_file):
+    """!Get the h5 data file seed analysis writes for a parameter file"""
+    return param_file.with_name(
+        param_file.name.replace('_params.yaml', '_data.h5'))
+
+
+def time_call(func, *args):
+    """!Time a function call
+    @return: Wall time in seconds
+
+    """
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def bench_ingest(param_file):
+    """!Time reading the CGLASS output of a run into a new h5 file
+
+    @param param_file: Parameter yaml file of the synthetic run
+    @return: (wall time, frames read)
+
+    """
+    with work_dir(param_file.parent):
+        with h5py.File(get_data_file(param_file).name, 'w') as h5_data:
+            wall_time = time_call(collect_data, h5_data, param_file.name)
+            n_frames = h5_data['xl_data/time'].size
+    return wall_time, n_frames
+
+
+def bench_analyze_seed(param_file):
+    """!Time the analysis of an ingested seed
+
+    @param param_file: Parameter yaml file of the ingested synthetic run
+    @return: (wall time, frames analyzed)
+
+    """
+    with h5py.File(get_data_file(param_file), 'r+') as h5_data:
+        wall_time = time_call(analyze_seed, h5_data)
+        n_frames = h5_data['xl_data/time'].size
+    return wall_time, n_frames
+
+
+def bench_seed_scan(param_dir):
+    """!Time aggregating analyzed seeds into a seed scan file
+
+    @param param_dir: Parameter directory of analyzed synthetic seeds
+    @return: (wall time, frames of all seeds)
+
+    """
+    param_dir = Path(param_dir)
+    t0 = time.perf_counter()
+    h5_data_lst = collect_seed_h5_files(param_dir)
+    try:
+        with h5py.File(param_dir / '{}.h5'.format(param_dir.name),
+                       'w') as h5_out:
+            analyze_seed_scan(h5_out, h5_data_lst)
+            n_frames = h5_out['time'].size * len(h5_data_lst)
+    finally:
+        for h5d in h5_data_lst:
+            h5d.close()
+    return time.perf_counter() - t0, n_frames
+
+
+def bench_render(param_file, n_render=N_RENDER_FRAMES):
+    """!Time drawing animation frames of a seed without encoding them
+
+    @param param_file: Parameter yaml file of the analyzed synthetic run
+    @param n_render: Number of frames to draw
+    @return: (wall time, frames drawn)
+
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import numpy as np
+    import matplotlib.pyplot as plt
+    from .sc_seed_data import SeedData
+    from .sc_graphs import sc_graph_all_data_2d
+
+    sd_data = SeedData(param_file.name, param_file.parent)
+    try:
+        fig = plt.figure(constrained_layout=True, figsize=(10, 5))
+        gs = fig.add_gridspec(1, 2)
+        axarr = np.asarray([fig.add_subplot(gs[0]), fig.add_subplot(gs[1])])
+        frame_list = range(0, sd_data.time.size,
+                           max(1, sd_data.time.size // n_render))
+        t0 = time.perf_counter()
+        for n in frame_list:
+            sc_graph_all_data_2d(n, fig, axarr, sd_data)
+            fig.canvas.draw()
+        wall_time = time.perf_counter() - t0
+        plt.close(fig)
+    finally:
+        sd_data.save()
+    return wall_time, len(frame_list)
+
+
+def make_result(wall_time, n_frames):
+    """!Make a benchmark result with throughput"""
+    return {'wall_time': wall_time, 'frames': int(n_frames),
+            'frames_per_sec': (n_frames / wall_time if wall_time > 0
+                               else float('inf'))}
+
+
+def run_scale(scale, benchmarks=BENCHMARKS, tmp_root=None):
+    """!Run benchmarks on synthetic data of one scale. Later benchmarks work on
+    the output of earlier ones, so ingest and seed analysis always run.
+
+    @param scale: Name of scale in SCALES or dictionary of sizes
+    @param benchmarks: Names of benchmarks to report
+    @param tmp_root: Directory for the synthetic data. Defaults to the system
+                     temporary directory.
+    @return: Dictionary of results keyed by benchmark name
+
+    """
+    sizes = dict(SCALES[scale] if isinstance(scale, str) else scale)
+    n_seeds = sizes.pop('n_seeds')
+    results = {}
+    with tempfile.TemporaryDirectory(dir=tmp_root) as tmp_dir:
+        param_dir = Path(tmp_dir) / 'param'
+        param_files = write_synthetic_seed_scan(param_dir, n_seeds, **sizes)
+        ingest, analysis = [], []
+        for param_file in param_files:
+            ingest += [bench_ingest(param_file)]
+            analysis += [bench_analyze_seed(param_file)]
+        if 'ingest' in benchmarks:
+            results['ingest'] = make_result(sum(w for w, _ in ingest),
+                                            sum(f for _, f in ingest))
+        if 'analyze_seed' in benchmarks:
+            results['analyze_seed'] = make_result(sum(w for w, _ in analysis),
+                                                  sum(f for _, f in analysis))
+        if 'seed_scan' in benchmarks:
+            results['seed_scan'] = make_result(*bench_seed_scan(param_dir))
+        if 'render' in benchmarks:
+            results['render'] = make_result(*bench_render(param_files[0]))
+    return results
+
+
+def run_benchmarks(scales=('small', 'medium'), benchmarks=BENCHMARKS):
+    """!Run benchmarks at several scales
+
+    @param scales: Names of scales in SCALES
+    @param benchmarks: Names of benchmarks to run
+    @return: Dictionary with machine info and results keyed by scale
+
+    """
+    report = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'results': {}}
+    for scale in scales:
+        print("BENCHMARK: Running {} scale".format(scale))
+        report['results'][scale] = run_scale(scale, benchmarks)
+        for name, res in report['results'][scale].items():
+            print("BENCHMARK: {:>8} {:>12} {:10.1f} frames/s".format(
+                scale, name, res['frames_per_sec']))
+    return report
+
+
+def compare_to_baseline(report, baseline, tolerance=.25):
+    """!Find benchmarks that are slower than the baseline
+
+    @param report: Report from run_benchmarks
+    @param baseline: Report stored as baseline
+    @param tolerance: Allowed fractional drop in frames per second
+    @return: List of (scale, benchmark, frames_per_sec, baseline
+             frames_per_sec) of regressions
+
+    """
+    regressions = []
+    for scale, results in report['results'].items():
+        base_results = baseline['results'].get(scale, {})
+        for name, res in results.items():
+            if name not in base_results:
+                continue
+            base_fps = base_results[name]['frames_per_sec']
+            if res['frames_per_sec'] < (1. - tolerance) * base_fps:
+                regressions += [(scale, name, res['frames_per_sec'],
+                                 base_fps)]
+    return regressions
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='sc_benchmark.py',
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-s", "--scales", nargs='+', default=['small',
+                                                              'medium'],
+                        choices=list(SCALES),
+                        help="Scales of synthetic data to benchmark.")
+    parser.add_argument("-b", "--benchmarks", nargs='+', default=BENCHMARKS,
+                        choices=BENCHMARKS, help="Benchmarks to run.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help="Baseline json file to compare against.")
+    parser.add_argument("--save_baseline", action="store_true",
+                        default=False,
+                        help="Store the results as the new baseline.")
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="Json file to write the results to.")
+    parser.add_argument("-t", "--tolerance", type=float, default=.25,
+                        help="Allowed fractional drop in frames/s before a "
+                        "benchmark counts as a regression.")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """!Run benchmarks, store or compare against the baseline.
+    @return: Exit status, 1 if a benchmark regressed
+
+    """
+    opts = parse_args(args)
+    report = run_benchmarks(opts.scales, opts.benchmarks)
+    if opts.output is not None:
+        with open(opts.output, 'w') as outf:
+            json.dump(report, outf, indent=2)
+    if opts.save_baseline:
+        opts.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(opts.baseline, 'w') as outf:
+            json.dump(report, outf, indent=2)
+        print("BENCHMARK: Saved baseline to {}".format(opts.baseline))
+        return 0
+    if not opts.baseline.exists():
+        print("BENCHMARK: No baseline at {}".format(opts.baseline))
+        return 0
+    with open(opts.baseline, 'r') as inf:
+        baseline = json.load(inf)
+    regressions = compare_to_baseline(report, baseline, opts.tolerance)
+    for scale, name, fps, base_fps in regressions:
+        print("BENCHMARK: !!! {} {} regressed: {:.1f} frames/s, "
+              "baseline {:.1f} frames/s !!!".format(scale, name, fps,
+                                                    base_fps))
+    return 1 if regressions else 0
+
+
+##########################################
+if __name__ == "__main__":
+    sys.exit(main())
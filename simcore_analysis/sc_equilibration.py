@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_equilibration.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Detect the end of the initial transient of time series using the
+marginal standard error rule (MSER). All functions work along the last axis so
+many observables and seeds can be handled in one call.
+"""
+
+import numpy as np
+
+
+def batch_means(arr, batch_size=1):
+    """!Average non-overlapping batches along the last axis of arr. Trailing
+    values that do not fill a complete batch are dropped.
+
+    @param arr: Array of time series with time along the last axis
+    @param batch_size: Number of consecutive values averaged in each batch
+    @return: Array with shape arr.shape[:-1] + (arr.shape[-1]//batch_size,)
+
+    """
+    arr = np.asarray(arr, dtype=np.double)
+    if batch_size <= 1:
+        return arr
+    n_batches = arr.shape[-1] // batch_size
+    return arr[..., :n_batches * batch_size].reshape(
+        arr.shape[:-1] + (n_batches, batch_size)).mean(axis=-1)
+
+
+def mser(arr, batch_size=1, max_frac=.5):
+    """!Marginal standard error of the series left after truncating the first
+    d (batched) values, for every truncation point d. Uses reversed cumulative
+    sums so the whole curve is computed in O(n).
+
+    @param arr: Array of time series with time along the last axis
+    @param batch_size: Batch size used to average values before computing MSER
+    @param max_frac: Largest fraction of the series that may be truncated
+    @return: Array with shape arr.shape[:-1] + (n_trunc,) of MSER values
+
+    """
+    x = batch_means(arr, batch_size)
+    n = x.shape[-1]
+    if n == 0:
+        raise ValueError("Cannot find equilibration of an empty series.")
+    # Center each series to avoid cancellation in the variance sums
+    x = x - x.mean(axis=-1, keepdims=True)
+    s1 = np.cumsum(x[..., ::-1], axis=-1)[..., ::-1]
+    s2 = np.cumsum((x * x)[..., ::-1], axis=-1)[..., ::-1]
+    n_trunc = max(1, int(n * max_frac))
+    k = np.arange(n, n - n_trunc, -1, dtype=np.double)
+    s1 = s1[..., :n_trunc]
+    s2 = s2[..., :n_trunc]
+    return np.clip(s2 - (s1 * s1 / k), 0., None) / (k * k)
+
+
+def find_equilibration_index(arr, batch_size=5, max_frac=.5):
+    """!Find the index of the first equilibrated value of each time series in
+    arr by minimizing the MSER statistic.
+
+    @param arr: Array of time series with time along the last axis,
+                e.g. (n_seeds, n_observables, n_frames)
+    @param batch_size: Batch size used to average values before computing MSER
+    @param max_frac: Largest fraction of the series that may be truncated
+    @return: Integer array with shape arr.shape[:-1] of start indices
+
+    """
+    arr = np.asarray(arr, dtype=np.double)
+    # Short series cannot be batched meaningfully
+    batch_size = max(1, min(batch_size, arr.shape[-1] // 10))
+    mser_arr = mser(arr, batch_size, max_frac)
+    # Constant or invalid series are considered equilibrated from the start
+    mser_arr = np.where(np.isfinite(mser_arr), mser_arr, np.inf)
+    return np.argmin(mser_arr, axis=-1) * batch_size
+
+
+def find_seed_equilibration_index(obs_arr, batch_size=5, max_frac=.5):
+    """!Find a start index for each seed that is equilibrated with respect to
+    every observable.
+
+    @param obs_arr: Array with shape (n_seeds, n_observables, n_frames)
+    @param batch_size: Batch size used to average values before computing MSER
+    @param max_frac: Largest fraction of the series that may be truncated
+    @return: (seed_ind_arr, obs_ind_arr) with shapes (n_seeds,) and
+             (n_seeds, n_observables)
+
+    """
+    obs_ind_arr = find_equilibration_index(obs_arr, batch_size, max_frac)
+    return obs_ind_arr.max(axis=-1), obs_ind_arr
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_export.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Export per-frame observables of every seed in a parameter scan as
+tidy Parquet tables. Each seed gets one file in a hive partitioned dataset,
+<out_dir>/frames/<param>=<value>/seed=<seed>/<param dir>.parquet, and a
+catalog with one row per seed holds the flattened run parameters and cpu
+times. Frames and catalog share the param_dir and seed columns, so both can be
+queried and joined with pyarrow.dataset or any Arrow based engine.
+Requires pyarrow, which is only imported when exporting.
+"""
+
+from pathlib import Path
+import numpy as np
+import h5py
+
+from .sc_param_index import ParamIndex, get_param_key
+
+# Per-frame columns taken from seed h5 files, (column, dataset path, index of
+# the dataset along its second axis or None)
+FRAME_COLUMNS = [
+    ('xl_zeroth_moment', 'analysis/xl_zeroth_moment', None),
+    ('xl_mu10', 'analysis/xl_first_moments', 0),
+    ('xl_mu01', 'analysis/xl_first_moments', 1),
+    ('xl_mu11', 'analysis/xl_second_moments', 0),
+    ('xl_mu20', 'analysis/xl_second_moments', 1),
+    ('xl_mu02', 'analysis/xl_second_moments', 2),
+    ('xl_force_x', 'analysis/xl_forces', 0),
+    ('xl_force_y', 'analysis/xl_forces', 1),
+    ('xl_force_z', 'analysis/xl_forces', 2),
+    ('xl_lin_work_i', 'analysis/xl_linear_work', 0),
+    ('xl_lin_work_j', 'analysis/xl_linear_work', 1),
+    ('xl_rot_work_i', 'analysis/xl_rotational_work', 0),
+    ('xl_rot_work_j', 'analysis/xl_rotational_work', 1),
+    ('sgl_num_i', 'analysis/singly_bound_number', 0),
+    ('sgl_num_j', 'analysis/singly_bound_number', 1),
+]
+
+# Catalog columns taken from the attributes of the analysis group of seeds
+CATALOG_TIMINGS = ['cpu_time', 'wall_time']
+
+SEED_PATTERN = '*/[!.]*/*.h5'
+SEED_INDEX_NAME = '.seed_param_index.json'
+
+
+def import_pyarrow():
+    """!Import pyarrow and pyarrow.parquet
+    @return: pyarrow, pyarrow.parquet
+
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise ImportError("Parquet export requires pyarrow, "
+                          "install it with 'pip install pyarrow'.") from err
+    return pa, pq
+
+
+def get_seed_frame_columns(h5_data):
+    """!Get the per-frame observables of an analyzed seed as flat columns.
+    Observables missing from the seed are filled with nan so every table has
+    the same schema.
+
+    @param h5_data: Analyzed seed h5 file
+    @return: Dictionary of 1D arrays keyed by column name
+
+    """
+    time = h5_data['xl_data/time'][...]
+    n_frames = time.size
+    columns = {'frame': np.arange(n_frames, dtype=np.int64), 'time': time}
+    for name, dset_path, ind in FRAME_COLUMNS:
+        if dset_path not in h5_data:
+            columns[name] = np.full(n_frames, np.nan)
+            continue
+        dset = h5_data[dset_path]
+        col = dset[...] if ind is None else dset[:, ind]
+        columns[name] = np.asarray(col, dtype=np.double)
+
+    # Filament separation and angle between the first two filaments
+    fil_pos = h5_data['filament_data/filament_position']
+    fil_orient = h5_data['filament_data/filament_orientation']
+    sep = fil_pos[:, :, 1] - fil_pos[:, :, 0]
+    for i, ax in enumerate('xyz'):
+        columns['fil_sep_' + ax] = np.asarray(sep[:, i], dtype=np.double)
+    columns['fil_sep'] = np.linalg.norm(sep, axis=-1)
+    columns['fil_angle'] = np.arccos(np.clip(np.einsum(
+        'ij,ij->i', fil_orient[:, :, 0], fil_orient[:, :, 1]), -1., 1.))
+    return columns
+
+
+def get_catalog_columns(index, seed_paths, sim_dir_path):
+    """!Make the catalog of seeds, one row per seed file with all scalar
+    parameters and timings. Parameters that are not numbers are stored as
+    strings.
+
+    @param index: ParamIndex of the seed files
+    @param seed_paths: Paths of the exported seed files
+    @param sim_dir_path: Directory holding the parameter directories
+    @return: Dictionary of column lists keyed by column name
+
+    """
+    rows = []
+    for h5_path in seed_paths:
+        row = dict(index.entries[str(h5_path.relative_to(sim_dir_path))][
+            'params'])
+        row['param_dir'] = h5_path.parent.parent.name
+        row['seed_file'] = str(h5_path.relative_to(sim_dir_path))
+        with h5py.File(h5_path, 'r') as h5_data:
+            attrs = (h5_data['analysis'].attrs if 'analysis' in h5_data
+                     else {})
+            row['n_frames'] = h5_data['xl_data/time'].size
+            for key in CATALOG_TIMINGS:
+                row[key] = float(attrs.get(key, np.nan))
+        rows += [row]
+
+    keys = sorted(set(k for row in rows for k in row))
+    columns = {}
+    for key in keys:
+        col = [row.get(key) for row in rows]
+        if all(isinstance(v, (bool, int, float, np.number)) or v is None
+               for v in col):
+            columns[key] = col
+        else:
+            columns[key] = [None if v is None else str(v) for v in col]
+    return columns
+
+
+def export_param_scan_parquet(sim_dir_path, out_dir, param, spec=None):
+    """!Export the per-frame observables of every analyzed seed of a parameter
+    scan and the catalog of seeds to Parquet.
+
+    @param sim_dir_path: Directory holding the parameter directories
+    @param out_dir: Directory to write the dataset into
+    @param param: Name of the scanned parameter, used to partition frames
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @return: Number of exported seeds
+
+    """
+    pa, pq = import_pyarrow()
+    sim_dir_path = Path(sim_dir_path)
+    out_dir = Path(out_dir)
+    index = ParamIndex(sim_dir_path, SEED_PATTERN, SEED_INDEX_NAME)
+    param_key = get_param_key(param, spec)
+
+    seed_paths = []
+    for h5_path in index.sort(param, spec):
+        with h5py.File(h5_path, 'r') as h5_data:
+            if 'analysis' not in h5_data or 'seed' not in h5_data.attrs:
+                print("!!! {} is not an analyzed seed, skipping !!!".format(
+                    h5_path))
+                continue
+            columns = get_seed_frame_columns(h5_data)
+            seed = int(h5_data.attrs['seed'])
+        param_dir = h5_path.parent.parent.name
+        columns['param_dir'] = [param_dir] * columns['frame'].size
+        part_dir = (out_dir / 'frames' /
+                    '{}={}'.format(param_key, index.get(h5_path, param, spec))
+                    / 'seed={}'.format(seed))
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.table(columns),
+                       part_dir / '{}.parquet'.format(param_dir))
+        seed_paths += [h5_path]
+
+    if seed_paths:
+        pq.write_table(
+            pa.table(get_catalog_columns(index, seed_paths, sim_dir_path)),
+            out_dir / 'catalog.parquet')
+    print("Exported {} seeds to {}".format(len(seed_paths), out_dir))
+    return len(seed_paths)
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
@@ -10,10 +10,10 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
+from matplotlib.collections import LineCollection, EllipseCollection
 from matplotlib.patches import (Circle, RegularPolygon, FancyArrowPatch,
                                 ArrowStyle)
 
-from .sc_analyze_seed import flatten_dset
 
 nm = 25.
 um = .025
@@ -75,6 +75,24 @@ class LineDataUnits(Line2D):
     _linewidth = property(_get_lw, _set_lw)
 
 
+class LineCollectionDataUnits(LineCollection):
+
+    """!LineCollection with a linewidth in data units of the y axis"""
+
+    def __init__(self, segments, **kwargs):
+        _lw_data = kwargs.pop("linewidth", 1)
+        super().__init__(segments, **kwargs)
+        self._lw_data = _lw_data
+
+    def draw(self, renderer):
+        if self.axes is not None:
+            ppd = 72. / self.axes.figure.dpi
+            trans = self.axes.transData.transform
+            self._linewidths = [
+                ((trans((1, self._lw_data)) - trans((0, 0))) * ppd)[1]]
+        super().draw(renderer)
+
+
 def xlink_end_pos(r_vec, u_vec, s):
     return (r_vec + (u_vec * s))
 
@@ -123,48 +141,100 @@ def draw_xlink(ax, e_i, e_j, lw=.5, color='r', alpha=1.0):
     ax.add_line(line)
 
 
-def draw_xlinks(ax, r_i, r_j, u_i, u_j, s_i_arr, s_j_arr, lw):
-    """!TODO: Docstring for draw_xlinks.
+def get_xlink_segments(r_i, r_j, u_i, u_j, s_i_arr, s_j_arr):
+    """!Get the segments between the heads of doubly bound crosslinks in the
+    plane of the rod diagram, r + u*s for all heads at once.
 
-    @param r_i: TODO
-    @param r_j: TODO
-    @param u_i: TODO
-    @param u_j: TODO
-    @param e_i_arr: TODO
-    @param e_j_arrj: TODO
-    @return: TODO
+    @param r_i: Center of fil_i
+    @param r_j: Center of fil_j
+    @param u_i: Orientation of fil_i
+    @param u_j: Orientation of fil_j
+    @param s_i_arr: Distances of heads from the center of fil_i
+    @param s_j_arr: Distances of heads from the center of fil_j
+    @return: Array of segments with shape (n_xlinks, 2, 2)
 
     """
-    for s_i, s_j in zip(s_i_arr, s_j_arr):
-        e_i = s_i * u_i + r_i
-        e_j = s_j * u_j + r_j
-        draw_xlink(ax, e_i, e_j, lw)
+    e_i = xlink_end_pos(np.asarray(r_i)[None, 1:], np.asarray(u_i)[None, 1:],
+                        np.asarray(s_i_arr, dtype=np.double)[:, None])
+    e_j = xlink_end_pos(np.asarray(r_j)[None, 1:], np.asarray(u_j)[None, 1:],
+                        np.asarray(s_j_arr, dtype=np.double)[:, None])
+    return np.stack((e_i, e_j), axis=1)
 
 
-def graph_2d_rod_diagram(ax, sd_data, n=-1):
-    """!TODO: Docstring for graph_2d_rod_diagram.
+def make_xlink_collections(ax, lw=.5, color='r'):
+    """!Add empty collections for the crosslinks of a frame to an axis, one
+    for the segments and one for the heads. Sizes are in data units.
 
-    @param ax: TODO
-    @param sd_data: TODO
-    @param n: TODO
-    @return: TODO
+    @param ax: Axis to draw in
+    @param lw: Width of crosslinks and radius of heads
+    @param color: Color of crosslinks and heads
+    @return: (segment collection, head collection)
 
     """
-    # params = anal._params
+    xlinks = LineCollectionDataUnits([], linewidth=lw, color=color,
+                                     clip_on=False)
+    heads = EllipseCollection(2. * lw, 2. * lw, 0., units='xy',
+                              offsets=np.zeros((0, 2)),
+                              offset_transform=ax.transData,
+                              color=color, zorder=3)
+    ax.add_collection(xlinks, autolim=False)
+    ax.add_collection(heads, autolim=False)
+    return xlinks, heads
+
+
+def set_xlink_segments(xlinks, heads, segments):
+    """!Move the crosslink collections to new segments
+
+    @param xlinks: Segment collection from make_xlink_collections
+    @param heads: Head collection from make_xlink_collections
+    @param segments: Array of segments from get_xlink_segments
+    @return: void
+
+    """
+    xlinks.set_segments(segments)
+    heads.set_offsets(segments.reshape(-1, 2))
+
+
+def draw_xlinks(ax, r_i, r_j, u_i, u_j, s_i_arr, s_j_arr, lw):
+    """!Draw all doubly bound crosslinks of a frame as one segment collection
+    and one head collection.
+
+    @param ax: Axis to draw in
+    @param r_i: Center of fil_i
+    @param r_j: Center of fil_j
+    @param u_i: Orientation of fil_i
+    @param u_j: Orientation of fil_j
+    @param s_i_arr: Distances of heads from the center of fil_i
+    @param s_j_arr: Distances of heads from the center of fil_j
+    @param lw: Width of crosslinks in data units
+    @return: (segment collection, head collection)
+
+    """
+    xlinks, heads = make_xlink_collections(ax, lw)
+    set_xlink_segments(xlinks, heads, get_xlink_segments(
+        r_i, r_j, u_i, u_j, s_i_arr, s_j_arr))
+    return xlinks, heads
+
+
+def get_rod_diagram_data(sd_data):
+    """!Get the frame-invariant data of the rod diagram of a seed: filament
+    lengths and positions in nm, orientations, the square box holding the
+    rods of every frame and times in seconds. Computed once per seed and kept
+    on the SeedData, so drawing a frame only touches the data of that frame.
+
+    @param sd_data: SeedData of the seed
+    @return: Dictionary of rod diagram data
+
+    """
+    if sd_data.rod_diagram_data is not None:
+        return sd_data.rod_diagram_data
+
     L_i, L_j = sd_data.h5_data['filament_data'].attrs['lengths'] * nm
-    lw = 1. * nm
     r_i_arr = sd_data.r_i_arr * nm
     r_j_arr = sd_data.r_j_arr * nm
     u_i_arr = sd_data.u_i_arr
     u_j_arr = sd_data.u_j_arr
 
-    xl_dbl_dset = sd_data.h5_data['xl_data/doubly_bound']
-
-    draw_rod(ax, r_i_arr[n], u_i_arr[n], L_i, lw, color='tab:green')
-    draw_rod(ax, r_j_arr[n], u_j_arr[n], L_j, lw, color='tab:purple')
-    # if anal.OT1_pos is not None or anal.OT2_pos is not None:
-    #     labels += ["Optical trap", "Bead"]
-
     # Get all extreme positions of tips in the first dimension to maintain
     # consistent graphing size
     x_ends = get_max_min_ends(
@@ -179,17 +249,57 @@ def graph_2d_rod_diagram(ax, sd_data, n=-1):
     min_x = min(x_ends + y_ends)
     min_x = min_x * 1.25 if min_x < 0 else .75 * min_x
 
-    # Make a square box always
-    max_y = max_x
-    min_y = min_x
+    sd_data.rod_diagram_data = {
+        'lengths': (L_i, L_j),
+        'lw': 1. * nm,
+        'r_arrs': (r_i_arr, r_j_arr),
+        'u_arrs': (u_i_arr, u_j_arr),
+        # Make a square box always
+        'lims': (min_x, max_x),
+        'time_sec': sd_data.time * sec,
+        'xl_dbl_dset': sd_data.h5_data['xl_data/doubly_bound'],
+    }
+    return sd_data.rod_diagram_data
+
+
+def set_rod_diagram_axis(ax, rd_data):
+    """!Set the limits and labels of a rod diagram axis
 
-    ax.set_xlim(min_x, max_x)
-    ax.set_ylim(min_y, max_y)
+    @param ax: Axis of the rod diagram
+    @param rd_data: Dictionary from get_rod_diagram_data
+    @return: void
+
+    """
+    ax.set_xlim(*rd_data['lims'])
+    ax.set_ylim(*rd_data['lims'])
     ax.set_xlabel(r'x (nm)')
     ax.set_ylabel(r'y (nm)')
 
+
+def graph_2d_rod_diagram(ax, sd_data, n=-1):
+    """!Draw the filaments and doubly bound crosslinks of a frame
+
+    @param ax: Axis to draw in
+    @param sd_data: SeedData of the seed
+    @param n: Frame index
+    @return: void
+
+    """
+    rd_data = get_rod_diagram_data(sd_data)
+    (L_i, L_j), lw = rd_data['lengths'], rd_data['lw']
+    (r_i_arr, r_j_arr), (u_i_arr, u_j_arr) = (rd_data['r_arrs'],
+                                              rd_data['u_arrs'])
+    xl_dbl_dset = rd_data['xl_dbl_dset']
+
+    draw_rod(ax, r_i_arr[n], u_i_arr[n], L_i, lw, color='tab:green')
+    draw_rod(ax, r_j_arr[n], u_j_arr[n], L_j, lw, color='tab:purple')
+    # if anal.OT1_pos is not None or anal.OT2_pos is not None:
+    #     labels += ["Optical trap", "Bead"]
+
+    set_rod_diagram_axis(ax, rd_data)
+
     # labels = ["fil$_i$", "fil$_j$", "Plus-end"]
-    ax.text(.05, .90, "Time = {:.2f} sec".format(sd_data.time[n] * sec),
+    ax.text(.05, .90, "Time = {:.2f} sec".format(rd_data['time_sec'][n]),
             horizontalalignment='left',
             verticalalignment='bottom',
             transform=ax.transAxes)
@@ -198,38 +308,189 @@ def graph_2d_rod_diagram(ax, sd_data, n=-1):
                 xl_dbl_dset[n, 0] * nm, xl_dbl_dset[n, 1] * nm, .4 * lw)
 
 
-def sc_graph_all_data_2d(n, fig, axarr, sc_data):
-    print("frame =", n)
-    # Clean up if lines
-    if not sc_data.init_flag:
-        for ax in axarr.flatten():
-            ax.clear()
-        for artist in fig.gca().lines + fig.gca().collections:
-            artist.remove()
-            del artist
-
-    graph_2d_rod_diagram(axarr[0], sc_data, n)
-    cb = graph_frame_xlink_distr(
-        axarr[1], sc_data, n, sc_data.xl_dbl_distr_max)
-
-    if sc_data.init_flag:
-        axarr[0].set_aspect(1.0)
+class SeedFrameArtists():
+
+    """!Rod diagram and doubly bound crosslink distribution of a seed drawn
+    with artists that are made once and updated in place for every frame.
+    Axes, labels and the colorbar are drawn once and the figure layout is
+    frozen after the first draw, so only the changing artists cost time per
+    frame and blitting can reuse the static background."""
+
+    def __init__(self, fig, axarr, sd_data):
+        """!Make the artists of a seed figure
+
+        @param fig: Figure to draw in
+        @param axarr: Array of axes, the rod diagram is drawn in the first and
+                      the crosslink distribution in the second
+        @param sd_data: SeedData of the seed
+
+        """
+        self.fig = fig
+        self.axes = axarr[:2]
+        self.sd_data = sd_data
+        self._background = None
+        rd_data = get_rod_diagram_data(sd_data)
+        self.lengths = rd_data['lengths']
+        self.lw = rd_data['lw']
+        self.r_arrs = rd_data['r_arrs']
+        self.u_arrs = rd_data['u_arrs']
+        self.time_sec = rd_data['time_sec']
+        self.xl_dbl_dset = rd_data['xl_dbl_dset']
+
+        ax = axarr[0]
+        set_rod_diagram_axis(ax, rd_data)
+        ax.set_aspect(1.0)
+
+        self.rods = []
+        self.tips = []
+        for color in ('tab:green', 'tab:purple'):
+            rod = LineDataUnits([], [], linewidth=self.lw,
+                                solid_capstyle='round', color=color,
+                                clip_on=False)
+            tip = Circle((0., 0.), .5 * self.lw, color='b', zorder=3)
+            ax.add_line(rod)
+            ax.add_patch(tip)
+            self.rods += [rod]
+            self.tips += [tip]
+        self.xlinks, self.heads = make_xlink_collections(ax, .4 * self.lw)
+        self.time_text = ax.text(.05, .90, "", horizontalalignment='left',
+                                 verticalalignment='bottom',
+                                 transform=ax.transAxes)
+
+        self.distr = graph_frame_xlink_distr(axarr[1], sd_data, 0,
+                                             sd_data.xl_dbl_distr_max)
         axarr[1].set_aspect(1.0)
-        fig.colorbar(cb, ax=axarr[1])
+        fig.colorbar(self.distr, ax=axarr[1])
+
+        # Lay out the figure once with the largest time label
+        self.update(int(np.argmax(self.time_sec)))
+        fig.canvas.draw()
+        fig.set_layout_engine('none')
+
+    @property
+    def artists(self):
+        """!Artists that change between frames"""
+        return (self.rods + self.tips +
+                [self.xlinks, self.heads, self.time_text, self.distr])
+
+    def update(self, n):
+        """!Update the artists to a frame
+
+        @param n: Frame index
+        @return: List of updated artists
+
+        """
+        for rod, tip, r_arr, u_arr, L in zip(self.rods, self.tips,
+                                             self.r_arrs, self.u_arrs,
+                                             self.lengths):
+            r_vec, u_vec = r_arr[n], u_arr[n]
+            rod.set_data((r_vec[1] - .5 * L * u_vec[1],
+                          r_vec[1] + .5 * L * u_vec[1]),
+                         (r_vec[2] - .5 * L * u_vec[2],
+                          r_vec[2] + .5 * L * u_vec[2]))
+            tip.set_center((r_vec[1] + .5 * L * u_vec[1],
+                            r_vec[2] + .5 * L * u_vec[2]))
+
+        set_xlink_segments(self.xlinks, self.heads, get_xlink_segments(
+            self.r_arrs[0][n], self.r_arrs[1][n],
+            self.u_arrs[0][n], self.u_arrs[1][n],
+            self.xl_dbl_dset[n, 0] * nm, self.xl_dbl_dset[n, 1] * nm))
+
+        self.time_text.set_text(
+            "Time = {:.2f} sec".format(self.time_sec[n]))
+        self.distr.set_array(self.sd_data.xl_dbl_distr_arr[n].T)
+        return self.artists
+
+    def blit(self, n):
+        """!Draw a frame by restoring the static background of the figure and
+        drawing only the artists that change. The background is saved on the
+        first call.
+
+        @param n: Frame index
+        @return: void
+
+        """
+        canvas = self.fig.canvas
+        if self._background is None:
+            for artist in self.artists:
+                artist.set_animated(True)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+        canvas.restore_region(self._background)
+        for artist in sorted(self.update(n), key=lambda a: a.get_zorder()):
+            self.fig.draw_artist(artist)
+        # Spines are cheap to draw and must stay above the changing artists
+        for ax in self.axes:
+            for spine in ax.spines.values():
+                self.fig.draw_artist(spine)
+        canvas.blit(self.fig.bbox)
+
+
+def sc_graph_all_data_2d(n, fig, axarr, sc_data):
+    # Artists are made for the first frame of a figure and updated in place
+    # afterwards
+    frame_artists = sc_data.frame_artists
+    if (sc_data.init_flag or frame_artists is None or
+            frame_artists.fig is not fig or
+            any(a is not b for a, b in zip(frame_artists.axes, axarr[:2]))):
+        sc_data.frame_artists = SeedFrameArtists(fig, axarr, sc_data)
         sc_data.init_flag = False
 
-    return fig.gca().lines + fig.gca().collections
+    return sc_data.frame_artists.update(n)
 
 
-def graph_frame_xlink_distr(ax, sd_data, n=-1, max_val=1):
-    """!TODO: Docstring for graph_frame_xlink_distr.
+def is_uniform_grid(edges, rtol=1e-6):
+    """!Check whether bin edges are evenly spaced
 
-    @param sd_data: TODO
-    @return: TODO
+    @param edges: Increasing array of bin edges
+    @return: True if all bins have the same width
+
+    """
+    widths = np.diff(edges)
+    return widths.size > 0 and np.allclose(widths, widths[0],
+                                           rtol=rtol, atol=0)
+
+
+def graph_heatmap(ax, x_edges, y_edges, vals, rasterized=False, **kwargs):
+    """!Draw a 2D histogram. Uniform grids are drawn as a single raster
+    image, which draws and saves much faster than a mesh of quadrilaterals
+    at fine binning. Other grids fall back on pcolormesh.
+
+    @param ax: Axes to draw in
+    @param x_edges: Bin edges along x
+    @param y_edges: Bin edges along y
+    @param vals: Array (len(y_edges) - 1, len(x_edges) - 1) of bin values
+    @param rasterized: Rasterize a pcolormesh in vector outputs. Images are
+                       always embedded as rasters.
+    @param kwargs: Arguments passed to imshow or pcolormesh, e.g. vmin, cmap
+    @return: AxesImage or QuadMesh
 
     """
-    cb = ax.pcolormesh(sd_data.fil_bins * nm, sd_data.fil_bins * nm,
-                       sd_data.xl_dbl_distr_arr[n].T, vmin=0, vmax=max_val)
+    if is_uniform_grid(x_edges) and is_uniform_grid(y_edges):
+        # Keep the aspect of the axes like pcolormesh does
+        return ax.imshow(vals, origin='lower', interpolation='nearest',
+                         extent=(x_edges[0], x_edges[-1],
+                                 y_edges[0], y_edges[-1]),
+                         aspect=ax.get_aspect(), rasterized=rasterized,
+                         **kwargs)
+    return ax.pcolormesh(x_edges, y_edges, vals, rasterized=rasterized,
+                         **kwargs)
+
+
+def graph_frame_xlink_distr(ax, sd_data, n=-1, max_val=1, rasterized=False):
+    """!Draw the doubly bound crosslink distribution of a frame
+
+    @param ax: Axes to draw in
+    @param sd_data: SeedData of the seed
+    @param n: Frame index
+    @param max_val: Top of the color scale
+    @param rasterized: Rasterize the heatmap in vector outputs
+    @return: Heatmap artist
+
+    """
+    cb = graph_heatmap(ax, sd_data.fil_bins * nm, sd_data.fil_bins * nm,
+                       sd_data.xl_dbl_distr_arr[n].T, vmin=0, vmax=max_val,
+                       rasterized=rasterized)
     ax.set_xlabel(
         'Head distance from \n center of fil$_i$ $s_i$ (nm)')
     ax.set_ylabel(
@@ -237,33 +498,30 @@ def graph_frame_xlink_distr(ax, sd_data, n=-1, max_val=1):
     return cb
 
 
-def graph_avg_xlink_distr(h5_data, fig, ax):
-    """!TODO: Docstring for graph_avg_xlink_distr.
-
-    Parameters
-    ----------
-    h5_data : TODO
-    fig : TODO
-    ax : TODO
+def graph_avg_xlink_distr(h5_data, fig, ax, bin_num=120, rasterized=False):
+    """!Draw the doubly bound crosslink distribution averaged over time
 
-    Returns
-    -------
-    TODO
+    @param h5_data: h5 file of the seed
+    @param fig: Figure of the colorbar
+    @param ax: Axes to draw in
+    @param bin_num: Number of bin edges along each filament
+    @param rasterized: Rasterize the heatmap in vector outputs
+    @return: Heatmap artist
 
     """
     length = h5_data['filament_data'].attrs['lengths'][0]
-    fil_bins = np.linspace(-.5 * length, .5 * length, 120)
+    fil_bins = np.linspace(-.5 * length, .5 * length, bin_num)
 
-    print(fil_bins)
     # Combine all time data to get an average density
     dbl_xlink_dset = h5_data['xl_data/doubly_bound']
-    print(dbl_xlink_dset.shape[0])
-    fil0_lambdas = np.asarray(flatten_dset(dbl_xlink_dset[:, 0]))
-    fil1_lambdas = np.asarray(flatten_dset(dbl_xlink_dset[:, 1]))
+    dbl_xlinks = dbl_xlink_dset[...]
+    fil0_lambdas = np.concatenate(dbl_xlinks[:, 0])
+    fil1_lambdas = np.concatenate(dbl_xlinks[:, 1])
     dbl_2D_distr, xedges, yedges = np.histogram2d(
         fil0_lambdas, fil1_lambdas, fil_bins)
-    print(dbl_2D_distr)
     ax.set_aspect('equal')
-    cf = ax.pcolormesh(fil_bins, fil_bins,
-                       dbl_2D_distr.T / dbl_xlink_dset.shape[0])
+    cf = graph_heatmap(ax, fil_bins, fil_bins,
+                       dbl_2D_distr.T / dbl_xlink_dset.shape[0],
+                       rasterized=rasterized)
     fig.colorbar(cf, ax=ax)
+    return cf
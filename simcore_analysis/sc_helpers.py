@@ -8,6 +8,7 @@ Description:
 """
 
 import numpy as np
+import yaml
 
 SQRT_PI = np.sqrt(np.pi)
 sec = .0358  # sec
@@ -67,4 +68,25 @@ def find_start_time(arr, reps=1):
     return start_time
 
 
+def get_param_from_dict(h5_data, param, spec=None):
+    """!Get the value of a run parameter from an analyzed h5 file
+
+    @param h5_data: Analyzed h5 file. Species parameters are read from the
+                    parameter file stored in its param_file attribute.
+    @param param: Name of the parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink', or None
+                 for a top level parameter stored as an attribute of h5_data
+    @return: Value of the parameter. For species parameters this is the value
+             of the first species of that kind in the parameter file.
+
+    """
+    if spec is None:
+        return h5_data.attrs[param]
+    else:
+        param_dict = yaml.safe_load(h5_data.attrs['param_file'])
+        # A little cludgy because you only check the parameters of the first
+        # in the list in a given species.
+        return param_dict[spec][0][param]
+
+
 ##########################################
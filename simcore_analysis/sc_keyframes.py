@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_keyframes.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Choose the frames of seed movies by how much the seed changes
+between output frames. Each frame is scored by filament displacement and
+rotation and by the change in the number and mean position of doubly bound
+crosslinks since the previous frame. Frames are then spaced evenly in
+accumulated change, so busy stretches of a run get more frames than
+quiescent ones.
+"""
+
+import numpy as np
+
+
+def get_frame_changes(h5_data):
+    """!Measure the change of a seed from each output frame to the next
+
+    @param h5_data: h5 file of an analyzed seed
+    @return: Array (n_frames - 1, 4) of filament displacement, filament
+             rotation, change in doubly bound crosslink number and change in
+             mean crosslink head position
+
+    """
+    fil_pos = h5_data['filament_data/filament_position'][...]
+    fil_orient = h5_data['filament_data/filament_orientation'][...]
+    # Summed over the (time, dim, filament) arrays of both filaments
+    disp = np.linalg.norm(np.diff(fil_pos, axis=0), axis=1).sum(axis=-1)
+    cos_ang = np.einsum('tdf,tdf->tf', fil_orient[1:], fil_orient[:-1])
+    cos_ang /= (np.linalg.norm(fil_orient[1:], axis=1) *
+                np.linalg.norm(fil_orient[:-1], axis=1))
+    rot = np.arccos(np.clip(cos_ang, -1., 1.)).sum(axis=-1)
+
+    if 'analysis/xl_zeroth_moment' in h5_data:
+        dbl_num = h5_data['analysis/xl_zeroth_moment'][...].astype(float)
+        first_mom = h5_data['analysis/xl_first_moments'][...]
+    else:
+        dbl_xlink = h5_data['xl_data/doubly_bound'][...]
+        dbl_num = np.asarray([heads.size for heads in dbl_xlink[:, 0]],
+                             dtype=float)
+        first_mom = np.asarray([[np.sum(heads[0]), np.sum(heads[1])]
+                                for heads in dbl_xlink])
+    mean_pos = first_mom / np.maximum(dbl_num, 1.)[:, None]
+    d_num = np.abs(np.diff(dbl_num))
+    d_pos = np.linalg.norm(np.diff(mean_pos, axis=0), axis=1)
+    return np.stack((disp, rot, d_num, d_pos), axis=-1)
+
+
+def get_frame_scores(h5_data):
+    """!Score frames by how much the seed changed since the previous frame.
+    Each kind of change is normalized by its total over the run so they weigh
+    equally whatever their units. Kinds that never change are left out.
+
+    @param h5_data: h5 file of an analyzed seed
+    @return: Array of scores for frames 1 to n_frames - 1 that sums to 1, or
+             to 0 if nothing changes
+
+    """
+    changes = get_frame_changes(h5_data)
+    totals = changes.sum(axis=0)
+    changing = totals > 0
+    if not changing.any():
+        return np.zeros(changes.shape[0])
+    return (changes[:, changing] / totals[changing]).mean(axis=-1)
+
+
+def select_keyframes(h5_data, n_keyframes=100, uniform_frac=.25):
+    """!Choose frames for a movie of a seed. Frames are spaced evenly in
+    accumulated score, mixed with a uniform share so quiescent stretches are
+    not skipped entirely. The first and last frames are always included and
+    runs with no more frames than n_keyframes keep all of them.
+
+    @param h5_data: h5 file of an analyzed seed
+    @param n_keyframes: Number of frames to choose
+    @param uniform_frac: Share of the weight spread evenly over time
+    @return: Increasing array of frame indices
+
+    """
+    n_frames = h5_data['filament_data/time'].shape[0]
+    if n_frames <= max(n_keyframes, 2):
+        return np.arange(n_frames)
+    n_keyframes = max(n_keyframes, 2)
+    weights = ((1. - uniform_frac) * get_frame_scores(h5_data) +
+               uniform_frac / (n_frames - 1))
+    # Accumulated change up to each frame, 0 at the first frame
+    cum_weights = np.concatenate(([0.], np.cumsum(weights)))
+    targets = np.linspace(0., cum_weights[-1], n_keyframes)
+    frames = np.union1d(np.searchsorted(cum_weights, targets),
+                        [0, n_frames - 1])
+    n_missing = n_keyframes - frames.size
+    if n_missing > 0:
+        # Bursts map several targets to one frame, fill up with the frames
+        # that changed the most of those not chosen yet
+        by_weight = np.argsort(-weights, kind='stable') + 1
+        unused = by_weight[~np.isin(by_weight, frames)]
+        frames = np.union1d(frames, unused[:n_missing])
+    return frames
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_lazy.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Optional lazy array backend for seed and parameter scans. When
+enabled, per-seed datasets are wrapped as chunked dask arrays stacked along a
+leading seed (and parameter) axis instead of being loaded with numpy, and
+reductions are computed out-of-core in parallel on the local threaded
+scheduler. Requires dask, which is only imported when the backend is enabled.
+"""
+
+import numpy as np
+
+# Settings of the array backend used by seed scan reductions
+ARRAY_BACKEND = {'lazy': False, 'chunks': 'auto', 'num_workers': None}
+
+
+def import_dask_array():
+    """!Import dask.array
+    @return: dask.array module
+
+    """
+    try:
+        import dask.array as da
+    except ImportError as err:
+        raise ImportError("The lazy array backend requires dask, install it "
+                          "with 'pip install dask[array]'.") from err
+    return da
+
+
+def set_lazy_backend(lazy=True, chunks='auto', num_workers=None):
+    """!Turn the lazy array backend on or off
+
+    @param lazy: Use dask arrays for seed scan reductions
+    @param chunks: Chunk shape of datasets that are not chunked in their h5
+                   file, in any form dask.array.from_array accepts
+    @param num_workers: Number of threads used to compute reductions.
+                        Defaults to the cpu count.
+    @return: void
+
+    """
+    if lazy:
+        import_dask_array()
+    ARRAY_BACKEND.update(lazy=lazy, chunks=chunks, num_workers=num_workers)
+
+
+def is_lazy(arr):
+    """!Check if an array is a dask array"""
+    return type(arr).__module__.startswith('dask')
+
+
+def lazy_dset(dset):
+    """!Wrap an h5 dataset as a dask array without reading it. Chunks follow
+    the chunks of the dataset in its file when it has them.
+
+    @param dset: h5py dataset
+    @return: dask array
+
+    """
+    da = import_dask_array()
+    chunks = dset.chunks if dset.chunks is not None else \
+        ARRAY_BACKEND['chunks']
+    return da.from_array(dset, chunks=chunks, name=False)
+
+
+def stack_seed_dsets(h5_data_lst, dset_path, index=None, lazy=None):
+    """!Stack a dataset of every seed along a new leading seed axis
+
+    @param h5_data_lst: List of seed h5 files
+    @param dset_path: Path of dataset in each seed file
+    @param index: Index along the second axis of the dataset to keep, or None
+                  to keep the whole dataset
+    @param lazy: Return a dask array. Defaults to the backend setting.
+    @return: numpy or dask array with shape (n_seeds,) + dataset shape
+
+    """
+    if lazy is None:
+        lazy = ARRAY_BACKEND['lazy']
+    if lazy:
+        da = import_dask_array()
+        arrs = [lazy_dset(h5d[dset_path]) for h5d in h5_data_lst]
+        if index is not None:
+            arrs = [arr[:, index] for arr in arrs]
+        return da.stack(arrs)
+    if index is None:
+        return np.asarray([h5d[dset_path][...] for h5d in h5_data_lst])
+    return np.asarray([h5d[dset_path][:, index] for h5d in h5_data_lst])
+
+
+def stack_param_scan_dsets(h5_data_lsts, dset_path, index=None):
+    """!Stack a dataset of every seed of every parameter point into one lazy
+    array. Every parameter point must have the same number of seeds and
+    frames.
+
+    @param h5_data_lsts: List of lists of seed h5 files, one per parameter
+    @param dset_path: Path of dataset in each seed file
+    @param index: Index along the second axis of the dataset to keep
+    @return: dask array with shape (n_params, n_seeds) + dataset shape
+
+    """
+    da = import_dask_array()
+    arrs = [stack_seed_dsets(h5_data_lst, dset_path, index, lazy=True)
+            for h5_data_lst in h5_data_lsts]
+    if len(set(arr.shape for arr in arrs)) > 1:
+        raise ValueError("Parameter points of {} have different numbers of "
+                         "seeds or frames.".format(dset_path))
+    return da.stack(arrs)
+
+
+def compute(*arrs):
+    """!Compute dask arrays on the local threaded scheduler in one pass, so
+    data shared between them is only read once. numpy arrays are returned
+    unchanged.
+
+    @param arrs: numpy or dask arrays
+    @return: Tuple of numpy arrays
+
+    """
+    if not any(is_lazy(arr) for arr in arrs):
+        return arrs
+    import dask
+    return dask.compute(*arrs, scheduler='threads',
+                        num_workers=ARRAY_BACKEND['num_workers'])
+
+
+def seed_mean_std(arr, axis=0):
+    """!Mean and standard deviation over seeds
+
+    @param arr: numpy or dask array with seeds along axis
+    @param axis: Seed axis
+    @return: mean, std as numpy arrays
+
+    """
+    return compute(arr.mean(axis=axis), arr.std(axis=axis))
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_param_index.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Index of the parameters of h5 files in a parameter scan. The
+parameter yaml of each file is parsed once and stored as flattened columns in
+a json file next to the data. Entries are refreshed when a file changes.
+"""
+
+import os
+import json
+from pathlib import Path
+import yaml
+import h5py
+
+INDEX_NAME = '.param_index.json'
+
+
+def flatten_param_dict(p_dict):
+    """!Flatten a CGLASS parameter dictionary into a single level dictionary.
+    Species parameters are stored as 'species.param' for the first member of
+    the species list, matching get_param_from_dict, and as
+    'species.name.param' for every named member.
+
+    @param p_dict: Parameter dictionary loaded from yaml
+    @return: Flattened dictionary of scalar parameters
+
+    """
+    flat_dict = {}
+    for key, val in p_dict.items():
+        if isinstance(val, list):
+            for i, spec_dict in enumerate(val):
+                if not isinstance(spec_dict, dict):
+                    continue
+                name = spec_dict.get('name', None)
+                for s_key, s_val in spec_dict.items():
+                    if isinstance(s_val, (list, dict)):
+                        continue
+                    if i == 0:
+                        flat_dict['{}.{}'.format(key, s_key)] = s_val
+                    if name is not None:
+                        flat_dict['{}.{}.{}'.format(key, name, s_key)] = s_val
+        elif not isinstance(val, dict):
+            flat_dict[key] = val
+    return flat_dict
+
+
+def get_param_key(param, spec=None):
+    """!Get the column name of a parameter in the index
+
+    @param param: Parameter name
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @return: Column name
+
+    """
+    return param if not spec else '{}.{}'.format(spec, param)
+
+
+class ParamIndex():
+
+    """!Cached index of flattened parameters of the h5 files in a directory."""
+
+    def __init__(self, dir_path, pattern='*/*.h5', index_name=INDEX_NAME):
+        """!Load the index of dir_path and bring it up to date
+
+        @param dir_path: Directory holding the parameter directories
+        @param pattern: Glob pattern of indexed h5 files relative to dir_path
+        @param index_name: Name of the index file in dir_path
+
+        """
+        self._dir_path = Path(dir_path)
+        self._pattern = pattern
+        self._index_path = self._dir_path / index_name
+        self.entries = self.load()
+        self.update()
+
+    def load(self):
+        """!Load stored entries, or start a new index if there are none.
+        @return: Dictionary of entries keyed by path relative to dir_path
+
+        """
+        try:
+            with open(self._index_path, 'r') as inf:
+                index = json.load(inf)
+            if index.get('pattern') == self._pattern:
+                return index['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        """!Write the index. Writes to a temporary file and renames it so other
+        processes never read a partial index.
+        @return: void
+
+        """
+        tmp_path = self._index_path.with_name(
+            '{}.{}.tmp'.format(self._index_path.name, os.getpid()))
+        try:
+            with open(tmp_path, 'w') as outf:
+                json.dump({'pattern': self._pattern,
+                           'entries': self.entries}, outf)
+            os.replace(tmp_path, self._index_path)
+        except OSError:
+            print("!!! Could not write parameter index {} !!!".format(
+                self._index_path))
+
+    def update(self):
+        """!Re-parse files that are new or changed since they were indexed and
+        drop files that no longer exist.
+        @return: True if the index changed
+
+        """
+        changed = False
+        entries = {}
+        for h5_path in sorted(self._dir_path.glob(self._pattern)):
+            rel_path = str(h5_path.relative_to(self._dir_path))
+            stat = h5_path.stat()
+            entry = self.entries.get(rel_path)
+            if (entry is None or entry['mtime_ns'] != stat.st_mtime_ns
+                    or entry['size'] != stat.st_size):
+                with h5py.File(h5_path, 'r') as h5_data:
+                    p_dict = yaml.safe_load(h5_data.attrs['param_file'])
+                entry = {'mtime_ns': stat.st_mtime_ns,
+                         'size': stat.st_size,
+                         'params': flatten_param_dict(p_dict)}
+                changed = True
+            entries[rel_path] = entry
+        changed = changed or (len(entries) != len(self.entries))
+        self.entries = entries
+        if changed:
+            self.save()
+        return changed
+
+    @property
+    def paths(self):
+        """!Paths of all indexed files"""
+        return [self._dir_path / rel_path for rel_path in self.entries]
+
+    def get(self, h5_path, param, spec=None):
+        """!Get a parameter of an indexed file
+
+        @param h5_path: Path of h5 file
+        @param param: Parameter name
+        @param spec: Species the parameter belongs to, e.g. 'crosslink'
+        @return: Parameter value
+
+        """
+        rel_path = str(Path(h5_path).relative_to(self._dir_path))
+        return self.entries[rel_path]['params'][get_param_key(param, spec)]
+
+    def has(self, h5_path, param, spec=None):
+        """!Check if an indexed file sets a parameter
+
+        @param h5_path: Path of h5 file
+        @param param: Parameter name
+        @param spec: Species the parameter belongs to, e.g. 'crosslink'
+        @return: True if the parameter is in the file's parameters
+
+        """
+        rel_path = str(Path(h5_path).relative_to(self._dir_path))
+        return get_param_key(param, spec) in self.entries[rel_path]['params']
+
+    def sort(self, param, spec=None, paths=None):
+        """!Sort files by a parameter. Files without the parameter are put
+        last, in path order.
+
+        @param param: Parameter name
+        @param spec: Species the parameter belongs to, e.g. 'crosslink'
+        @param paths: Paths to sort. Defaults to all indexed files.
+        @return: List of paths sorted by parameter value
+
+        """
+        if paths is None:
+            paths = self.paths
+        missing = sorted(p for p in paths if not self.has(p, param, spec))
+        if missing:
+            print("!!! {} of {} files do not set {}, sorted last !!!".format(
+                len(missing), len(paths), get_param_key(param, spec)))
+        return sorted((p for p in paths if self.has(p, param, spec)),
+                      key=lambda p: self.get(p, param, spec)) + missing
+
+    def filter(self, param, value, spec=None, paths=None):
+        """!Select files with a given parameter value
+
+        @param param: Parameter name
+        @param value: Parameter value, or function of the value that returns
+                      True for files to keep. Files without the parameter are
+                      never kept.
+        @param spec: Species the parameter belongs to, e.g. 'crosslink'
+        @param paths: Paths to filter. Defaults to all indexed files.
+        @return: List of paths
+
+        """
+        if paths is None:
+            paths = self.paths
+        test = value if callable(value) else (lambda v: v == value)
+        return [p for p in paths
+                if self.has(p, param, spec) and test(self.get(p, param, spec))]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
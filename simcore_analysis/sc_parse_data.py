@@ -12,6 +12,8 @@ import yaml
 import h5py
 import re
 
+from .sc_profile import PROFILER, profile_stage
+
 HEADER_DT = np.dtype([('n_steps', np.int32),
                       ('n_posit', np.int32),
                       ('delta', np.double)])
@@ -43,6 +45,13 @@ FIL_DT = np.dtype([('pos', np.double, 3),
 
 SITE_DT = np.dtype([('pos', np.double, 3)])
 
+# Timings reported in CGLASS logs, e.g. 'CPU Time: 12.3'. Lines may have a
+# prefix such as a timestamp or log level, the name of the timing starts after
+# the last character of the prefix that is not a letter or a blank.
+TIMING_PATTERN = re.compile(
+    r'^(?:.*[^A-Za-z \t\n])?[ \t]*([A-Za-z][A-Za-z \t]*?)[ \t]+[Tt]ime:[ \t]*'
+    r'([0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?)[ \t]*$', re.MULTILINE)
+
 # FLEX_FIL_DT = np.dtype([()])
 
 OTRAP_DT = np.dtype([('pos', np.double, 3),
@@ -55,6 +64,7 @@ OTRAP_DT = np.dtype([('pos', np.double, 3),
                      ('attach_id', np.int32)])
 
 
+@profile_stage()
 def collect_data(h5_data, param_file_name):
     """!TODO: Docstring for collect_data.
 
@@ -67,23 +77,50 @@ def collect_data(h5_data, param_file_name):
     p_dict = yaml.safe_load(h5_data.attrs['param_file'])
     run_name = p_dict['run_name']
 
-    if isinstance(p_dict['rigid_filament'], list):
+    if isinstance(p_dict.get('rigid_filament'), list):
         rg_fil_grp = h5_data.create_group('rigid_filament_data')
         for fil_p_dict in p_dict['rigid_filament']:
             get_rigid_filament_data(rg_fil_grp, run_name, fil_p_dict)
-    if isinstance(p_dict['filament'], list):
+    if isinstance(p_dict.get('filament'), list):
         # fil_grp = h5_data.create_group('filament_data')
         for fil_p_dict in p_dict['filament']:
             print("WARNING: Flexible filament analysis not implemented yet.")
-    if isinstance(p_dict['crosslink'], list):
+    if isinstance(p_dict.get('crosslink'), list):
         xl_grp = h5_data.create_group('crosslink_data')
         for xl_p_dict in p_dict['crosslink']:
             get_xlink_data(xl_grp, run_name, p_dict, xl_p_dict)
-    if isinstance(p_dict['optical_trap'], list):
+    if isinstance(p_dict.get('optical_trap'), list):
         ot_grp = h5_data.create_group('optical_trap_data')
         for ot_p_dict in p_dict['optical_trap']:
             get_optical_trap_data(ot_grp, run_name, ot_p_dict)
             # print("WARNING: Optical trap analysis not implemented yet.")
+    link_analysis_groups(h5_data, p_dict)
+
+
+def link_analysis_groups(h5_data, p_dict):
+    """!Expose the first crosslink and rigid filament species under the names
+    the analysis reads, xl_data and filament_data. Datasets are soft links into
+    the collected species groups so no data is copied.
+
+    @param h5_data: hdf5 file with collected species data
+    @param p_dict: CGLASS parameter dictionary
+    @return: void, adds xl_data and filament_data to h5_data
+
+    """
+    if 'xl_data' not in h5_data and isinstance(p_dict.get('crosslink'), list):
+        h5_data['xl_data'] = h5py.SoftLink(
+            '/crosslink_data/' + p_dict['crosslink'][0]['name'])
+    if ('filament_data' not in h5_data and
+            isinstance(p_dict.get('rigid_filament'), list)):
+        rg_fil_path = ('/rigid_filament_data/' +
+                       p_dict['rigid_filament'][0]['name'])
+        fil_grp = h5_data.create_group('filament_data')
+        for key, val in h5_data[rg_fil_path].attrs.items():
+            fil_grp.attrs[key] = val
+        for name, rg_name in [('time', 'time'),
+                              ('filament_position', 'position'),
+                              ('filament_orientation', 'orientation')]:
+            fil_grp[name] = h5py.SoftLink(rg_fil_path + '/' + rg_name)
 
 
 def init_data_file(h5_data, param_file_name):
@@ -95,6 +132,7 @@ def init_data_file(h5_data, param_file_name):
                 h5_data.attrs[key] = val
 
 
+@profile_stage()
 def get_xlink_data(h5_data, run_name, param_dict, xl_p_dict):
     # Get data from xlink file
     # FIXME: Make it so that it knows the actual lengths of the filaments
@@ -110,6 +148,7 @@ def get_xlink_data(h5_data, run_name, param_dict, xl_p_dict):
         header = np.fromfile(xlf, HEADER_DT, count=1)[0]
         print(header)
         nframes = int(header[0] / header[1])
+        PROFILER.add_frames(nframes)
         xl_grp = h5_data.create_group(xl_name)
         xl_time_arr = np.arange(0, header[0], header[1]) * header[2]
         xl_grp.create_dataset('time', data=xl_time_arr)
@@ -148,6 +187,7 @@ def get_xlink_data(h5_data, run_name, param_dict, xl_p_dict):
         xl_dbl_dset[...] -= half_length
 
 
+@profile_stage()
 def get_rigid_filament_data(h5_data, run_name, fil_p_dict):
     """!Get data from rigid filament posit files. Includes lengths, mesh IDs,
     position, and orientations
@@ -173,6 +213,7 @@ def get_rigid_filament_data(h5_data, run_name, fil_p_dict):
 
         data_start = flf.tell()  # Save location of file right after header
         nframes = int(header[0] / header[1])  # Get number of frames to read
+        PROFILER.add_frames(nframes)
 
         # Get constant data that does not change. Lengths one day might change.
         fil_num = np.fromfile(flf, np.int32, count=1)[0]
@@ -205,6 +246,7 @@ def get_rigid_filament_data(h5_data, run_name, fil_p_dict):
                 fil_orient_dset[i, :, mesh_ids.index(mesh_id)] = fil['orient']
 
 
+@profile_stage()
 def get_optical_trap_data(h5_data, run_name, ot_p_dict):
     """!Get data from optical trap spec files
 
@@ -227,6 +269,7 @@ def get_optical_trap_data(h5_data, run_name, ot_p_dict):
         header = np.fromfile(otf, HEADER_DT, count=1)[0]
         print(header)
         nframes = int(header[0] / header[1])  # Get number of frames to read
+        PROFILER.add_frames(nframes)
 
         data_start = otf.tell()
 
@@ -266,19 +309,71 @@ def get_optical_trap_data(h5_data, run_name, ot_p_dict):
                 bead_pos_dset[i, :, attach_ids.index(attach_id)] = ot['bpos']
 
 
-def get_cpu_time_from_log(log_file):
-    """!TODO: Docstring for get_cpu_time_from_log.
-    @return: TODO
+def read_log_tail(log_file, n_bytes):
+    """!Read the last n_bytes of a log file. The first line is dropped if the
+    read starts in the middle of it.
+
+    @param log_file: Path to log file
+    @param n_bytes: Number of bytes to read from the end of the file
+    @return: (text, whole_file) where whole_file is True if the read reached
+             the start of the file
+
+    """
+    with open(log_file, 'rb') as lf:
+        lf.seek(0, 2)
+        size = lf.tell()
+        start = max(0, size - n_bytes)
+        lf.seek(start)
+        text = lf.read().decode('utf-8', errors='replace')
+    if start > 0:
+        text = text.split('\n', 1)[-1]
+    return text, start == 0
+
+
+def get_timings_from_log(log_file, tail_bytes=1 << 16, max_bytes=4 << 20):
+    """!Collect all timings of the form '<Name> Time: <seconds>' from the end
+    of a log file. The window read from the end of the file is doubled until
+    the CPU time and the timings reported with it are found, so large logs are
+    not scanned from the start. Logs of runs that never report a CPU time are
+    only read up to max_bytes from the end.
+
+    @param log_file: Path to log file
+    @param tail_bytes: Initial number of bytes read from the end of the file
+    @param max_bytes: Largest number of bytes read from the end of the file
+    @return: Dictionary of timings with snake case keys, e.g. 'cpu_time'.
+             Later occurrences of a timing overwrite earlier ones. Timings
+             outside the last max_bytes are missing.
 
     """
     if not log_file.exists():
-        raise OSError
+        raise OSError("Log file {} does not exist.".format(log_file))
+
+    n_bytes = min(tail_bytes, max_bytes)
+    while True:
+        text, whole_file = read_log_tail(log_file, n_bytes)
+        timings = {}
+        for match in TIMING_PATTERN.finditer(text):
+            key = '_'.join(match.group(1).lower().split()) + '_time'
+            timings[key] = float(match.group(2))
+        # Keep reading back while the window starts inside the block of
+        # timings so timings reported before the CPU time are not lost.
+        if whole_file or n_bytes >= max_bytes or (
+                'cpu_time' in timings and not TIMING_PATTERN.match(text)):
+            return timings
+        n_bytes = min(2 * n_bytes, max_bytes)
+
 
-    pattern = re.compile(r'CPU Time: ([0-9]*\.[0-9]+)?$')
-    with open(log_file, 'r') as lf:
-        cpu_t = [re.findall(pattern, line)[0]
-                 for line in lf if re.findall(pattern, line)][0]
-    return float(cpu_t)
+def get_cpu_time_from_log(log_file):
+    """!Get the CPU time of a run from its log file
+
+    @param log_file: Path to log file
+    @return: CPU time in seconds
+
+    """
+    timings = get_timings_from_log(log_file)
+    if 'cpu_time' not in timings:
+        raise ValueError("No CPU time found in {}.".format(log_file))
+    return timings['cpu_time']
 
 
 def parse_xlink_frame(xlink_data):
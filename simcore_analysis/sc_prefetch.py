@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_prefetch.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Prefetch data for the next items of a loop while the current item
+is being processed. A background thread loads items, in this process or in a
+helper process, into a bounded queue. The number of loaded items waiting in
+the queue is limited by a depth, and their total size by a memory cap.
+"""
+
+import threading
+import queue
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Default prefetch settings, changed with set_prefetch
+PREFETCH = {'depth': 2, 'max_bytes': 1 << 30, 'processes': False}
+
+
+def set_prefetch(depth=2, max_bytes=1 << 30, processes=False):
+    """!Change the default prefetch settings
+
+    @param depth: Number of items loaded ahead. 0 turns prefetching off.
+    @param max_bytes: Memory cap on loaded items waiting to be processed
+    @param processes: Load items in a helper process instead of a thread
+    @return: void
+
+    """
+    PREFETCH.update(depth=depth, max_bytes=max_bytes, processes=processes)
+
+
+def get_nbytes(data):
+    """!Estimate the memory used by loaded data. Counts numpy arrays, including
+    arrays of arrays, in nested tuples, lists and dictionaries.
+
+    @param data: Loaded data
+    @return: Number of bytes
+
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype == object:
+            return data.nbytes + sum(get_nbytes(d) for d in data.flat)
+        return data.nbytes
+    if isinstance(data, (list, tuple)):
+        return sum(get_nbytes(d) for d in data)
+    if isinstance(data, dict):
+        return sum(get_nbytes(d) for d in data.values())
+    return 0
+
+
+class Prefetcher():
+
+    """!Iterate over (item, load_func(item)) while the next items are loaded
+    in the background."""
+
+    _DONE = object()
+
+    def __init__(self, items, load_func, depth=None, max_bytes=None,
+                 processes=None):
+        """!Initialize prefetcher
+
+        @param items: Items to load
+        @param load_func: Function loading the data of an item. Must be
+                          picklable, as must items, when processes is True.
+        @param depth: Number of items loaded ahead. 0 loads each item when it
+                      is needed.
+        @param max_bytes: Memory cap on loaded items waiting to be processed.
+                          One item is always allowed so large items still go
+                          through.
+        @param processes: Load items in a helper process instead of a thread
+
+        """
+        self._items = list(items)
+        self._load_func = load_func
+        self.depth = PREFETCH['depth'] if depth is None else depth
+        self.max_bytes = (PREFETCH['max_bytes'] if max_bytes is None
+                          else max_bytes)
+        self.processes = (PREFETCH['processes'] if processes is None
+                          else processes)
+        self._queue = queue.Queue(maxsize=max(1, self.depth))
+        self._cond = threading.Condition()
+        self._queued_bytes = 0
+        self._stop = threading.Event()
+
+    def _wait_for_memory(self):
+        """!Wait until the queued data is below the memory cap
+        @return: False if iteration was stopped
+
+        """
+        with self._cond:
+            while (self._queued_bytes > 0 and
+                   self._queued_bytes >= self.max_bytes and
+                   not self._stop.is_set()):
+                self._cond.wait(.1)
+        return not self._stop.is_set()
+
+    def _put(self, entry):
+        """!Put an entry in the queue unless iteration was stopped"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        """!Load items into the queue. Runs in a background thread."""
+        executor = ProcessPoolExecutor(1) if self.processes else None
+        try:
+            for item in self._items:
+                if not self._wait_for_memory():
+                    return
+                try:
+                    if executor is not None:
+                        data = executor.submit(self._load_func,
+                                               item).result()
+                    else:
+                        data = self._load_func(item)
+                except BaseException as err:
+                    self._put((item, None, err, 0))
+                    return
+                nbytes = get_nbytes(data)
+                with self._cond:
+                    self._queued_bytes += nbytes
+                if not self._put((item, data, None, nbytes)):
+                    return
+            self._put(self._DONE)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def __iter__(self):
+        if self.depth <= 0:
+            for item in self._items:
+                yield item, self._load_func(item)
+            return
+
+        self._stop.clear()
+        thread = threading.Thread(target=self._produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                entry = self._queue.get()
+                if entry is self._DONE:
+                    return
+                item, data, err, nbytes = entry
+                if err is not None:
+                    raise err
+                with self._cond:
+                    self._queued_bytes -= nbytes
+                    self._cond.notify_all()
+                yield item, data
+        finally:
+            self._stop.set()
+            thread.join()
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_profile.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Stage profiler for the analysis pipeline. Ingest readers,
+analyses and aggregation steps are wrapped in named spans that record wall
+time, CPU time, growth in resident memory, bytes read and written, and
+frames processed. Spans nest, so stage names are paths like
+'analyze_seed/analyze_xlink_force'. Profiling is off unless enabled and then
+costs one flag check per stage.
+"""
+
+import os
+import json
+import time
+from functools import wraps
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Statistics recorded for every stage
+STAGE_KEYS = ['calls', 'wall_time', 'cpu_time', 'rss_growth',
+              'process_peak_rss', 'bytes_read', 'bytes_written', 'frames']
+
+
+def get_rss():
+    """!Get the current resident set size of this process
+    @return: RSS in bytes, nan if unknown
+
+    """
+    try:
+        with open('/proc/self/statm', 'r') as statf:
+            return int(statf.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError):
+        return np.nan
+
+
+def get_peak_rss():
+    """!Get the peak resident set size of this process since it started, not
+    of any one stage
+    @return: Peak RSS in bytes, nan if unknown
+
+    """
+    if resource is None:
+        return np.nan
+    # Linux reports ru_maxrss in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_io_bytes():
+    """!Get the number of bytes this process has read and written through
+    system calls, including reads served from the page cache.
+    @return: (bytes_read, bytes_written), nan if unknown
+
+    """
+    try:
+        with open('/proc/self/io', 'r') as iof:
+            io_dict = dict(line.split(':') for line in iof if ':' in line)
+        return int(io_dict['rchar']), int(io_dict['wchar'])
+    except (OSError, KeyError, ValueError):
+        return np.nan, np.nan
+
+
+class StageProfiler():
+
+    """!Accumulates resource usage of nested, named stages."""
+
+    def __init__(self, enabled=False):
+        """!Initialize an empty profile
+
+        @param enabled: Record stages. When False spans do nothing.
+
+        """
+        self.enabled = enabled
+        self.stages = {}
+        self._stack = []
+
+    def reset(self):
+        """!Forget all recorded stages
+        @return: void
+
+        """
+        self.stages = {}
+        self._stack = []
+
+    @contextmanager
+    def span(self, name):
+        """!Record the resources used inside a with block as stage name,
+        nested under any enclosing span. Repeated stages are accumulated.
+
+        @param name: Stage name
+        @return: void
+
+        """
+        if not self.enabled:
+            yield
+            return
+        self._stack += [name]
+        path = '/'.join(self._stack)
+        stage = self.stages.setdefault(path, dict.fromkeys(STAGE_KEYS, 0))
+        read0, write0 = get_io_bytes()
+        rss0 = get_rss()
+        cpu0 = time.process_time()
+        wall0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage['wall_time'] += time.perf_counter() - wall0
+            stage['cpu_time'] += time.process_time() - cpu0
+            read1, write1 = get_io_bytes()
+            stage['bytes_read'] += read1 - read0
+            stage['bytes_written'] += write1 - write0
+            # Memory the stage kept, largest over its calls. Memory it
+            # freed again before returning is not seen.
+            stage['rss_growth'] = max(stage['rss_growth'], get_rss() - rss0)
+            stage['process_peak_rss'] = max(stage['process_peak_rss'],
+                                            get_peak_rss())
+            stage['calls'] += 1
+            self._stack.pop()
+
+    def add_frames(self, n_frames):
+        """!Count frames processed by the innermost running stage
+
+        @param n_frames: Number of frames
+        @return: void
+
+        """
+        if self.enabled and self._stack:
+            self.stages['/'.join(self._stack)]['frames'] += int(n_frames)
+
+    def report(self):
+        """!Get the recorded stages with derived throughput
+        @return: Dictionary of stage statistics keyed by stage path
+
+        """
+        report = {}
+        for path, stage in self.stages.items():
+            report[path] = dict(stage)
+            report[path]['frames_per_sec'] = (
+                stage['frames'] / stage['wall_time']
+                if stage['frames'] and stage['wall_time'] > 0 else np.nan)
+        return report
+
+    def write_json(self, json_path):
+        """!Write the report to a json file
+
+        @param json_path: Path of json file
+        @return: void
+
+        """
+        # nan is not valid json so unknown values are written as null
+        report = {path: {key: (None if np.isnan(val) else val)
+                         for key, val in stage.items()}
+                  for path, stage in self.report().items()}
+        with open(json_path, 'w') as outf:
+            json.dump(report, outf, indent=2)
+
+    def write_h5_attrs(self, h5_obj, grp_name='profile'):
+        """!Store the report as attributes of a group in an h5 file. Each stage
+        gets its own (nested) group.
+
+        @param h5_obj: h5 file or group to write into
+        @param grp_name: Name of the profile group
+        @return: void
+
+        """
+        if grp_name in h5_obj:
+            del h5_obj[grp_name]
+        prof_grp = h5_obj.create_group(grp_name)
+        for path, stage in self.report().items():
+            stage_grp = prof_grp.require_group(path)
+            for key, val in stage.items():
+                stage_grp.attrs[key] = val
+
+    def write_report(self, h5_obj=None, json_path=None):
+        """!Write the report to h5 attributes and a json file if profiling is
+        enabled.
+
+        @param h5_obj: Open h5 file or group to write into, or None
+        @param json_path: Path of json file, or None
+        @return: void
+
+        """
+        if not self.enabled:
+            return
+        if h5_obj is not None:
+            self.write_h5_attrs(h5_obj)
+        if json_path is not None:
+            self.write_json(Path(json_path))
+            print("PROFILE: Wrote stage profile to {}".format(json_path))
+
+
+# Profiler shared by the whole pipeline. Enabled by the --profile option.
+PROFILER = StageProfiler()
+
+
+def profile_stage(name=None):
+    """!Decorator recording every call of a function as a stage of PROFILER
+
+    @param name: Stage name. Defaults to the function name.
+    @return: Decorator
+
+    """
+    def decorator(func):
+        stage_name = name if name is not None else func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.span(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
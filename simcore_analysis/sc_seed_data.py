@@ -4,115 +4,249 @@
 File: seed_data.py
 Author: Adam Lamson
 Email: adam.lamson@colorado.edu
-Description:
+Description: Read-only access to the data of an analyzed seed for graphs and
+movies. Opening a seed only reads its parameters and dataset shapes. Filament
+arrays are read on first use and crosslink distributions of single frames are
+decoded on demand and kept in an LRU cache.
 """
+from collections import OrderedDict
+from functools import cached_property
 from pathlib import Path
 import h5py
 import yaml
 import numpy as np
-from .sc_graphs import sc_graph_all_data_2d
+
+
+class FrameCache():
+
+    """!LRU cache of data decoded frame by frame, indexed like an array of
+    frames."""
+
+    def __init__(self, load_func, n_frames, maxsize=128):
+        """!Initialize cache
+
+        @param load_func: Function decoding the data of a frame index
+        @param n_frames: Number of frames, used to wrap negative indices
+        @param maxsize: Number of decoded frames kept
+
+        """
+        self._load_func = load_func
+        self._n_frames = n_frames
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self._n_frames
+
+    def __contains__(self, n):
+        return int(n) % self._n_frames in self._cache
+
+    def __getitem__(self, n):
+        n = int(n) % self._n_frames
+        if n in self._cache:
+            self._cache.move_to_end(n)
+            return self._cache[n]
+        data = self._load_func(n)
+        self.put(n, data)
+        return data
+
+    def put(self, n, data):
+        """!Store the decoded data of a frame, evicting the least recently
+        used frames beyond maxsize."""
+        self._cache[int(n) % self._n_frames] = data
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def get_bin_index(vals, bin_edges):
+    """!Get the bins values fall in with the edge rules of np.histogram. The
+    last bin includes its right edge, values outside the edges get -1 or the
+    number of bins.
+
+    @param vals: Array of values
+    @param bin_edges: Increasing array of bin edges
+    @return: Array of bin indices
+
+    """
+    ind = np.searchsorted(bin_edges, vals, side='right')
+    ind[vals == bin_edges[-1]] -= 1
+    return ind - 1
 
 
 class SeedData():
 
-    """!Docstring for SeedData. """
+    """!Lazy, read-only data of an analyzed seed. Use as a context manager to
+    close the h5 file when done."""
 
-    def __init__(self, param_file, sd_path=Path('./')):
+    def __init__(self, param_file, sd_path=Path('./'), frames=None,
+                 cache_size=128, bin_num=120):
         """!Initialize with parameter file
 
         @param param_file: parameter file for simcore seed
+        @param sd_path: Directory of the seed
+        @param frames: Frames that will be used, e.g. the frames of a movie.
+                       Their crosslink distributions are decoded up front
+                       and the color scale only covers them. Defaults to
+                       all frames, decoded when needed.
+        @param cache_size: Number of decoded frames kept in memory
+        @param bin_num: Number of bin edges along each filament
 
         """
 
-        self._param_file = sd_path / param_file
+        self._param_file = Path(sd_path) / param_file
         with open(self._param_file, 'r') as pf:
             self.p_dict = yaml.safe_load(pf)
         self.run_name = self.p_dict['run_name']
-        self._h5_file = sd_path / '{}_data.h5'.format(self.run_name)
+        self._h5_file = Path(sd_path) / '{}_data.h5'.format(self.run_name)
         self.h5_data = self.load()
-        self.parse_data()
+        self.n_frames = self.h5_data['filament_data/time'].shape[0]
+
+        length = self.h5_data['filament_data'].attrs['lengths'][0]
+        self.fil_bins = np.linspace(-.5 * length, .5 * length, bin_num)
+
+        self.frames = (np.arange(self.n_frames) if frames is None else
+                       np.unique(np.asarray(frames) % self.n_frames))
+        self.xl_dbl_distr_arr = FrameCache(
+            self.get_xlink_distr, self.n_frames,
+            max(cache_size, 0 if frames is None else self.frames.size))
+        if frames is not None:
+            self.load_xlink_distrs(self.frames)
+
         self.init_flag = True
+        self.frame_artists = None
+        self.rod_diagram_data = None
+
+    def __enter__(self):
+        return self
 
-    def parse_data(self):
-        """!TODO: Docstring for _set_data.
-        @return: TODO
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def param_file(self):
+        """!Path to the parameter file of the seed"""
+        return self._param_file
+
+    @cached_property
+    def time(self):
+        return self.h5_data['filament_data/time'][...]
+
+    @cached_property
+    def _fil_pos(self):
+        return self.h5_data['filament_data/filament_position'][...]
+
+    @cached_property
+    def _fil_orient(self):
+        return self.h5_data['filament_data/filament_orientation'][...]
+
+    @property
+    def r_i_arr(self):
+        return self._fil_pos[:, :, 0]
+
+    @property
+    def r_j_arr(self):
+        return self._fil_pos[:, :, 1]
+
+    @property
+    def u_i_arr(self):
+        return self._fil_orient[:, :, 0]
+
+    @property
+    def u_j_arr(self):
+        return self._fil_orient[:, :, 1]
+
+    def get_xlink_distr(self, n):
+        """!Histogram the doubly bound crosslink heads of a frame
+
+        @param n: Frame index
+        @return: 2D histogram of head positions on fil_i and fil_j
 
         """
-        fil_grp = self.h5_data['filament_data']
-        self.time = fil_grp['time'][:]
+        dbl_xlink = self.h5_data['xl_data/doubly_bound'][n]
+        return np.histogram2d(dbl_xlink[0], dbl_xlink[1], self.fil_bins)[0]
 
-        self.r_i_arr = fil_grp['filament_position'][:, :, 0]
-        self.r_j_arr = fil_grp['filament_position'][:, :, 1]
-        self.u_i_arr = fil_grp['filament_orientation'][:, :, 0]
-        self.u_j_arr = fil_grp['filament_orientation'][:, :, 1]
+    def load_xlink_distrs(self, frames):
+        """!Decode the crosslink distributions of several frames with one read
+        into the frame cache
 
-        self.xl_dbl_distr_arr, self.fil_bins = self.analyze_xlink_distr()
-        self.xl_dbl_distr_max = np.amax(self.xl_dbl_distr_arr)
+        @param frames: Increasing array of frame indices
+        @return: void
+
+        """
+        dbl_xlink = self.h5_data['xl_data/doubly_bound'][list(frames)]
+        for n, heads in zip(frames, dbl_xlink):
+            self.xl_dbl_distr_arr.put(n, np.histogram2d(
+                heads[0], heads[1], self.fil_bins)[0])
+
+    @cached_property
+    def xl_dbl_distr_max(self):
+        """!Largest bin of the crosslink distributions of the used frames,
+        counted for all frames at once without building each histogram."""
+        if all(n in self.xl_dbl_distr_arr for n in self.frames):
+            return max((np.amax(self.xl_dbl_distr_arr[n])
+                        for n in self.frames), default=0.)
+        dset = self.h5_data['xl_data/doubly_bound']
+        dbl_xlink = (dset[...] if self.frames.size == self.n_frames
+                     else dset[list(self.frames)])
+        n_heads = np.asarray([heads.size for heads in dbl_xlink[:, 0]])
+        if n_heads.sum() == 0:
+            return 0.
+        nbins = self.fil_bins.size - 1
+        b_i = get_bin_index(np.concatenate(dbl_xlink[:, 0]), self.fil_bins)
+        b_j = get_bin_index(np.concatenate(dbl_xlink[:, 1]), self.fil_bins)
+        frame_ind = np.repeat(np.arange(n_heads.size), n_heads)
+        keep = (b_i >= 0) & (b_i < nbins) & (b_j >= 0) & (b_j < nbins)
+        if not keep.any():
+            return 0.
+        keys = (frame_ind[keep] * nbins + b_i[keep]) * nbins + b_j[keep]
+        return float(np.unique(keys, return_counts=True)[1].max())
 
     def analyze_xlink_distr(self, bin_num=120):
+        """!Histogram the doubly bound crosslink heads of every used frame
 
-        length = self.h5_data['filament_data'].attrs['lengths'][0]
-        fil_bins = np.linspace(-.5 * length, .5 * length, bin_num)
-
-        # print(fil_bins)
-        # Combine all time data to get an average density
-        dbl_xlink = self.h5_data['xl_data/doubly_bound'][...]
-        # print(dbl_xlink_dset.shape[0])
-        dbl_2D_distr = np.zeros((dbl_xlink.shape[0], bin_num - 1, bin_num - 1))
-        for n in range(dbl_xlink.shape[0]):
-            fil_i_lambdas = dbl_xlink[n, 0]
-            fil_j_lambdas = dbl_xlink[n, 1]
-            dbl_2D_distr[n], xedges, yedges = np.histogram2d(
-                fil_i_lambdas, fil_j_lambdas, fil_bins)
-        # print(dbl_2D_distr)
-        # ax.set_aspect('equal')
-        # cb = ax.pcolormesh(fil_bins, fil_bins,
-            # dbl_2D_distr.T)
-        return dbl_2D_distr, fil_bins
+        @param bin_num: Number of bin edges along each filament
+        @return: (array of histograms, bin edges)
+
+        """
+        if bin_num != self.fil_bins.size:
+            length = self.h5_data['filament_data'].attrs['lengths'][0]
+            self.fil_bins = np.linspace(-.5 * length, .5 * length, bin_num)
+            self.xl_dbl_distr_arr.clear()
+            self.__dict__.pop('xl_dbl_distr_max', None)
+        return (np.asarray([self.xl_dbl_distr_arr[n] for n in self.frames]),
+                self.fil_bins)
 
     def load(self):
-        """!Load h5_data file
+        """!Load h5_data file read-only so several processes and notebooks
+        can read the same seed.
         @return: h5_data file
 
         """
-        h5_data = h5py.File(self._h5_file, 'r+')
-        # if analysis_type != 'load' and ('xl_data' not in h5_data
-        #                                 or 'filament_data' not in h5_data):
-        #     print("ANALYSIS: Collecting data")
-        #     xl_name = p_dict['crosslink'][0]['name']
-        #     fil_name = p_dict['rigid_filament'][0]['name']
-        #     collect_data(h5_data,
-        #                  run_name + '_params.yaml',
-        #                  run_name + '_crosslink_' + xl_name + '.spec',
-        #                  run_name + '_rigid_filament_' + fil_name + '.posit')
-        # print("ANALYSIS: Analyzing data")
-        # analyze_seed(h5_data)
-        # # Get run time statistics if they exist
-        # time_anal_flag = p_dict.get('time_analysis', False)
-        # if time_anal_flag:
-        #     try:
-        #         cpu_time = get_cpu_time_from_log(Path(run_name + '.log'))
-        #         h5_data['analysis'].attrs['cpu_time'] = cpu_time
-        #     except BaseException:
-        #         print("ANALYSIS: !!! Could not collect time analysis !!!")
-        # except BaseException:
-        #     print("ANALYSIS-MOVIE: failed")
-        #     raise
-        # finally:
-        #     h5_data.close()
-        return h5_data
+        return h5py.File(self._h5_file, 'r')
 
     def animate(self, n, fig, axarr):
+        from .sc_graphs import sc_graph_all_data_2d
         gca_arts = sc_graph_all_data_2d(n, fig, axarr, self)
         return gca_arts
 
-    def save(self):
-        """!TODO: Docstring for save.
-        @return: TODO
+    def close(self):
+        """!Close the h5 file of the seed
+        @return: void
 
         """
         self.h5_data.close()
 
+    def save(self):
+        """!Close the h5 file of the seed. Kept for scripts written before
+        SeedData was read-only.
+        @return: void
+
+        """
+        self.close()
+
 
 ##########################################
 if __name__ == "__main__":
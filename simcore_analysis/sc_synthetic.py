@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_synthetic.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Write synthetic CGLASS output (parameter yaml, crosslink spec,
+rigid filament posit and optical trap spec files) in the binary formats read
+by sc_parse_data. Used for tests and benchmarks. Filaments are stationary and
+antiparallel, separated perpendicular to their orientation, and doubly bound
+crosslinks relax to a steady state so every analysis has something to do.
+"""
+
+from pathlib import Path
+import numpy as np
+import yaml
+
+from .sc_parse_data import HEADER_DT, XLINK_DT, FIL_DT, OTRAP_DT
+
+
+def make_synthetic_params(run_name='synthetic', n_frames=100, n_fils=2,
+                          xl_density=.5, length=40., optical_trap=True,
+                          seed=0, n_write=10, delta=1e-4):
+    """!Make a CGLASS parameter dictionary for a synthetic run
+
+    @param run_name: Name of the run, prefix of every output file
+    @param n_frames: Number of frames written to each output file
+    @param n_fils: Number of rigid filaments
+    @param xl_density: Number of crosslinks per unit filament length
+    @param length: Length of the filaments
+    @param optical_trap: Attach an optical trap to the first two filaments
+    @param seed: Seed of the run
+    @param n_write: Number of steps between frames
+    @param delta: Time step
+    @return: Parameter dictionary
+
+    """
+    p_dict = {
+        'run_name': run_name,
+        'seed': seed,
+        'n_steps': n_frames * n_write,
+        'delta': delta,
+        'n_dim': 3,
+        'rigid_filament': [{'name': 'fil',
+                            'num': n_fils,
+                            'length': length,
+                            'diameter': 1.,
+                            'n_posit': n_write,
+                            'stationary_flag': True}],
+        'crosslink': [{'name': 'xl',
+                       'num': max(1, int(xl_density * length * n_fils)),
+                       'n_spec': n_write,
+                       'k_spring': 10.,
+                       'f_stall': 5.,
+                       'k_off_d': .1,
+                       'concentration': 1.e-4,
+                       'velocity_d': .1,
+                       'rest_length': 0.}],
+    }
+    if optical_trap:
+        p_dict['optical_trap'] = [{'name': 'ot', 'num': 2, 'n_spec': n_write}]
+    return p_dict
+
+
+def get_filament_frame(n_fils, length, sep=1.):
+    """!Filaments stacked along z with alternating orientation along y
+
+    @param n_fils: Number of filaments
+    @param length: Length of the filaments
+    @param sep: Separation of neighbouring filaments
+    @return: FIL_DT array of filaments
+
+    """
+    fils = np.zeros(n_fils, dtype=FIL_DT)
+    fils['pos'][:, 2] = sep * np.arange(n_fils)
+    fils['spos'] = fils['pos']
+    fils['orient'][:, 1] = np.where(np.arange(n_fils) % 2, -1., 1.)
+    fils['diameter'] = 1.
+    fils['length'] = length
+    fils['mesh_id'] = np.arange(1, n_fils + 1)
+    return fils
+
+
+def get_xlink_frame(n_xlinks, p_dbl, p_sgl, length, rng):
+    """!Random crosslink states of one frame. Crosslinks only bind the first
+    two filaments. Doubly bound heads sit across from each other on the
+    antiparallel pair with a small offset.
+
+    @param n_xlinks: Number of crosslinks
+    @param p_dbl: Probability of a crosslink being doubly bound
+    @param p_sgl: Probability of a crosslink being singly bound
+    @param length: Length of the filaments
+    @param rng: numpy random Generator
+    @return: XLINK_DT array of crosslinks
+
+    """
+    xlinks = np.zeros(n_xlinks, dtype=XLINK_DT)
+    state = rng.random(n_xlinks)
+    doubly = state < p_dbl
+    singly = ~doubly & (state < p_dbl + p_sgl)
+    lambda_i = rng.uniform(0., length, n_xlinks)
+    lambda_j = np.clip(length - lambda_i + rng.normal(0., .5, n_xlinks),
+                       0., length)
+    anchors = xlinks['anchors']
+    anchors['attached_id'] = -1
+    anchors['lambda'][:, 0] = lambda_i
+    anchors['lambda'][:, 1] = lambda_j
+    anchors['bound'][:, 0] = doubly | singly
+    anchors['bound'][:, 1] = doubly
+    anchors['active'] = anchors['bound']
+    # Singly bound heads are spread over both filaments
+    anchors['attached_id'][:, 0] = np.where(
+        doubly | singly, 1 + (singly & (rng.random(n_xlinks) < .5)), -1)
+    anchors['attached_id'][:, 1] = np.where(doubly, 2, -1)
+    xlinks['doubly'] = doubly
+    xlinks['diameter'] = 1.
+    return xlinks
+
+
+def get_optical_trap_frame(fils, rng):
+    """!Optical traps holding beads at the plus ends of the first two
+    filaments
+
+    @param fils: FIL_DT array of filaments
+    @param rng: numpy random Generator
+    @return: OTRAP_DT array of optical traps
+
+    """
+    otraps = np.zeros(2, dtype=OTRAP_DT)
+    plus_ends = (fils['pos'][:2] +
+                 .5 * fils['length'][:2, None] * fils['orient'][:2])
+    otraps['bpos'] = plus_ends
+    otraps['bspos'] = plus_ends
+    otraps['pos'] = plus_ends + rng.normal(0., .05, (2, 3))
+    otraps['spos'] = otraps['pos']
+    otraps['orient'] = fils['orient'][:2]
+    otraps['diameter'] = 1.
+    otraps['attach_id'] = fils['mesh_id'][:2]
+    return otraps
+
+
+def write_header(outf, n_steps, n_write, delta):
+    """!Write the header of a CGLASS posit or spec file"""
+    header = np.zeros(1, dtype=HEADER_DT)
+    header['n_steps'] = n_steps
+    header['n_posit'] = n_write
+    header['delta'] = delta
+    header.tofile(outf)
+
+
+def write_frame(outf, frame_arr):
+    """!Write one frame, the number of objects followed by the objects"""
+    np.asarray([frame_arr.size], dtype=np.int32).tofile(outf)
+    frame_arr.tofile(outf)
+
+
+def write_synthetic_run(run_dir, run_name='synthetic', n_frames=100,
+                        n_fils=2, xl_density=.5, length=40.,
+                        optical_trap=True, seed=0):
+    """!Write the parameter yaml and binary output files of a synthetic
+    CGLASS run.
+
+    @param run_dir: Directory to write into. Created if it does not exist.
+    @param run_name: Name of the run, prefix of every output file
+    @param n_frames: Number of frames written to each output file
+    @param n_fils: Number of rigid filaments (at least 2)
+    @param xl_density: Number of crosslinks per unit filament length
+    @param length: Length of the filaments
+    @param optical_trap: Write optical trap output
+    @param seed: Seed of the run and of the random number generator
+    @return: Path to the parameter yaml file
+
+    """
+    if n_fils < 2:
+        raise ValueError("Synthetic runs need at least two filaments.")
+    run_dir = Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    p_dict = make_synthetic_params(run_name, n_frames, n_fils, xl_density,
+                                   length, optical_trap, seed)
+    n_steps = p_dict['n_steps']
+    delta = p_dict['delta']
+    fil_p_dict = p_dict['rigid_filament'][0]
+    xl_p_dict = p_dict['crosslink'][0]
+
+    param_file = run_dir / '{}_params.yaml'.format(run_name)
+    with open(param_file, 'w') as pf:
+        yaml.dump(p_dict, pf)
+
+    fils = get_filament_frame(n_fils, length)
+    with open(run_dir / '{}_rigid_filament_{}.posit'.format(
+            run_name, fil_p_dict['name']), 'wb') as flf:
+        write_header(flf, n_steps, fil_p_dict['n_posit'], delta)
+        for _ in range(n_frames):
+            write_frame(flf, fils)
+
+    # Doubly bound crosslinks relax to their steady state number
+    tau = max(1., .1 * n_frames)
+    with open(run_dir / '{}_crosslink_{}.spec'.format(
+            run_name, xl_p_dict['name']), 'wb') as xlf:
+        write_header(xlf, n_steps, xl_p_dict['n_spec'], delta)
+        for i in range(n_frames):
+            p_dbl = .5 * (1. - np.exp(-i / tau))
+            write_frame(xlf, get_xlink_frame(xl_p_dict['num'], p_dbl, .2,
+                                             length, rng))
+
+    if optical_trap:
+        ot_p_dict = p_dict['optical_trap'][0]
+        with open(run_dir / '{}_optical_trap_{}.spec'.format(
+                run_name, ot_p_dict['name']), 'wb') as otf:
+            write_header(otf, n_steps, ot_p_dict['n_spec'], delta)
+            for _ in range(n_frames):
+                write_frame(otf, get_optical_trap_frame(fils, rng))
+    return param_file
+
+
+def write_synthetic_seed_scan(param_dir, n_seeds=3, **kwargs):
+    """!Write synthetic runs for several seeds into s<seed> directories of a
+    parameter directory.
+
+    @param param_dir: Parameter directory
+    @param n_seeds: Number of seeds
+    @param kwargs: Arguments passed to write_synthetic_run
+    @return: List of paths to parameter yaml files
+
+    """
+    return [write_synthetic_run(Path(param_dir) / 's{}'.format(seed),
+                                seed=seed, **kwargs)
+            for seed in range(n_seeds)]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
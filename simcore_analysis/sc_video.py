@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_video.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Video sinks that encode raw frames without intermediate image
+files. Frames are RGBA buffers, e.g. the memoryview returned by
+buffer_rgba() of an Agg canvas, or BGR images as decoded by cv2, and are
+piped as they are into the stdin of an ffmpeg process or handed to an
+in-process cv2.VideoWriter.
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+import numpy as np
+
+SINK_BACKENDS = ['ffmpeg', 'cv2']
+
+# Bytes per pixel of the supported raw frame formats
+PIX_FMT_BYTES = {'rgba': 4, 'bgr24': 3}
+
+
+class VideoSink():
+
+    """!Encode raw frames of a fixed size into a movie file. Use as a context
+    manager to finish the movie."""
+
+    def __init__(self, path, frame_size, fps=20, backend='ffmpeg',
+                 codec='libx264', bitrate=None, extra_args=None,
+                 ffmpeg_path='ffmpeg', pix_fmt='rgba'):
+        """!Start the encoder
+
+        @param path: Path of the movie file
+        @param frame_size: (width, height) of frames in pixels
+        @param fps: Frame rate of the movie
+        @param backend: 'ffmpeg' to pipe frames into an ffmpeg process or
+                        'cv2' to encode them with cv2.VideoWriter
+        @param codec: ffmpeg video codec, or fourcc code for cv2
+        @param bitrate: ffmpeg bitrate in kbit/s. Defaults to the codec's.
+        @param extra_args: Extra ffmpeg output arguments
+        @param ffmpeg_path: ffmpeg executable
+        @param pix_fmt: Format of frames, 'rgba' or 'bgr24'
+
+        """
+        if backend not in SINK_BACKENDS:
+            raise ValueError("Unknown video sink backend {}, choose from "
+                             "{}.".format(backend, SINK_BACKENDS))
+        if pix_fmt not in PIX_FMT_BYTES:
+            raise ValueError("Unknown pixel format {}, choose from "
+                             "{}.".format(pix_fmt, list(PIX_FMT_BYTES)))
+        self.path = Path(path)
+        self.frame_size = tuple(int(s) for s in frame_size)
+        self.fps = fps
+        self.backend = backend
+        self.pix_fmt = pix_fmt
+        self.n_frames = 0
+        self._frame_shape = (self.frame_size[1], self.frame_size[0],
+                             PIX_FMT_BYTES[pix_fmt])
+        self._frame_nbytes = int(np.prod(self._frame_shape))
+        self._proc = None
+        self._vid = None
+        if backend == 'ffmpeg':
+            self._proc = subprocess.Popen(
+                self.get_ffmpeg_args(codec, bitrate, extra_args,
+                                     ffmpeg_path),
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE)
+        else:
+            self._vid = self.open_cv2_writer(
+                'mp4v' if codec == 'libx264' else codec)
+
+    def get_ffmpeg_args(self, codec='libx264', bitrate=None, extra_args=None,
+                        ffmpeg_path='ffmpeg'):
+        """!Get the ffmpeg command reading raw frames from stdin
+        @return: List of command line arguments
+
+        """
+        if shutil.which(ffmpeg_path) is None:
+            raise FileNotFoundError(
+                "ffmpeg executable {} was not found.".format(ffmpeg_path))
+        args = [ffmpeg_path, '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-vcodec', 'rawvideo',
+                '-s', '{}x{}'.format(*self.frame_size),
+                '-pix_fmt', self.pix_fmt,
+                '-framerate', str(self.fps), '-i', 'pipe:',
+                '-vcodec', codec]
+        if codec in ('libx264', 'h264'):
+            # yuv420p needs even frame sizes
+            args += ['-pix_fmt', 'yuv420p',
+                     '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        if bitrate is not None:
+            args += ['-b:v', '{}k'.format(bitrate)]
+        args += list(extra_args or []) + [str(self.path)]
+        return args
+
+    def open_cv2_writer(self, fourcc):
+        """!Open a cv2.VideoWriter for the movie
+        @return: cv2.VideoWriter
+
+        """
+        try:
+            import cv2
+        except ImportError as err:
+            raise ImportError("The cv2 video sink requires opencv, install "
+                              "it with 'pip install opencv-python'.") from err
+        return cv2.VideoWriter(str(self.path),
+                               cv2.VideoWriter_fourcc(*fourcc),
+                               float(self.fps), self.frame_size)
+
+    def write(self, frame):
+        """!Encode a frame
+
+        @param frame: Frame in the pixel format of the sink as a buffer or
+                      uint8 array of shape (height, width, bytes per pixel)
+        @return: void
+
+        """
+        buf = memoryview(np.ascontiguousarray(frame)).cast('B')
+        if buf.nbytes != self._frame_nbytes:
+            raise ValueError("Frame has {} bytes, expected {} for size "
+                             "{}.".format(buf.nbytes, self._frame_nbytes,
+                                          self.frame_size))
+        if self.backend == 'ffmpeg':
+            self._proc.stdin.write(buf)
+        else:
+            import cv2
+            img = np.frombuffer(buf, dtype=np.uint8).reshape(
+                self._frame_shape)
+            if self.pix_fmt == 'rgba':
+                img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
+            self._vid.write(img)
+        self.n_frames += 1
+
+    def write_canvas(self, canvas):
+        """!Encode the current image of an Agg canvas without copying it
+
+        @param canvas: Agg figure canvas that has been drawn
+        @return: void
+
+        """
+        self.write(canvas.buffer_rgba())
+
+    def write_raw_file(self, raw_path, chunk_frames=16):
+        """!Encode the frames of a file of raw frames
+
+        @param raw_path: Path of the raw frame file
+        @param chunk_frames: Number of frames read at a time
+        @return: Number of frames encoded
+
+        """
+        n_frames = 0
+        with open(raw_path, 'rb') as rf:
+            while True:
+                data = rf.read(chunk_frames * self._frame_nbytes)
+                if not data:
+                    break
+                buf = memoryview(data)
+                for i in range(0, len(buf), self._frame_nbytes):
+                    self.write(buf[i:i + self._frame_nbytes])
+                    n_frames += 1
+        return n_frames
+
+    def close(self):
+        """!Finish the movie
+        @return: void
+
+        """
+        if self._proc is not None:
+            proc, self._proc = self._proc, None
+            _, err = proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError("ffmpeg failed to write {}: {}".format(
+                    self.path, err.decode(errors='replace')))
+        if self._vid is not None:
+            self._vid.release()
+            self._vid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
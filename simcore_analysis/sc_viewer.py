@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_viewer.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Scrub through the frames of a seed interactively. Frames of the
+minimal seed movie are rendered off-screen to RGBA images by a background
+thread that owns the figure, kept in an LRU cache within a memory budget and
+prefetched around the last frame viewed in the direction of scrubbing.
+"""
+
+import threading
+from collections import deque
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .sc_seed_data import FrameCache
+from .sc_graphs import SeedFrameArtists
+from .sc_animation_funcs import MIN_GRAPH_STL
+
+
+class SeedViewer():
+
+    """!Rendered frames of a seed, indexed like an array of frames. Use as a
+    context manager to stop the render thread when done."""
+
+    def __init__(self, sd_data, max_bytes=512 << 20, prefetch=4,
+                 figsize=(10., 5.), dpi=100.):
+        """!Lay out the seed figure and start the render thread
+
+        @param sd_data: SeedData of the seed. The viewer shows its frames.
+        @param max_bytes: Memory budget of the rendered frame cache
+        @param prefetch: Number of frames rendered ahead of the last frame
+                         viewed. Half as many are rendered behind it.
+        @param figsize: Size of the figure in inches
+        @param dpi: Resolution of the figure
+
+        """
+        self.sd_data = sd_data
+        self.frames = sd_data.frames
+        self.prefetch = prefetch
+        with plt.style.context(MIN_GRAPH_STL):
+            self.fig = Figure(figsize=figsize, dpi=dpi, layout='constrained')
+            FigureCanvasAgg(self.fig)
+            gs = self.fig.add_gridspec(1, 2)
+            axarr = np.asarray([self.fig.add_subplot(gs[0]),
+                                self.fig.add_subplot(gs[1])])
+            self.fig.suptitle(' ')
+            self.frame_artists = SeedFrameArtists(self.fig, axarr, sd_data)
+            # The static background, with all the styled text, is drawn here
+            self.frame_artists.blit(int(self.frames[0]))
+        width, height = self.fig.canvas.get_width_height()
+        self.frame_shape = (height, width, 4)
+        self.max_bytes = max_bytes
+        self._images = FrameCache(self.render_frame, sd_data.n_frames,
+                                  max(1, max_bytes // (height * width * 4)))
+        self._images.put(int(self.frames[0]), self._copy_canvas())
+
+        self._cond = threading.Condition()
+        self._pending = deque()
+        # Frames callers wait for and their images, handed over directly so
+        # prefetched frames can not evict them from a small cache first
+        self._waiting = {}
+        self._delivered = {}
+        self._busy = False
+        self._error = None
+        self._last_pos = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._render_pending,
+                                        daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return self.frames.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, n):
+        return self.get_frame(n)
+
+    def _copy_canvas(self):
+        return np.array(self.fig.canvas.buffer_rgba())
+
+    def render_frame(self, n):
+        """!Render a frame. Only called from the render thread.
+
+        @param n: Frame index
+        @return: RGBA image array (height, width, 4)
+
+        """
+        self.frame_artists.blit(n)
+        return self._copy_canvas()
+
+    def get_neighbours(self, n):
+        """!Get the frames to prefetch around a frame, nearest first and ahead
+        in the direction of scrubbing before behind
+
+        @param n: Frame index
+        @return: List of frame indices
+
+        """
+        pos = int(np.searchsorted(self.frames, n))
+        step = -1 if pos < self._last_pos else 1
+        self._last_pos = pos
+        ahead = [pos + step * i for i in range(1, self.prefetch + 1)]
+        behind = [pos - step * i for i in range(1, self.prefetch // 2 + 1)]
+        return [int(self.frames[p]) for p in ahead + behind
+                if 0 <= p < self.frames.size]
+
+    def request(self, n):
+        """!Render a frame and its neighbours in the background, dropping
+        frames still waiting from earlier requests
+
+        @param n: Frame index
+        @return: void
+
+        """
+        n = int(n) % self.sd_data.n_frames
+        with self._cond:
+            self._raise_error()
+            self._pending.clear()
+            self._pending.extend([n] + self.get_neighbours(n))
+            self._cond.notify_all()
+
+    def get_frame(self, n, timeout=None):
+        """!Get the image of a frame, waiting for it to be rendered if it is
+        not cached. Neighbouring frames are prefetched either way.
+
+        @param n: Frame index
+        @param timeout: Seconds to wait for the frame, None to wait for good
+        @return: RGBA image array (height, width, 4)
+
+        """
+        n = int(n) % self.sd_data.n_frames
+        with self._cond:
+            self._waiting[n] = self._waiting.get(n, 0) + 1
+        try:
+            self.request(n)
+            with self._cond:
+                if not self._cond.wait_for(
+                        lambda: (n in self._delivered or n in self._images or
+                                 self._error is not None or self._closed),
+                        timeout):
+                    raise TimeoutError("Frame {} was not rendered within {} "
+                                       "s.".format(n, timeout))
+                if n in self._delivered:
+                    return self._delivered[n]
+                self._raise_error()
+                if n not in self._images:
+                    raise RuntimeError("SeedViewer is closed.")
+                return self._images[n]
+        finally:
+            with self._cond:
+                self._waiting[n] -= 1
+                if self._waiting[n] == 0:
+                    del self._waiting[n]
+                    self._delivered.pop(n, None)
+
+    def wait(self, timeout=None):
+        """!Wait until all requested frames are rendered
+
+        @param timeout: Seconds to wait, None to wait for good
+        @return: True if the render thread is idle
+
+        """
+        with self._cond:
+            idle = self._cond.wait_for(
+                lambda: not (self._pending or self._busy) or self._closed,
+                timeout)
+            self._raise_error()
+            return idle
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Rendering a frame failed.") from self._error
+
+    def _render_pending(self):
+        """!Render requested frames into the cache. Runs in the render
+        thread, which is the only one drawing the figure."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if self._closed:
+                    return
+                n = self._pending.popleft()
+                if n in self._images:
+                    if n in self._waiting:
+                        self._delivered[n] = self._images[n]
+                    self._cond.notify_all()
+                    continue
+                self._busy = True
+            try:
+                image = self.render_frame(n)
+            except BaseException as err:
+                with self._cond:
+                    self._error = err
+                    self._busy = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._images.put(n, image)
+                if n in self._waiting:
+                    self._delivered[n] = image
+                self._busy = False
+                self._cond.notify_all()
+
+    def close(self):
+        """!Stop the render thread and drop the cached frames. The SeedData
+        is left open.
+        @return: void
+
+        """
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+        self._thread.join()
+        self._images.clear()
+
+    def show(self, n=None):
+        """!Show the frames in a window, or a notebook with an interactive
+        backend, with a slider and the left and right arrow keys to scrub
+
+        @param n: Frame index shown first. Defaults to the first frame.
+        @return: (figure, slider), keep a reference to the slider for it to
+                 respond
+
+        """
+        from matplotlib.widgets import Slider
+        height, width, _ = self.frame_shape
+        fig = plt.figure(figsize=(width / self.fig.dpi,
+                                  height / self.fig.dpi + .4),
+                         dpi=self.fig.dpi)
+        ax = fig.add_axes([0., .4 / (height / self.fig.dpi + .4), 1., 1.])
+        ax.set_axis_off()
+        pos = 0 if n is None else int(np.searchsorted(self.frames, n))
+        img = ax.imshow(self.get_frame(self.frames[pos]),
+                        interpolation='nearest')
+        slider = Slider(fig.add_axes([.15, .02, .7, .04]), 'Frame', 0,
+                        self.frames.size - 1, valinit=pos, valstep=1)
+
+        def update(val):
+            img.set_data(self.get_frame(self.frames[int(val)]))
+            fig.canvas.draw_idle()
+
+        def on_key(event):
+            if event.key in ('left', 'right'):
+                step = 1 if event.key == 'right' else -1
+                slider.set_val(min(max(slider.val + step, 0),
+                                   self.frames.size - 1))
+
+        slider.on_changed(update)
+        fig.canvas.mpl_connect('key_press_event', on_key)
+        return fig, slider
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
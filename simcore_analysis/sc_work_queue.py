@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: sc_work_queue.py
+Author: Adam Lamson
+Email: adam.lamson@colorado.edu
+Description: Cooperative task queue for running analysis from many processes
+on many nodes that share a POSIX filesystem. Task states are files in a queue
+directory. A task is claimed by exclusively creating its claim file, kept alive
+by touching the claim file, and finished by creating a done (or failed) file.
+Claims that have not been touched for longer than the stale time are taken
+over by other workers.
+"""
+
+import os
+import time
+import hashlib
+import itertools
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+# Simulation output of a seed that seed analysis reads
+SEED_INPUT_PATTERNS = ['*_params.yaml', '*.spec', '*.posit']
+
+
+@contextmanager
+def work_dir(path):
+    """!Temporarily change the working directory
+
+    @param path: Directory to work in
+    @return: void
+
+    """
+    prev_dir = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev_dir)
+
+
+class WorkQueue():
+
+    """!Task queue with claim, heartbeat and complete states kept as files in
+    a shared directory."""
+
+    def __init__(self, queue_dir, stale_time=600., heartbeat_interval=30.,
+                 worker_id=None):
+        """!Initialize queue directories
+
+        @param queue_dir: Shared directory holding the task state files.
+                          Relative paths are resolved now, so tasks may
+                          change the working directory.
+        @param stale_time: Seconds after the last heartbeat a claim is stale
+        @param heartbeat_interval: Seconds between heartbeats of a running task
+        @param worker_id: Name of this worker. Defaults to host:pid.
+
+        """
+        self.queue_dir = Path(queue_dir).resolve()
+        self.stale_time = stale_time
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = (worker_id if worker_id is not None else
+                          '{}:{}'.format(socket.gethostname(), os.getpid()))
+        for state in ['claimed', 'done', 'failed']:
+            (self.queue_dir / state).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, state, task_id):
+        return self.queue_dir / state / quote(task_id, safe='')
+
+    def _write_excl(self, path, text):
+        """!Atomically create a file that must not exist yet.
+        @return: True if this call created the file
+
+        """
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        return True
+
+    def state(self, task_id):
+        """!Get the state of a task
+        @return: 'done', 'failed', 'claimed' or 'pending'
+
+        """
+        for state in ['done', 'failed', 'claimed']:
+            if self._path(state, task_id).exists():
+                return state
+        return 'pending'
+
+    def is_finished(self, task_id):
+        """!Check if a task is done or failed"""
+        return (self._path('done', task_id).exists() or
+                self._path('failed', task_id).exists())
+
+    def claim(self, task_id):
+        """!Try to claim a task. Stale claims of crashed workers are taken over.
+
+        @param task_id: Task to claim
+        @return: True if this worker now owns the task
+
+        """
+        if self.is_finished(task_id):
+            return False
+        claim_path = self._path('claimed', task_id)
+        if self._write_excl(claim_path, self.worker_id):
+            return True
+        return self._take_over(task_id, claim_path)
+
+    def _take_over(self, task_id, claim_path):
+        """!Take over a claim if it is stale. Only the worker that exclusively
+        creates the takeover lock of the claim's last heartbeat may replace
+        it, and the claim file is swapped atomically so it never goes
+        missing. Locks left by workers that crashed while taking over are
+        skipped once they are stale themselves.
+
+        @param task_id: Task of the claim
+        @param claim_path: Path of the stale claim file
+        @return: True if this worker now owns the task
+
+        """
+        try:
+            mtime_ns = claim_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False  # Released in the meantime, try again next round
+        if time.time() - mtime_ns * 1e-9 < self.stale_time:
+            return False
+        for attempt in itertools.count():
+            lock_path = claim_path.with_name('{}.takeover.{}.{}'.format(
+                claim_path.name, mtime_ns, attempt))
+            if self._write_excl(lock_path, self.worker_id):
+                break
+            try:
+                age = time.time() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                return False  # Taken over and cleaned up in the meantime
+            if age < self.stale_time:
+                return False
+        try:
+            # A heartbeat since the claim was found stale keeps it alive
+            if claim_path.stat().st_mtime_ns != mtime_ns:
+                return False
+            new_path = claim_path.with_name('{}.new.{}'.format(
+                claim_path.name, quote(self.worker_id, safe='')))
+            new_path.write_text(self.worker_id)
+            os.replace(new_path, claim_path)
+        except FileNotFoundError:
+            return False
+        finally:
+            lock_path.unlink()
+        print("QUEUE: Reclaimed stale task {}".format(task_id))
+        return not self.is_finished(task_id)
+
+    def heartbeat(self, task_id, n_tries=3, retry_interval=.1):
+        """!Mark a claimed task as still being worked on. A missing claim
+        file is looked for again a few times before the claim counts as lost.
+
+        @param task_id: Claimed task
+        @param n_tries: Number of times to look for the claim file
+        @param retry_interval: Seconds between tries
+        @return: False if the claim was lost to another worker
+
+        """
+        claim_path = self._path('claimed', task_id)
+        for i in range(n_tries):
+            try:
+                if claim_path.read_text() != self.worker_id:
+                    return False
+                os.utime(claim_path)
+                return True
+            except FileNotFoundError:
+                if i + 1 < n_tries:
+                    time.sleep(retry_interval)
+        return False
+
+    def complete(self, task_id):
+        """!Mark a claimed task as done and release the claim"""
+        self._write_excl(self._path('done', task_id), self.worker_id)
+        self.release(task_id)
+
+    def fail(self, task_id, message=''):
+        """!Mark a claimed task as failed and release the claim"""
+        self._write_excl(self._path('failed', task_id),
+                         '{}\n{}'.format(self.worker_id, message))
+        self.release(task_id)
+
+    def reset(self, task_id):
+        """!Forget that a task failed so it is run again"""
+        try:
+            self._path('failed', task_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def release(self, task_id):
+        """!Give up a claim so another worker can take the task. Claims that
+        were taken over by another worker are left alone."""
+        claim_path = self._path('claimed', task_id)
+        try:
+            if claim_path.read_text() == self.worker_id:
+                claim_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def run_task(self, task_id, func):
+        """!Run a claimed task while sending heartbeats from a background
+        thread.
+
+        @param task_id: Claimed task
+        @param func: Function called with the task id
+        @return: True if the task succeeded
+
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                if not self.heartbeat(task_id):
+                    print("QUEUE: !!! Lost claim on {} !!!".format(task_id))
+                    return
+
+        beat_thread = threading.Thread(target=beat, daemon=True)
+        beat_thread.start()
+        try:
+            func(task_id)
+        except Exception:
+            print("QUEUE: !!! Task {} failed !!!".format(task_id))
+            self.fail(task_id, traceback.format_exc())
+            return False
+        finally:
+            stop.set()
+            beat_thread.join()
+        self.complete(task_id)
+        return True
+
+    def run(self, tasks, func, deps=None, poll_interval=5.):
+        """!Work through tasks until every task is done or failed. Tasks are
+        tried in order and only once all of their dependencies are done.
+        Tasks whose dependencies failed are marked as failed.
+
+        @param tasks: List of task ids
+        @param func: Function called with the id of each claimed task
+        @param deps: Dictionary of lists of task ids each task depends on
+        @param poll_interval: Seconds to wait when no task is ready
+        @return: Number of tasks run by this worker
+
+        """
+        if deps is None:
+            deps = {}
+        n_run = 0
+        while True:
+            remaining = [t for t in tasks if not self.is_finished(t)]
+            if not remaining:
+                return n_run
+            ran = False
+            for task_id in remaining:
+                task_deps = deps.get(task_id, [])
+                if any(self._path('failed', d).exists() for d in task_deps):
+                    if self.claim(task_id):
+                        self.fail(task_id, "Dependency failed.")
+                    continue
+                if not all(self._path('done', d).exists() for d in task_deps):
+                    continue
+                if self.claim(task_id):
+                    self.run_task(task_id, func)
+                    n_run += 1
+                    ran = True
+                    break
+            if not ran:
+                time.sleep(poll_interval)
+
+
+def get_reduction_task_id(kind, path, dep_tasks):
+    """!Name a reduction task after the tasks it depends on. Adding seeds or
+    parameter directories to the tree then makes a new task instead of
+    reusing one that is already done.
+
+    @param kind: Kind of task, 'scan' or 'run'
+    @param path: Directory the task reduces
+    @param dep_tasks: List of task ids the task depends on
+    @return: Task id '<kind>:<path>@<digest of dep_tasks>'
+
+    """
+    digest = hashlib.sha1('\n'.join(dep_tasks).encode()).hexdigest()[:12]
+    return '{}:{}@{}'.format(kind, path, digest)
+
+
+def get_seed_task_id(seed_dir):
+    """!Name a seed task after the simulation output of the seed. Rewritten
+    or new output then makes a new task instead of reusing one that is
+    already done.
+
+    @param seed_dir: Seed directory
+    @return: Task id 'seed:<seed_dir>@<digest of output names, sizes and
+             modification times>'
+
+    """
+    stats = []
+    for pattern in SEED_INPUT_PATTERNS:
+        for path in sorted(Path(seed_dir).glob(pattern)):
+            st = path.stat()
+            stats += ['{} {} {}'.format(path.name, st.st_size,
+                                        st.st_mtime_ns)]
+    digest = hashlib.sha1('\n'.join(stats).encode()).hexdigest()[:12]
+    return 'seed:{}@{}'.format(seed_dir, digest)
+
+
+def parse_task_id(task_id):
+    """!Split a task id of make_tree_tasks into its kind and path
+
+    @param task_id: Task id
+    @return: kind, path
+
+    """
+    kind, _, task_path = task_id.partition(':')
+    return kind, task_path.rpartition('@')[0]
+
+
+def make_tree_tasks(sim_dir_path, run_task=True):
+    """!Make the tasks needed to analyze a simulation tree. Each seed is a
+    task, each parameter directory is a task depending on its seeds and the
+    run reduction is a task depending on all parameter directories. Ids of
+    seed tasks change with the seed output and ids of reduction tasks with
+    their dependencies, see get_seed_task_id and get_reduction_task_id.
+
+    @param sim_dir_path: Directory holding the parameter directories
+    @param run_task: Add the run reduction task
+    @return: tasks, deps
+
+    """
+    tasks = []
+    deps = {}
+    scan_tasks = []
+    for pdir in sorted(p for p in Path(sim_dir_path).glob('*/')
+                       if p.is_dir()):
+        seed_tasks = [get_seed_task_id(sd)
+                      for sd in sorted(pdir.glob('[!.]*/'))
+                      if sd.is_dir() and any(sd.glob('*_params.yaml'))]
+        scan_task = get_reduction_task_id('scan', pdir, seed_tasks)
+        tasks += seed_tasks
+        deps[scan_task] = seed_tasks
+        scan_tasks += [scan_task]
+    tasks += scan_tasks
+    if run_task:
+        run_task_id = get_reduction_task_id('run', sim_dir_path, scan_tasks)
+        tasks += [run_task_id]
+        deps[run_task_id] = scan_tasks
+    return tasks, deps
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented yet")
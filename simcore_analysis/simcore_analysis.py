@@ -7,22 +7,32 @@ Email: adam.lamson@colorado.edu
 Description:
 """
 
+import ast
+import shutil
 import argparse
 from pathlib import Path
 
 import h5py
 import yaml
-import matplotlib.pyplot as plt
-from matplotlib.animation import FFMpegWriter
 
-from .sc_parse_data import collect_data, get_cpu_time_from_log
+from .sc_parse_data import collect_data, get_timings_from_log
 from .sc_analyze_seed import (analyze_seed)
 from .sc_analyze_seed_scan import analyze_seed_scan, collect_seed_h5_files
-from .sc_analyze_param_scan import collect_param_h5_files
-from .sc_analyze_run import analyze_run
-from .sc_seed_data import SeedData
-from .sc_animation_funcs import make_sc_animation_min
-from .ot_fix_graphs import graph_fixed_OT_assays
+from .sc_analyze_param_scan import (analyze_param_scan,
+                                    analyze_param_scan_error)
+from .sc_work_queue import (WorkQueue, make_tree_tasks, parse_task_id,
+                            work_dir)
+from .sc_profile import PROFILER
+from .sc_export import export_param_scan_parquet
+from .sc_lazy import set_lazy_backend
+from .sc_prefetch import set_prefetch
+# Plotting and video modules import matplotlib and scipy.signal, which take
+# longer to load than most per-seed analyses take to run. They are imported in
+# the functions that need them.
+
+# Source file making seed scan files. Seed scan files older than it or any
+# module of the package it imports are rebuilt.
+SEED_SCAN_CODE_FILE = 'sc_analyze_seed_scan.py'
 
 
 def parse_args():
@@ -43,6 +53,49 @@ def parse_args():
                         help=("Create an animation from a seed."))
     parser.add_argument("-G", "--graph", action="store_true", default=False,
                         help=("Create graph of a seed's end state."))
+    parser.add_argument("-E", "--error", action="store_true", default=False,
+                        help=("Compare the steady state distributions of all "
+                              "parameter points in a param_scan to the "
+                              "analytic solution."))
+    parser.add_argument("-X", "--export", action="store_true", default=False,
+                        help=("Export per-frame observables of every seed in "
+                              "a param_scan and a catalog of seeds to Parquet "
+                              "in the data directory. Requires pyarrow."))
+    parser.add_argument("--lazy", action="store_true", default=False,
+                        help=("Reduce seeds with chunked dask arrays read "
+                              "out-of-core and in parallel, for seed scans "
+                              "that do not fit in memory. Requires dask."))
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help=("Number of seeds read ahead while the current "
+                              "seed is reduced in seed scans. 0 reads each "
+                              "seed when it is needed."))
+    parser.add_argument("--prefetch_mem", type=float, default=1024.,
+                        help=("Memory cap in MB on seeds read ahead."))
+    parser.add_argument("--force", action="store_true", default=False,
+                        help=("Rebuild seed scan files of a param_scan, or "
+                              "of a --worker run, even if they are newer than "
+                              "their seeds and the analysis code. Workers "
+                              "also try failed tasks again."))
+    parser.add_argument("--dry_run", action="store_true", default=False,
+                        help=("List the seed scan files of a param_scan that "
+                              "would be rebuilt without rebuilding them."))
+    parser.add_argument("--profile", action="store_true", default=False,
+                        help=("Record time, memory, I/O and frames of each "
+                              "ingest, analysis and aggregation stage. The "
+                              "report is stored in the profile group of the "
+                              "output h5 file and in a *_profile.json file "
+                              "next to it."))
+    parser.add_argument("--worker", action="store_true", default=False,
+                        help=("Run as one of many cooperating workers that "
+                              "analyze the seeds, seed scans and run of the "
+                              "simulations directory. Workers may run on any "
+                              "node that shares the filesystem."))
+    parser.add_argument("--queue_dir", type=str, default='.sc_queue',
+                        help=("Shared directory used by workers to claim "
+                              "tasks."))
+    parser.add_argument("-n", "--n_procs", type=int, default=None,
+                        help=("Number of processes used for parallel "
+                              "analysis. Defaults to the number of cpus."))
 
     parser.add_argument(
         "-r", "--run_type", type=str,
@@ -78,41 +131,173 @@ def parse_args():
     # Post parsing changes to options
     opts.input = Path(opts.input)
     opts.data_dir = Path.cwd() / 'data'
+    opts.queue_dir = Path(opts.queue_dir)
 
     return opts
 
 
-def run_full_tree_analysis(param, spec=None, analysis_type='analyze'):
+def get_code_files(code_file):
+    """!Get a source file of the package and the package modules it imports,
+    directly or through other package modules
+
+    @param code_file: Name of the source file in the package directory
+    @return: Set of paths to source files
+
+    """
+    code_dir = Path(__file__).resolve().parent
+    code_files = set()
+    to_visit = [code_dir / code_file]
+    while to_visit:
+        path = to_visit.pop()
+        if path in code_files or not path.exists():
+            continue
+        code_files.add(path)
+        # Relative imports anywhere in the file, including inside functions
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.ImportFrom) and node.level == 1:
+                if node.module is not None:
+                    to_visit.append(code_dir / '{}.py'.format(node.module))
+                else:
+                    to_visit += [code_dir / '{}.py'.format(alias.name)
+                                 for alias in node.names]
+    return code_files
+
+
+def get_seed_scan_code_mtime():
+    """!Get the latest modification time of the source files used to make
+    seed scan files.
+
+    @return: Modification time in seconds since the epoch
+
+    """
+    return max(f.stat().st_mtime for f in get_code_files(SEED_SCAN_CODE_FILE))
+
+
+def get_seed_scan_rebuild_reason(param_dir_path):
+    """!Check if the seed scan file of a parameter directory is out of date
+    with respect to its seed files or the analysis code, like make does.
+
+    @param param_dir_path: Path to parameter directory
+    @return: Reason the seed scan file must be rebuilt or None if up to date
+
+    """
+    param_dir_path = Path(param_dir_path)
+    h5_file = param_dir_path / '{}.h5'.format(param_dir_path.name)
+    if not h5_file.exists():
+        return "no seed scan file"
+    out_mtime = h5_file.stat().st_mtime
+    for seed_file in param_dir_path.glob('[!.]*/*.h5'):
+        if seed_file.stat().st_mtime > out_mtime:
+            return "{} is newer".format(seed_file)
+    if get_seed_scan_code_mtime() > out_mtime:
+        return "analysis code is newer"
+    return None
+
+
+def run_full_tree_analysis(param, spec=None, analysis_type='analyze',
+                           n_procs=None, force=False, dry_run=False):
     """!Run analysis to collect seed data files and combine into seed scan files
-    and full run data files.
+    and full run data files. Only parameter directories whose seed scan file
+    is out of date are analyzed.
 
-    @param sim_dir_path: path to simulation directory
-    @return: TODO
+    @param param: Name of the scanned parameter
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @param analysis_type: Type of analysis to run
+    @param n_procs: Number of processes used to reduce the seed scan files
+    @param force: Rebuild every seed scan file even if it is up to date
+    @param dry_run: Only print what would be rebuilt
+    @return: void
 
     """
     try:
         sim_dir_path = Path('simulations')
+        run_file = Path('{}.h5'.format(Path.cwd().name))
 
         # Run seed scan analysis to consolidate first level of tree
-        for pdirs in sim_dir_path.glob('*/'):
-            run_seed_scan_analysis(pdirs)
-
-        # Collect seed scan data files
-        h5_data_lst = collect_param_h5_files(sim_dir_path, param, spec)
-
-        # TODO: Run analyis on collected data files <15-01-20, ARL> #
-        # analyze_run(h5_data_lst, param, spec)
-
-        # name = Path.cwd().name
-        # file_path = '{}.h5'.format(name)
-        # h5_out = h5py.File(file_path, 'w')
+        n_rebuilt = 0
+        for pdirs in sorted(sim_dir_path.glob('*/')):
+            if not pdirs.is_dir():
+                continue
+            reason = ("forced" if force else
+                      get_seed_scan_rebuild_reason(pdirs))
+            if reason is None:
+                print("Up to date: {}".format(pdirs))
+                continue
+            n_rebuilt += 1
+            if dry_run:
+                print("Would rebuild {} ({})".format(pdirs, reason))
+            else:
+                run_seed_scan_analysis(pdirs)
+
+        # Reduce seed scan files into a run file named after the run directory
+        scan_files = [pd / '{}.h5'.format(pd.name)
+                      for pd in sim_dir_path.glob('*/')]
+        if (n_rebuilt == 0 and run_file.exists() and
+                all(sf.stat().st_mtime <= run_file.stat().st_mtime
+                    for sf in scan_files if sf.exists())):
+            print("Up to date: {}".format(run_file))
+        elif dry_run:
+            print("Would rebuild {}".format(run_file))
+        else:
+            PROFILER.reset()
+            with PROFILER.span('run_analysis'):
+                analyze_param_scan(sim_dir_path, param, spec, run_file,
+                                   n_procs)
+            if PROFILER.enabled:
+                with h5py.File(run_file, 'a') as h5_run:
+                    PROFILER.write_report(
+                        h5_run, '{}_profile.json'.format(run_file.stem))
     except BaseException:
         print("Analysis failed")
         raise
-    finally:
-        # h5_out.close()
-        for h5d in h5_data_lst:
-            h5d.close()
+
+
+def run_tree_worker(param=None, spec=None, analysis_type='analyze',
+                    queue_dir=Path('.sc_queue'), n_procs=None, force=False):
+    """!Work through the analysis of the simulations directory together with
+    any number of other workers sharing the queue directory. Seeds are
+    analyzed first, then the seed scan of each parameter directory once all
+    of its seeds are done, and finally the run file if a parameter is given.
+
+    @param param: Name of the scanned parameter. No run file is made if None.
+    @param spec: Species the parameter belongs to, e.g. 'crosslink'
+    @param analysis_type: Type of analysis to run on seeds
+    @param queue_dir: Shared directory holding the task states
+    @param n_procs: Number of processes used to reduce the seed scan files
+    @param force: Rebuild seed scan files even if they are up to date and try
+                  failed tasks again
+    @return: void
+
+    """
+    sim_dir_path = Path('simulations')
+    tasks, deps = make_tree_tasks(sim_dir_path, run_task=param is not None)
+    queue = WorkQueue(queue_dir)
+    print("WORKER {}: {} tasks".format(queue.worker_id, len(tasks)))
+    if force:
+        # Failed tasks are tried again, e.g. after fixing the analysis
+        for task_id in tasks:
+            queue.reset(task_id)
+
+    def run_tree_task(task_id):
+        kind, task_path = parse_task_id(task_id)
+        print("WORKER {}: Running {}".format(queue.worker_id, task_id))
+        if kind == 'seed':
+            with work_dir(task_path):
+                param_file = sorted(Path('.').glob('*_params.yaml'))[0]
+                run_seed_analysis(param_file, analysis_type)
+        elif kind == 'scan':
+            reason = ("forced" if force else
+                      get_seed_scan_rebuild_reason(task_path))
+            if reason is None:
+                print("Up to date: {}".format(task_path))
+            else:
+                run_seed_scan_analysis(task_path, analysis_type)
+        elif kind == 'run':
+            analyze_param_scan(sim_dir_path, param, spec, n_procs=n_procs)
+
+    n_run = queue.run(tasks, run_tree_task, deps)
+    print("WORKER {}: Finished after running {} tasks".format(
+        queue.worker_id, n_run))
 
 
 def run_seed_scan_analysis(param_dir_path, analysis_type='analyze'):
@@ -132,12 +317,17 @@ def run_seed_scan_analysis(param_dir_path, analysis_type='analyze'):
         print("!!! {} does not exist when trying to load !!!")
     if h5_file.exists():  # always delete this file. Can only analyze if
         h5_file.unlink()
+    PROFILER.reset()
     try:
         h5_out = h5py.File(h5_file, 'a')
-        # Collect seeds to analyze
-        h5_data_lst = collect_seed_h5_files(param_dir_path)
-        # analyze seeds
-        analyze_seed_scan(h5_out, h5_data_lst)
+        with PROFILER.span('seed_scan_analysis'):
+            # Collect seeds to analyze
+            with PROFILER.span('collect_seed_h5_files'):
+                h5_data_lst = collect_seed_h5_files(param_dir_path)
+            # analyze seeds
+            analyze_seed_scan(h5_out, h5_data_lst)
+        PROFILER.write_report(h5_out, param_dir_path /
+                              '{}_profile.json'.format(name))
 
     except BaseException:
         print("Analysis failed")
@@ -172,22 +362,28 @@ def run_seed_analysis(param_file=None, analysis_type='analyze'):
         print("ANALYSIS: Overwriting current h5 data")
         h5_file.unlink()
 
+    PROFILER.reset()
     try:
         h5_data = h5py.File(h5_file, 'a')
-        if analysis_type != 'load' and ('xl_data' not in h5_data
-                                        or 'filament_data' not in h5_data):
-            print("ANALYSIS: Collecting data")
-            collect_data(h5_data, run_name + '_params.yaml')
-        print("ANALYSIS: Analyzing data")
-        analyze_seed(h5_data)
+        with PROFILER.span('seed_analysis'):
+            if analysis_type != 'load' and ('xl_data' not in h5_data
+                                            or 'filament_data' not in h5_data):
+                print("ANALYSIS: Collecting data")
+                collect_data(h5_data, run_name + '_params.yaml')
+            print("ANALYSIS: Analyzing data")
+            analyze_seed(h5_data)
         # Get run time statistics if they exist
         time_anal_flag = p_dict.get('time_analysis', False)
         if time_anal_flag:
             try:
-                cpu_time = get_cpu_time_from_log(Path(run_name + '.log'))
-                h5_data['analysis'].attrs['cpu_time'] = cpu_time
+                timings = get_timings_from_log(Path(run_name + '.log'))
+                if 'cpu_time' not in timings:
+                    raise ValueError("No CPU time in log.")
+                for key, val in timings.items():
+                    h5_data['analysis'].attrs[key] = val
             except BaseException:
                 print("ANALYSIS: !!! Could not collect time analysis !!!")
+        PROFILER.write_report(h5_data, run_name + '_profile.json')
     except BaseException:
         print("ANALYSIS: failed")
         raise
@@ -195,16 +391,34 @@ def run_seed_analysis(param_file=None, analysis_type='analyze'):
         h5_data.close()
 
 
-def make_animation(param_file):
-    """!TODO: Docstring for run_make_animation.
-    @return: TODO
+def make_animation(param_file, n_procs=None):
+    """!Make the minimal movie of a seed
+
+    @param param_file: Parameter file of the seed
+    @param n_procs: Number of processes rendering frames. Defaults to the cpu
+                    count, 1 renders serially.
+    @return: void
 
     """
-    # try:
-    sd_data = SeedData(param_file)
-    Writer = FFMpegWriter
-    writer = Writer(fps=25, metadata=dict(artist='Me'), bitrate=1800)
-    make_sc_animation_min(sd_data, writer)
+    from .sc_seed_data import SeedData
+    from .sc_keyframes import select_keyframes
+    from .sc_animation_funcs import make_sc_movie, make_sc_animation_parallel
+
+    # Only the crosslink distributions of the movie frames are decoded and
+    # they set the color scale, in this process and in render workers.
+    with SeedData(param_file) as sd_data:
+        frame_list = select_keyframes(sd_data.h5_data)
+    sink_kwargs = {'bitrate': 1800}
+    if shutil.which('ffmpeg') is None:
+        print("!!! ffmpeg not found, encoding movie with cv2 !!!")
+        sink_kwargs['backend'] = 'cv2'
+    with SeedData(param_file, frames=frame_list) as sd_data:
+        if n_procs == 1:
+            make_sc_movie(sd_data, fps=25, frame_list=frame_list,
+                          **sink_kwargs)
+        else:
+            make_sc_animation_parallel(sd_data, n_procs=n_procs, fps=25,
+                                       frame_list=frame_list, **sink_kwargs)
 
 
 def run_analysis(opts):
@@ -215,20 +429,57 @@ def run_analysis(opts):
         run_seed_scan_analysis(opts.input, opts.analysis)
         # graph_multi_seed(opts.input, opts.graph)
     elif opts.run_type == 'param_scan':
-        if opts.spec != '':
-            run_full_tree_analysis(opts.input, opts.spec, opts.analysis)
-        else:
-            run_full_tree_analysis(opts.input, analysis_type=opts.analysis)
+        # Input is the name of the scanned parameter for parameter scans
+        run_full_tree_analysis(str(opts.input),
+                               opts.spec if opts.spec != '' else None,
+                               opts.analysis, opts.n_procs,
+                               opts.force, opts.dry_run)
     else:
         raise IOError('No valid analysis type was given.')
 
 
+def run_error_analysis(opts):
+    """!Run analytic error analysis over every parameter point of a scan and
+    write the results to a table in the data directory.
+
+    @param opts: Parsed command line options
+    @return: void
+
+    """
+    if opts.run_type != 'param_scan':
+        raise IOError("Error analysis requires the param_scan run type.")
+    if not opts.data_dir.exists():
+        opts.data_dir.mkdir()
+    spec = opts.spec if opts.spec != '' else None
+    analyze_param_scan_error(Path('simulations'), str(opts.input), spec,
+                             opts.data_dir / 'ss_distr_error.csv',
+                             opts.n_procs)
+
+
+def run_export(opts):
+    """!Export the seeds of a parameter scan to Parquet tables in the data
+    directory.
+
+    @param opts: Parsed command line options
+    @return: void
+
+    """
+    if opts.run_type != 'param_scan':
+        raise IOError("Parquet export requires the param_scan run type.")
+    if not opts.data_dir.exists():
+        opts.data_dir.mkdir()
+    export_param_scan_parquet(Path('simulations'), opts.data_dir / 'parquet',
+                              str(opts.input),
+                              opts.spec if opts.spec != '' else None)
+
+
 def make_graphs(opts):
     """!TODO: Docstring for run_make_animation.
     @return: TODO
 
     """
     if opts.assay_type == 'fixed-OT':
+        from .ot_fix_graphs import graph_fixed_OT_assays
         graph_fixed_OT_assays(opts)
 
 
@@ -245,9 +496,28 @@ def main():
 
     """
     opts = parse_args()
-    if opts.analysis:
+    PROFILER.enabled = opts.profile
+    if opts.lazy:
+        set_lazy_backend(True, num_workers=opts.n_procs)
+    set_prefetch(opts.prefetch, int(opts.prefetch_mem * (1 << 20)))
+    if opts.worker:
+        run_tree_worker(str(opts.input) if opts.run_type == 'param_scan'
+                        else None,
+                        opts.spec if opts.spec != '' else None,
+                        opts.analysis if opts.analysis else 'analyze',
+                        opts.queue_dir, opts.n_procs, opts.force)
+    elif opts.analysis:
         run_analysis(opts)
 
+    if opts.error:
+        run_error_analysis(opts)
+
+    if opts.export:
+        run_export(opts)
+
+    if opts.movie:
+        make_animation(opts.input, opts.n_procs)
+
     if opts.graph:
         make_graphs(opts)
 
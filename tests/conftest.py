@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Fixtures shared by the tests of `simcore_analysis`."""
+
+import pytest
+
+from simcore_analysis.simcore_analysis import run_seed_analysis
+from simcore_analysis.sc_synthetic import write_synthetic_run
+from simcore_analysis.sc_work_queue import work_dir
+
+
+@pytest.fixture(scope='session')
+def make_seed_param_file(tmp_path_factory):
+    """Write and analyze a synthetic seed run, once per frame count and
+    crosslink density, and return its parameter file."""
+    param_files = {}
+
+    def make(n_frames=20, xl_density=.2):
+        key = (n_frames, xl_density)
+        if key not in param_files:
+            param_file = write_synthetic_run(tmp_path_factory.mktemp('seed'),
+                                             n_frames=n_frames,
+                                             xl_density=xl_density)
+            with work_dir(param_file.parent):
+                run_seed_analysis(param_file.name)
+            param_files[key] = param_file
+        return param_files[key]
+    return make
+
+
+@pytest.fixture(scope='module')
+def seed_run():
+    """Frame count and crosslink density of seed_param_file. Override in a
+    test module to analyze a different run."""
+    return {'n_frames': 20, 'xl_density': .2}
+
+
+@pytest.fixture(scope='module')
+def seed_param_file(make_seed_param_file, seed_run):
+    return make_seed_param_file(**seed_run)
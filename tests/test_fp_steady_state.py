@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.fp_steady_state` module."""
+
+import numpy as np
+import pytest
+
+from simcore_analysis import fp_steady_state
+from simcore_analysis.fp_steady_state import (fp_steady_state_antipara,
+                                              fp_steady_state_antipara_tab)
+
+BASE_P_DICT = {'L': 1000., 'ks': .3, 'fs': 2., 'ko': .5, 'co': .01,
+               'vo': 10., 'beta': .243309002}
+
+
+@pytest.mark.parametrize("mod", [{},  # ls/lo < 1
+                                 {'vo': 1.},  # ls/lo > 1
+                                 {'ks': .05, 'fs': 1.}])
+def test_tabulated_matches_quadrature(mod):
+    p_dict = dict(BASE_P_DICT, **mod)
+    s = np.linspace(-500., 500., 41)
+    S_i, S_j = np.meshgrid(s, s, indexing='ij')
+    ref = fp_steady_state_antipara(S_i, S_j, 25., p_dict).astype(float)
+    tab = fp_steady_state_antipara_tab(S_i, S_j, 25., p_dict,
+                                       cache_dir=False)
+    assert tab.shape == S_i.shape
+    np.testing.assert_allclose(tab, ref, rtol=1e-3, atol=1e-6 * ref.max())
+
+
+def test_table_is_cached_on_disk(tmp_path):
+    p_dict = dict(BASE_P_DICT, vo=2.)
+    z = np.linspace(.1, 6., 20)
+    fp_steady_state._fp_table_cache.clear()
+    sol = fp_steady_state_antipara_tab(z, 0., 0., p_dict, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob('fp_table_*.npz'))) == 1
+
+    # Solution is read back from disk once the memory cache is gone
+    fp_steady_state._fp_table_cache.clear()
+    sol_cached = fp_steady_state_antipara_tab(z, 0., 0., p_dict,
+                                              cache_dir=tmp_path)
+    np.testing.assert_array_equal(sol, sol_cached)
+
+    # Concentration does not change the table
+    fp_steady_state_antipara_tab(z, 0., 0., dict(p_dict, co=1.),
+                                 cache_dir=tmp_path)
+    assert len(list(tmp_path.glob('fp_table_*.npz'))) == 1
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests that the command line analysis starts without plotting libraries."""
+
+import subprocess
+import sys
+
+# Seconds allowed for importing the command line module in a fresh
+# interpreter. Loading matplotlib alone takes longer than this on most nodes.
+IMPORT_TIME_BUDGET = 1.
+
+PLOTTING_MODULES = ['matplotlib', 'scipy.signal', 'cv2']
+
+
+def run_python(code):
+    """Run code in a fresh interpreter and return its stdout."""
+    return subprocess.run([sys.executable, '-c', code], check=True,
+                          capture_output=True, text=True).stdout
+
+
+def test_cli_does_not_import_plotting_modules():
+    out = run_python(
+        "import sys\n"
+        "import simcore_analysis.simcore_analysis\n"
+        "print(','.join(m for m in {!r} if m in sys.modules))".format(
+            PLOTTING_MODULES))
+    assert out.strip() == ''
+
+
+def test_cli_import_time_budget():
+    out = run_python(
+        "import time\n"
+        "t0 = time.perf_counter()\n"
+        "import simcore_analysis.simcore_analysis\n"
+        "print(time.perf_counter() - t0)")
+    assert float(out) < IMPORT_TIME_BUDGET
+
+
+def test_package_attributes_load_on_access():
+    out = run_python(
+        "import sys\n"
+        "import simcore_analysis\n"
+        "print('matplotlib' in sys.modules)\n"
+        "print(simcore_analysis.SeedData.__name__)\n"
+        "print(callable(simcore_analysis.run_seed_scan_analysis))")
+    assert out.split() == ['False', 'SeedData', 'True']
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.ot_movie` module."""
+
+import sys
+import subprocess
+import numpy as np
+import pytest
+
+from simcore_analysis import ot_movie
+from simcore_analysis.ot_movie import get_sorted_frames, make_generic_movie
+
+
+def test_frames_sorted_by_number(tmp_path):
+    for n in (10, 2, 1, 33, 7):
+        (tmp_path / 'frame_{}.bmp'.format(n)).touch()
+    assert [n for n, _ in get_sorted_frames(tmp_path)] == [1, 2, 7, 10, 33]
+    assert [n for n, _ in get_sorted_frames(tmp_path, start=2, stop=33,
+                                            step=2)] == [2, 10]
+
+
+def test_movie_frames_in_order(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    frame_dir = tmp_path / 'images'
+    frame_dir.mkdir()
+    levels = {}
+    for n in range(24):
+        # Frames are written out of order and one has the wrong size
+        shape = (64, 96, 3) if n != 5 else (32, 48, 3)
+        levels[n] = 10 * n
+        cv2.imwrite(str(frame_dir / 'frame_{}.bmp'.format(n)),
+                    np.full(shape, levels[n], dtype=np.uint8))
+    assert make_generic_movie(tmp_path, start=2, step=3, n_threads=3,
+                              read_ahead=2) == 8
+
+    vid = cv2.VideoCapture(str(tmp_path / 'ot_movie.mp4'))
+    means = []
+    while True:
+        ok, img = vid.read()
+        if not ok:
+            break
+        assert img.shape == (64, 96, 3)
+        means += [img.mean()]
+    vid.release()
+    np.testing.assert_allclose(means, [levels[n] for n in range(2, 24, 3)],
+                               atol=4.)
+
+
+def test_runs_as_a_script(tmp_path):
+    # Outside the package, so sc_video is found next to the script
+    proc = subprocess.run([sys.executable, ot_movie.__file__, 'images'],
+                          cwd=tmp_path, capture_output=True, text=True)
+    assert proc.returncode == 1
+    assert 'No frames found' in proc.stdout
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_animation_funcs` module."""
+
+import shutil
+import subprocess
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+
+
+def test_render_frame_chunks_match(seed_param_file, tmp_path):
+    from simcore_analysis import sc_animation_funcs as saf
+    saf.init_render_worker(str(seed_param_file), (10., 5.), 100.)
+    try:
+        saf.render_frame_chunk([3, 4], tmp_path / 'a.rgba')
+        saf.render_frame_chunk([0, 1, 2, 3], tmp_path / 'b.rgba')
+        frame_size = 1000 * 500 * 4
+        raw_a = (tmp_path / 'a.rgba').read_bytes()
+        raw_b = (tmp_path / 'b.rgba').read_bytes()
+        assert len(raw_a) == 2 * frame_size
+        assert len(raw_b) == 4 * frame_size
+        # A frame is the same whichever chunk renders it
+        assert raw_a[:frame_size] == raw_b[3 * frame_size:]
+    finally:
+        saf._RENDER_WORKER['sd_data'].close()
+        matplotlib.pyplot.close(saf._RENDER_WORKER['fig'])
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None,
+                    reason="ffmpeg is not installed")
+def test_parallel_movie_matches_serial(seed_param_file, tmp_path):
+    from simcore_analysis.sc_seed_data import SeedData
+    from simcore_analysis.sc_animation_funcs import (
+        make_sc_movie, make_sc_animation_parallel)
+
+    def frame_md5s(movie_path):
+        out = subprocess.run(['ffmpeg', '-loglevel', 'error', '-i',
+                              str(movie_path), '-f', 'framemd5', '-'],
+                             capture_output=True, text=True, check=True)
+        return [line.split(',')[-1] for line in out.stdout.splitlines()
+                if not line.startswith('#')]
+
+    with SeedData(seed_param_file.name, seed_param_file.parent) as sd_data:
+        make_sc_movie(sd_data, save_path=tmp_path, save_name='serial')
+    with SeedData(seed_param_file.name, seed_param_file.parent) as sd_data:
+        make_sc_animation_parallel(sd_data, save_path=tmp_path,
+                                   save_name='parallel', n_procs=2,
+                                   frames_per_chunk=3)
+    serial = frame_md5s(tmp_path / 'serial_min.mp4')
+    assert len(serial) == 20
+    assert frame_md5s(tmp_path / 'parallel_min.mp4') == serial
+
+
+def test_make_animation_without_ffmpeg(seed_param_file, monkeypatch):
+    cv2 = pytest.importorskip('cv2')
+    from simcore_analysis.simcore_analysis import make_animation
+    monkeypatch.setattr(shutil, 'which', lambda cmd: None)
+    # Movies are made from inside the seed directory, like the command line
+    monkeypatch.chdir(seed_param_file.parent)
+    movie_path = seed_param_file.with_name('synthetic_min.mp4')
+    try:
+        make_animation(seed_param_file.name, n_procs=1)
+        vid = cv2.VideoCapture(str(movie_path))
+        assert int(vid.get(cv2.CAP_PROP_FRAME_COUNT)) == 20
+        vid.release()
+    finally:
+        movie_path.unlink(missing_ok=True)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_benchmark` module."""
+
+from simcore_analysis.sc_benchmark import (BENCHMARKS, compare_to_baseline,
+                                           run_scale)
+
+
+def test_tiny_scale_reports_every_benchmark(tmp_path):
+    results = run_scale({'n_frames': 20, 'xl_density': .1, 'n_seeds': 2},
+                        tmp_root=tmp_path)
+    assert set(results) == set(BENCHMARKS)
+    assert results['ingest']['frames'] == 40
+    assert results['seed_scan']['frames'] == 40
+    assert all(res['frames_per_sec'] > 0 for res in results.values())
+
+
+def test_compare_to_baseline_flags_slow_benchmarks():
+    baseline = {'results': {'small': {
+        'ingest': {'frames_per_sec': 100.},
+        'render': {'frames_per_sec': 10.}}}}
+    report = {'results': {'small': {
+        'ingest': {'frames_per_sec': 90.},
+        'render': {'frames_per_sec': 5.},
+        'seed_scan': {'frames_per_sec': 1.}}}}
+    assert compare_to_baseline(report, baseline, .25) == [
+        ('small', 'render', 5., 10.)]
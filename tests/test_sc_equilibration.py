@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_equilibration` module."""
+
+import numpy as np
+
+from simcore_analysis.sc_equilibration import (find_equilibration_index,
+                                               find_seed_equilibration_index,
+                                               mser)
+
+
+def make_relaxing_series(n_frames, tau, rng):
+    """Exponential relaxation to a steady state with noise on top."""
+    t = np.arange(n_frames)
+    return 10. * np.exp(-t / tau) + rng.normal(0, .1, n_frames)
+
+
+def test_mser_matches_direct_computation():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=50)
+    direct = [np.var(x[d:]) / (x.size - d) for d in range(25)]
+    np.testing.assert_allclose(mser(x), direct)
+
+
+def test_start_index_after_transient():
+    rng = np.random.default_rng(1)
+    x = make_relaxing_series(2000, 50., rng)
+    ind = find_equilibration_index(x)
+    assert 150 < ind < 600
+
+
+def test_constant_series_starts_at_zero():
+    assert find_equilibration_index(np.ones(100)) == 0
+
+
+def test_vectorized_over_seeds_and_observables():
+    rng = np.random.default_rng(2)
+    taus = [[20., 80.], [40., 10.], [60., 30.]]
+    obs_arr = np.asarray([[make_relaxing_series(2000, tau, rng)
+                           for tau in seed_taus] for seed_taus in taus])
+    seed_ind_arr, obs_ind_arr = find_seed_equilibration_index(obs_arr)
+    assert obs_ind_arr.shape == (3, 2)
+    assert seed_ind_arr.shape == (3,)
+    for i in range(3):
+        for j in range(2):
+            assert obs_ind_arr[i, j] == find_equilibration_index(
+                obs_arr[i, j])
+    np.testing.assert_array_equal(seed_ind_arr, obs_ind_arr.max(axis=1))
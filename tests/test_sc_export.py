@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_export` module."""
+
+import h5py
+import numpy as np
+import pytest
+
+from simcore_analysis.sc_export import (FRAME_COLUMNS,
+                                        export_param_scan_parquet,
+                                        get_seed_frame_columns)
+from simcore_analysis.simcore_analysis import run_seed_analysis
+from simcore_analysis.sc_synthetic import write_synthetic_seed_scan
+from simcore_analysis.sc_work_queue import work_dir
+
+
+def make_analyzed_scan(sim_dir, n_seeds=2):
+    for param_file in write_synthetic_seed_scan(sim_dir / 'p0', n_seeds,
+                                                n_frames=30, xl_density=.2):
+        with work_dir(param_file.parent):
+            run_seed_analysis(param_file.name)
+
+
+def test_seed_frame_columns_are_flat_and_aligned(tmp_path):
+    make_analyzed_scan(tmp_path, 1)
+    with h5py.File(tmp_path / 'p0/s0/synthetic_data.h5', 'r') as h5_data:
+        columns = get_seed_frame_columns(h5_data)
+        np.testing.assert_array_equal(columns['xl_force_z'],
+                                      h5_data['analysis/xl_forces'][:, 2])
+    assert all(col.shape == (30,) for col in columns.values())
+    assert set(name for name, _, _ in FRAME_COLUMNS) <= set(columns)
+    # Synthetic filaments are antiparallel and one unit apart along z
+    np.testing.assert_allclose(columns['fil_angle'], np.pi)
+    np.testing.assert_allclose(columns['fil_sep'], 1.)
+
+
+def test_export_partitions_by_param_and_seed(tmp_path):
+    ds = pytest.importorskip('pyarrow.dataset')
+    pq = pytest.importorskip('pyarrow.parquet')
+    make_analyzed_scan(tmp_path / 'simulations')
+    n_seeds = export_param_scan_parquet(tmp_path / 'simulations',
+                                        tmp_path / 'parquet', 'k_spring',
+                                        'crosslink')
+    assert n_seeds == 2
+    frames = ds.dataset(tmp_path / 'parquet/frames', partitioning='hive')
+    table = frames.to_table(columns=['time', 'param_dir'],
+                            filter=ds.field('seed') == 1)
+    assert table.num_rows == 30
+    catalog = pq.read_table(tmp_path / 'parquet/catalog.parquet')
+    assert sorted(catalog.column('seed').to_pylist()) == [0, 1]
+    assert catalog.column('crosslink.k_spring').to_pylist() == [10., 10.]
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_graphs` module."""
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+
+
+@pytest.fixture(scope='module')
+def seed_run():
+    return {'n_frames': 30, 'xl_density': .2}
+
+
+@pytest.fixture
+def seed_figure(seed_param_file):
+    import matplotlib.pyplot as plt
+    from simcore_analysis.sc_seed_data import SeedData
+    sd_data = SeedData(seed_param_file.name, seed_param_file.parent)
+    fig = plt.figure(constrained_layout=True, figsize=(10, 5))
+    gs = fig.add_gridspec(1, 2)
+    axarr = np.asarray([fig.add_subplot(gs[0]), fig.add_subplot(gs[1])])
+    yield fig, axarr, sd_data
+    plt.close(fig)
+    sd_data.save()
+
+
+def test_frame_artists_update_in_place(seed_figure):
+    from simcore_analysis.sc_graphs import sc_graph_all_data_2d
+    fig, axarr, sd_data = seed_figure
+    first = sc_graph_all_data_2d(0, fig, axarr, sd_data)
+    n_children = [len(ax.get_children()) for ax in axarr]
+    for n in range(1, 30, 7):
+        artists = sc_graph_all_data_2d(n, fig, axarr, sd_data)
+        assert all(a is b for a, b in zip(artists, first))
+        fig.canvas.draw()
+        n_dbl = sd_data.h5_data['xl_data/doubly_bound'][n, 0].size
+        assert len(sd_data.frame_artists.xlinks.get_segments()) == n_dbl
+        assert len(sd_data.frame_artists.heads.get_offsets()) == 2 * n_dbl
+    assert [len(ax.get_children()) for ax in axarr] == n_children
+
+
+def test_blit_matches_full_draw(seed_figure):
+    from simcore_analysis.sc_graphs import SeedFrameArtists
+    fig, axarr, sd_data = seed_figure
+    frame_artists = SeedFrameArtists(fig, axarr, sd_data)
+    frame_artists.blit(20)
+    blitted = np.array(fig.canvas.buffer_rgba())
+    for artist in frame_artists.artists:
+        artist.set_animated(False)
+    fig.canvas.draw()
+    # Spines drawn twice differ slightly in their antialiased edges
+    np.testing.assert_allclose(np.array(fig.canvas.buffer_rgba()), blitted,
+                               atol=32)
+
+
+def test_draw_xlinks_batches_heads():
+    import matplotlib.pyplot as plt
+    from simcore_analysis.sc_graphs import draw_xlinks
+    fig, ax = plt.subplots()
+    r_i, r_j = np.array([0., 0., 0.]), np.array([0., 1., 2.])
+    u_i, u_j = np.array([0., 1., 0.]), np.array([0., 0., -1.])
+    s_i, s_j = np.linspace(-1., 1., 50), np.linspace(0., 1., 50)
+    xlinks, heads = draw_xlinks(ax, r_i, r_j, u_i, u_j, s_i, s_j, .1)
+    segs = np.asarray(xlinks.get_segments())
+    assert segs.shape == (50, 2, 2)
+    np.testing.assert_allclose(segs[:, 0], np.stack((s_i, 0. * s_i), -1))
+    np.testing.assert_allclose(segs[:, 1], np.stack((1. + 0. * s_j,
+                                                     2. - s_j), -1))
+    assert len(heads.get_offsets()) == 100
+    assert len(ax.collections) == 2 and not ax.patches
+    empty, _ = draw_xlinks(ax, r_i, r_j, u_i, u_j, [], [], .1)
+    assert len(empty.get_segments()) == 0
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def test_rod_diagram_data_computed_once(seed_figure):
+    from simcore_analysis.sc_graphs import (get_rod_diagram_data,
+                                            graph_2d_rod_diagram)
+    fig, axarr, sd_data = seed_figure
+    rd_data = get_rod_diagram_data(sd_data)
+    for n in (0, 10, -1):
+        graph_2d_rod_diagram(axarr[0], sd_data, n)
+        assert get_rod_diagram_data(sd_data) is rd_data
+    min_x, max_x = rd_data['lims']
+    L_i = rd_data['lengths'][0]
+    r_i, u_i = rd_data['r_arrs'][0], rd_data['u_arrs'][0]
+    for sign in (-.5, .5):
+        ends = r_i[:, 1:] + sign * L_i * u_i[:, 1:]
+        assert np.all((ends >= min_x) & (ends <= max_x))
+    assert axarr[0].get_xlim() == axarr[0].get_ylim() == (min_x, max_x)
+
+
+def test_heatmap_uses_image_on_uniform_grids(seed_param_file, tmp_path):
+    import matplotlib.pyplot as plt
+    from matplotlib.image import AxesImage
+    from matplotlib.collections import QuadMesh
+    from simcore_analysis.sc_graphs import graph_heatmap, graph_avg_xlink_distr
+    fig, ax = plt.subplots()
+    vals = np.arange(12.).reshape(3, 4)
+    image = graph_heatmap(ax, np.linspace(0., 4., 5), np.linspace(0., 3., 4),
+                          vals)
+    assert isinstance(image, AxesImage)
+    assert ax.get_xlim() == (0., 4.) and ax.get_ylim() == (0., 3.)
+    mesh = graph_heatmap(ax, np.array([0., 1., 3., 4., 6.]),
+                         np.linspace(0., 3., 4), vals, rasterized=True)
+    assert isinstance(mesh, QuadMesh) and mesh.get_rasterized()
+    plt.close(fig)
+
+    import h5py
+    fig, ax = plt.subplots()
+    with h5py.File(seed_param_file.parent / 'synthetic_data.h5', 'r') as h5:
+        avg = graph_avg_xlink_distr(h5, fig, ax, bin_num=401)
+        assert isinstance(avg, AxesImage)
+        assert avg.get_array().shape == (400, 400)
+    fig.savefig(tmp_path / 'avg.svg')
+    plt.close(fig)
+
+
+def test_frame_artists_follow_the_figure(seed_figure):
+    import matplotlib.pyplot as plt
+    from simcore_analysis.sc_graphs import sc_graph_all_data_2d
+    fig, axarr, sd_data = seed_figure
+    sc_graph_all_data_2d(0, fig, axarr, sd_data)
+    fig2, axarr2 = plt.subplots(1, 2, figsize=(10, 5))
+    artists = sc_graph_all_data_2d(5, fig2, axarr2, sd_data)
+    assert sd_data.frame_artists.fig is fig2
+    assert all(a.figure is fig2 for a in artists)
+    assert len(axarr2[0].lines) == 2 and len(axarr2[1].images) == 1
+    plt.close(fig2)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_keyframes` module."""
+
+import h5py
+import numpy as np
+import pytest
+
+from simcore_analysis.sc_keyframes import (get_frame_scores,
+                                           select_keyframes)
+
+
+def write_seed_h5(path, fil_pos):
+    n_frames = fil_pos.shape[0]
+    fil_orient = np.zeros_like(fil_pos)
+    fil_orient[:, 2] = 1.
+    with h5py.File(path, 'w') as h5_data:
+        h5_data['filament_data/time'] = np.arange(n_frames, dtype=float)
+        h5_data['filament_data/filament_position'] = fil_pos
+        h5_data['filament_data/filament_orientation'] = fil_orient
+        h5_data['analysis/xl_zeroth_moment'] = np.full(n_frames, 3)
+        h5_data['analysis/xl_first_moments'] = np.zeros((n_frames, 2))
+    return h5py.File(path, 'r')
+
+
+@pytest.fixture
+def burst_h5(tmp_path):
+    # Filaments only move between frames 400 and 500 of 1000
+    fil_pos = np.zeros((1000, 3, 2))
+    fil_pos[400:500, 1, 1] = np.linspace(0., 10., 100)
+    fil_pos[500:, 1, 1] = 10.
+    h5_data = write_seed_h5(tmp_path / 'burst_data.h5', fil_pos)
+    yield h5_data
+    h5_data.close()
+
+
+def test_keyframes_follow_changes(burst_h5):
+    scores = get_frame_scores(burst_h5)
+    assert scores.size == 999 and scores.sum() == pytest.approx(1.)
+    frames = select_keyframes(burst_h5, 100)
+    assert frames.size == 100
+    assert frames[0] == 0 and frames[-1] == 999
+    assert np.all(np.diff(frames) > 0)
+    # The burst covers a tenth of the run but gets most of the frames
+    in_burst = np.count_nonzero((frames >= 400) & (frames <= 500))
+    assert in_burst > 50
+    # Quiescent stretches still get frames
+    assert np.count_nonzero(frames < 400) > 5
+
+
+def test_keyframes_of_short_and_still_runs(tmp_path):
+    with write_seed_h5(tmp_path / 'short_data.h5',
+                       np.zeros((7, 3, 2))) as h5_data:
+        np.testing.assert_array_equal(select_keyframes(h5_data, 100),
+                                      np.arange(7))
+    with write_seed_h5(tmp_path / 'still_data.h5',
+                       np.zeros((301, 3, 2))) as h5_data:
+        frames = select_keyframes(h5_data, 31)
+        # Nothing changes so frames are evenly spaced
+        np.testing.assert_array_equal(frames, np.arange(0, 301, 10))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_lazy` module."""
+
+import h5py
+import numpy as np
+import pytest
+
+from simcore_analysis import sc_lazy
+from simcore_analysis.sc_lazy import (seed_mean_std, stack_param_scan_dsets,
+                                      stack_seed_dsets)
+
+pytest.importorskip('dask.array')
+
+
+@pytest.fixture
+def seed_files(tmp_path):
+    rng = np.random.default_rng(0)
+    h5_data_lst = []
+    for i in range(4):
+        h5d = h5py.File(tmp_path / 's{}.h5'.format(i), 'w')
+        h5d.create_dataset('analysis/xl_forces', data=rng.normal(size=(50, 3)),
+                           chunks=(10, 3))
+        h5_data_lst += [h5d]
+    yield h5_data_lst
+    for h5d in h5_data_lst:
+        h5d.close()
+
+
+def test_lazy_stack_matches_eager(seed_files):
+    eager = stack_seed_dsets(seed_files, 'analysis/xl_forces', lazy=False)
+    lazy = stack_seed_dsets(seed_files, 'analysis/xl_forces', lazy=True)
+    assert lazy.shape == eager.shape == (4, 50, 3)
+    assert lazy.chunks[1] == (10,) * 5
+    for arr_e, arr_l in zip(seed_mean_std(eager), seed_mean_std(lazy)):
+        np.testing.assert_allclose(arr_l, arr_e)
+    np.testing.assert_array_equal(
+        stack_seed_dsets(seed_files, 'analysis/xl_forces', 2, lazy=True),
+        eager[:, :, 2])
+
+
+def test_param_scan_stack(seed_files):
+    arr = stack_param_scan_dsets([seed_files[:2], seed_files[2:]],
+                                 'analysis/xl_forces')
+    assert arr.shape == (2, 2, 50, 3)
+    with pytest.raises(ValueError):
+        stack_param_scan_dsets([seed_files[:1], seed_files[1:]],
+                               'analysis/xl_forces')
+
+
+def test_backend_setting(seed_files, monkeypatch):
+    monkeypatch.setitem(sc_lazy.ARRAY_BACKEND, 'lazy', True)
+    assert sc_lazy.is_lazy(stack_seed_dsets(seed_files,
+                                            'analysis/xl_forces'))
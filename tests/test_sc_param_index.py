@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_param_index` module."""
+
+import os
+import h5py
+import yaml
+
+from simcore_analysis.sc_param_index import ParamIndex, flatten_param_dict
+
+
+def write_scan_file(dir_path, k_spring, n_steps=100):
+    p_dict = {'run_name': 'sc', 'n_steps': n_steps,
+              'crosslink': [{'name': 'xl'}]}
+    if k_spring is not None:
+        p_dict['crosslink'][0]['k_spring'] = k_spring
+    pdir = dir_path / 'ks{}'.format(k_spring)
+    pdir.mkdir(exist_ok=True)
+    h5_path = pdir / '{}.h5'.format(pdir.name)
+    with h5py.File(h5_path, 'w') as h5_data:
+        h5_data.attrs['param_file'] = yaml.dump(p_dict)
+    return h5_path
+
+
+def test_flatten_param_dict():
+    flat = flatten_param_dict({'n_steps': 10,
+                               'crosslink': [{'name': 'xl', 'k_spring': 2.},
+                                             {'name': 'mt', 'k_spring': 3.}],
+                               'rigid_filament': [{'length': 40}]})
+    assert flat['n_steps'] == 10
+    assert flat['crosslink.k_spring'] == 2.
+    assert flat['crosslink.mt.k_spring'] == 3.
+    assert flat['rigid_filament.length'] == 40
+
+
+def test_sort_filter(tmp_path):
+    for ks in [3., 1., 2.]:
+        write_scan_file(tmp_path, ks, n_steps=100 if ks < 3 else 200)
+    index = ParamIndex(tmp_path)
+    sorted_paths = index.sort('k_spring', 'crosslink')
+    assert [index.get(p, 'k_spring', 'crosslink')
+            for p in sorted_paths] == [1., 2., 3.]
+    assert len(index.filter('k_spring', 2., 'crosslink')) == 1
+    assert len(index.filter('k_spring', lambda v: v > 1., 'crosslink')) == 2
+    assert len(index.filter('n_steps', 100)) == 2
+
+
+def test_files_without_param(tmp_path):
+    no_ks_path = write_scan_file(tmp_path, None)
+    for ks in [2., 1.]:
+        write_scan_file(tmp_path, ks)
+    index = ParamIndex(tmp_path)
+    assert not index.has(no_ks_path, 'k_spring', 'crosslink')
+    # Files without the parameter are sorted last and never kept by filters
+    sorted_paths = index.sort('k_spring', 'crosslink')
+    assert sorted_paths[-1] == no_ks_path
+    assert [index.get(p, 'k_spring', 'crosslink')
+            for p in sorted_paths[:-1]] == [1., 2.]
+    assert no_ks_path not in index.filter('k_spring', lambda v: True,
+                                          'crosslink')
+
+
+def test_index_is_reused_and_invalidated(tmp_path):
+    h5_path = write_scan_file(tmp_path, 1.)
+    write_scan_file(tmp_path, 2.)
+    assert ParamIndex(tmp_path).get(h5_path, 'k_spring', 'crosslink') == 1.
+
+    # Nothing changed so nothing is re-parsed
+    assert not ParamIndex(tmp_path).update()
+
+    # Changed files are re-parsed, removed files are dropped
+    write_scan_file(tmp_path, 1., n_steps=500)
+    st = h5_path.stat()
+    os.utime(h5_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    (tmp_path / 'ks2.0' / 'ks2.0.h5').unlink()
+    index = ParamIndex(tmp_path)
+    assert index.get(h5_path, 'n_steps') == 500
+    assert len(index.paths) == 1
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_parse_data` module."""
+
+import pytest
+
+from simcore_analysis.sc_parse_data import (get_cpu_time_from_log,
+                                            get_timings_from_log)
+
+
+def test_timings_read_from_end_of_large_log(tmp_path):
+    log_file = tmp_path / 'run.log'
+    log_file.write_text('Step 1000 of 100000\n' * 50000 +
+                        '  Setup Time: 1.5\n'
+                        'CPU Time: 123.45\n'
+                        'Wall time: 2.5e2\n'
+                        'Simulation complete\n')
+    timings = get_timings_from_log(log_file, tail_bytes=64)
+    assert timings == {'setup_time': 1.5, 'cpu_time': 123.45,
+                       'wall_time': 250.}
+    assert get_cpu_time_from_log(log_file) == 123.45
+
+
+def test_cpu_time_found_near_start_of_log(tmp_path):
+    log_file = tmp_path / 'run.log'
+    log_file.write_text('CPU Time: 7.25\n' + 'Step\n' * 1000)
+    assert get_cpu_time_from_log(log_file) == 7.25
+
+
+def test_log_read_back_at_most_max_bytes(tmp_path):
+    log_file = tmp_path / 'run.log'
+    log_file.write_text('CPU Time: 7.25\n' + 'Step\n' * 1000 +
+                        'Setup Time: 1.5\n')
+    # The CPU time is further back than max_bytes, so it is not found
+    assert get_timings_from_log(log_file, tail_bytes=64,
+                                max_bytes=1024) == {'setup_time': 1.5}
+
+
+def test_missing_cpu_time(tmp_path):
+    log_file = tmp_path / 'run.log'
+    log_file.write_text('Step\n' * 10)
+    with pytest.raises(ValueError):
+        get_cpu_time_from_log(log_file)
+    with pytest.raises(OSError):
+        get_cpu_time_from_log(tmp_path / 'missing.log')
+
+
+def test_timings_with_line_prefixes(tmp_path):
+    log_file = tmp_path / 'run.log'
+    log_file.write_text('[2024-05-01 12:00:00] INFO: Step 10\n'
+                        '[2024-05-01 12:00:01] INFO: Setup Time: 1.5\n'
+                        '2024-05-01 12:00:02 CPU Time: 12.3\n')
+    assert get_timings_from_log(log_file) == {'setup_time': 1.5,
+                                              'cpu_time': 12.3}
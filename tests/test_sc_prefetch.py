@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_prefetch` module."""
+
+import threading
+import time
+import numpy as np
+import pytest
+
+from simcore_analysis.sc_prefetch import Prefetcher, get_nbytes
+
+
+def load_ones(n):
+    return np.ones(n)
+
+
+def fail_on_three(n):
+    if n == 3:
+        raise ValueError("bad item")
+    return n
+
+
+@pytest.mark.parametrize('depth', [0, 1, 3])
+def test_prefetcher_keeps_order(depth):
+    items = list(range(1, 10))
+    out = list(Prefetcher(items, load_ones, depth=depth))
+    assert [item for item, _ in out] == items
+    assert [data.size for _, data in out] == items
+
+
+def test_prefetcher_processes():
+    out = list(Prefetcher([2, 4], load_ones, depth=2, processes=True))
+    assert [data.size for _, data in out] == [2, 4]
+
+
+def test_prefetcher_memory_cap():
+    loaded = []
+    lock = threading.Lock()
+
+    def load(n):
+        with lock:
+            loaded.append(n)
+        return np.ones(100)
+
+    # Each 800 byte item fills the cap, so the loader waits for
+    # the consumer instead of filling the queue
+    prefetcher = Prefetcher(range(5), load, depth=4, max_bytes=500)
+    for item, _ in prefetcher:
+        time.sleep(.05)
+        with lock:
+            assert len(loaded) <= item + 2
+
+
+def test_prefetcher_raises_load_error():
+    prefetcher = Prefetcher(range(5), fail_on_three, depth=2)
+    with pytest.raises(ValueError):
+        for item, _ in prefetcher:
+            assert item < 3
+
+
+def test_prefetcher_stops_early():
+    for item, _ in Prefetcher(range(100), load_ones, depth=2):
+        if item == 2:
+            break
+
+
+def test_get_nbytes():
+    arr = np.zeros(10)
+    ragged = np.empty(2, dtype=object)
+    ragged[0], ragged[1] = np.zeros(2), np.zeros(3)
+    assert get_nbytes((arr, [arr], {'a': arr}, 3)) == 3 * arr.nbytes
+    assert get_nbytes(ragged) == ragged.nbytes + 40
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_profile` module."""
+
+import json
+
+import h5py
+import numpy as np
+
+from simcore_analysis.sc_profile import StageProfiler
+
+
+def test_nested_stages_accumulate():
+    prof = StageProfiler(enabled=True)
+    for _ in range(2):
+        with prof.span('outer'):
+            with prof.span('inner'):
+                prof.add_frames(10)
+                np.ones(100000).sum()
+    report = prof.report()
+    assert set(report) == {'outer', 'outer/inner'}
+    assert report['outer']['calls'] == 2
+    assert report['outer/inner']['frames'] == 20
+    assert report['outer']['frames'] == 0
+    assert report['outer']['wall_time'] >= report['outer/inner']['wall_time']
+    assert report['outer/inner']['process_peak_rss'] > 0
+
+
+def test_stage_rss_growth():
+    prof = StageProfiler(enabled=True)
+    kept = []
+    with prof.span('alloc'):
+        kept += [np.ones(1 << 24)]
+    with prof.span('idle'):
+        pass
+    report = prof.report()
+    # The 128 MiB array stays resident after its stage
+    assert report['alloc']['rss_growth'] > 100 << 20
+    assert report['idle']['rss_growth'] < 16 << 20
+
+
+def test_disabled_profiler_records_nothing():
+    prof = StageProfiler()
+    with prof.span('stage'):
+        prof.add_frames(5)
+    assert prof.report() == {}
+
+
+def test_report_written_to_json_and_h5(tmp_path):
+    prof = StageProfiler(enabled=True)
+    with prof.span('ingest'):
+        with prof.span('reader'):
+            prof.add_frames(3)
+    with h5py.File(tmp_path / 'out.h5', 'w') as h5_out:
+        prof.write_report(h5_out, tmp_path / 'out_profile.json')
+    with h5py.File(tmp_path / 'out.h5', 'r') as h5_out:
+        assert h5_out['profile/ingest/reader'].attrs['frames'] == 3
+        assert h5_out['profile/ingest'].attrs['calls'] == 1
+    with open(tmp_path / 'out_profile.json', 'r') as inf:
+        report = json.load(inf)
+    assert report['ingest']['frames_per_sec'] is None
+    assert report['ingest/reader']['frames'] == 3
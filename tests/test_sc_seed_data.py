@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_seed_data` module."""
+
+import h5py
+import numpy as np
+import pytest
+
+from simcore_analysis.sc_seed_data import FrameCache, SeedData
+
+
+@pytest.fixture(scope='module')
+def seed_run():
+    return {'n_frames': 40, 'xl_density': .5}
+
+
+@pytest.fixture(scope='module')
+def ref_distrs(seed_param_file):
+    with h5py.File(seed_param_file.with_name('synthetic_data.h5'),
+                   'r') as h5_data:
+        length = h5_data['filament_data'].attrs['lengths'][0]
+        fil_bins = np.linspace(-.5 * length, .5 * length, 120)
+        dbl_xlink = h5_data['xl_data/doubly_bound'][...]
+    return np.asarray([np.histogram2d(heads[0], heads[1], fil_bins)[0]
+                       for heads in dbl_xlink])
+
+
+def test_frame_cache_evicts_least_recent():
+    loads = []
+    cache = FrameCache(lambda n: loads.append(n) or n * 10, 10, maxsize=2)
+    assert cache[1] == 10 and cache[-1] == 90
+    assert cache[1] == 10
+    cache[2]
+    assert 1 in cache and 9 not in cache
+    assert loads == [1, 9, 2]
+
+
+def test_seed_data_is_lazy(seed_param_file, ref_distrs):
+    with SeedData(seed_param_file.name, seed_param_file.parent) as sd_data:
+        assert sd_data.n_frames == 40
+        assert 'time' not in sd_data.__dict__
+        assert not any(n in sd_data.xl_dbl_distr_arr for n in range(40))
+        np.testing.assert_array_equal(sd_data.xl_dbl_distr_arr[7],
+                                      ref_distrs[7])
+        assert sd_data.xl_dbl_distr_max == ref_distrs.max()
+        # A second reader of the same seed can open it at the same time
+        with SeedData(seed_param_file.name,
+                      seed_param_file.parent) as sd_other:
+            assert sd_other.time.size == 40
+    assert not sd_data.h5_data
+
+
+def test_seed_data_frame_subset(seed_param_file, ref_distrs):
+    frames = [0, 12, 24, 36]
+    with SeedData(seed_param_file.name, seed_param_file.parent,
+                  frames=frames, cache_size=1) as sd_data:
+        assert all(n in sd_data.xl_dbl_distr_arr for n in frames)
+        assert sd_data.xl_dbl_distr_max == ref_distrs[frames].max()
+        distrs, _ = sd_data.analyze_xlink_distr()
+        np.testing.assert_array_equal(distrs, ref_distrs[frames])
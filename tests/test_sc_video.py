@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_video` module."""
+
+import shutil
+import subprocess
+import numpy as np
+import pytest
+
+from simcore_analysis.sc_video import VideoSink
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None,
+                                  reason="ffmpeg is not installed")
+
+
+def count_frames(movie_path):
+    out = subprocess.run(['ffmpeg', '-loglevel', 'error', '-i',
+                          str(movie_path), '-f', 'framemd5', '-'],
+                         capture_output=True, text=True, check=True)
+    return sum(1 for line in out.stdout.splitlines()
+               if not line.startswith('#'))
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        VideoSink(tmp_path / 'a.mp4', (16, 16), backend='gif')
+
+
+def test_cv2_sink_converts_rgba(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    # Pure red, green and blue RGBA frames
+    frames = np.zeros((3, 48, 64, 4), dtype=np.uint8)
+    frames[..., 3] = 255
+    for i in range(3):
+        frames[i, ..., i] = 255
+    frames[2:].tofile(tmp_path / 'chunk.rgba')
+    with VideoSink(tmp_path / 'c.mp4', (64, 48), fps=10,
+                   backend='cv2') as sink:
+        for frame in frames[:2]:
+            sink.write(frame)
+        assert sink.write_raw_file(tmp_path / 'chunk.rgba') == 1
+    assert sink.n_frames == 3
+
+    vid = cv2.VideoCapture(str(tmp_path / 'c.mp4'))
+    imgs = []
+    while True:
+        ok, img = vid.read()
+        if not ok:
+            break
+        imgs += [img]
+    vid.release()
+    assert len(imgs) == 3
+    for i, img in enumerate(imgs):
+        # Decoded as BGR, so RGBA channel i comes back as channel 2 - i
+        assert img.shape == (48, 64, 3)
+        assert img[..., 2 - i].mean() > 200
+        assert np.delete(img, 2 - i, axis=-1).mean() < 50
+
+
+@needs_ffmpeg
+def test_sink_streams_frames_and_raw_files(tmp_path):
+    frames = np.random.default_rng(0).integers(
+        0, 255, (6, 24, 32, 4), dtype=np.uint8)
+    frames[3:].tofile(tmp_path / 'chunk.rgba')
+    with VideoSink(tmp_path / 'a.mp4', (32, 24), fps=10) as sink:
+        for frame in frames[:3]:
+            sink.write(frame)
+        assert sink.write_raw_file(tmp_path / 'chunk.rgba',
+                                   chunk_frames=2) == 3
+        with pytest.raises(ValueError):
+            sink.write(frames[0, :10])
+    assert sink.n_frames == 6
+    assert count_frames(tmp_path / 'a.mp4') == 6
+
+
+@needs_ffmpeg
+def test_sink_writes_agg_canvas(tmp_path):
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(2, 1.5), dpi=50)
+    line, = ax.plot([0, 1], [0, 1])
+    with VideoSink(tmp_path / 'b.mp4', fig.canvas.get_width_height(),
+                   bitrate=500) as sink:
+        for y in np.linspace(0., 1., 4):
+            line.set_ydata([y, 1. - y])
+            fig.canvas.draw()
+            sink.write_canvas(fig.canvas)
+    plt.close(fig)
+    assert count_frames(tmp_path / 'b.mp4') == 4
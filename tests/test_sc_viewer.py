@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_viewer` module."""
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+
+
+@pytest.fixture
+def viewer(seed_param_file):
+    from simcore_analysis.sc_seed_data import SeedData
+    from simcore_analysis.sc_viewer import SeedViewer
+    with SeedData(seed_param_file.name, seed_param_file.parent) as sd_data:
+        frame_bytes = 1000 * 500 * 4
+        with SeedViewer(sd_data, max_bytes=6 * frame_bytes,
+                        prefetch=2) as sd_viewer:
+            yield sd_viewer
+
+
+def test_viewer_frames_match_movie(viewer, seed_param_file, tmp_path):
+    from simcore_analysis import sc_animation_funcs as saf
+    saf.init_render_worker(str(seed_param_file), (10., 5.), 100.)
+    try:
+        saf.render_frame_chunk([7, 3], tmp_path / 'movie.rgba')
+    finally:
+        saf._RENDER_WORKER['sd_data'].close()
+        matplotlib.pyplot.close(saf._RENDER_WORKER['fig'])
+    raw = (tmp_path / 'movie.rgba').read_bytes()
+    frame_bytes = 1000 * 500 * 4
+    for i, n in enumerate((7, 3)):
+        image = viewer[n]
+        assert image.shape == (500, 1000, 4) and image.dtype == np.uint8
+        assert image.tobytes() == raw[i * frame_bytes:(i + 1) * frame_bytes]
+
+
+def test_viewer_prefetches_within_budget(viewer):
+    first = viewer.get_frame(10)
+    assert viewer.wait(30.)
+    # Two frames ahead and one behind are rendered in the background
+    assert all(n in viewer._images for n in (9, 10, 11, 12))
+    assert viewer[10] is first
+    # Scrubbing backwards prefetches backwards
+    viewer.get_frame(5)
+    assert viewer.wait(30.)
+    assert all(n in viewer._images for n in (3, 4, 5, 6))
+    assert 10 not in viewer._images or 12 not in viewer._images
+    assert len(viewer._images._cache) <= 6
+
+
+def test_viewer_frames_survive_small_cache(seed_param_file, monkeypatch):
+    import threading
+    import time
+    from simcore_analysis import sc_viewer
+    from simcore_analysis.sc_seed_data import SeedData
+
+    class SlowWaker(threading.Condition):
+        """Let the render thread prefetch before a waiting caller wakes"""
+        slow = False
+
+        def wait(self, timeout=None):
+            woken = super().wait(timeout)
+            if self.slow and threading.current_thread() is not thread:
+                self.release()
+                time.sleep(.3)
+                self.acquire()
+            return woken
+
+    with SeedData(seed_param_file.name, seed_param_file.parent) as sd_data:
+        monkeypatch.setattr(sc_viewer.threading, 'Condition', SlowWaker)
+        # The cache holds one frame, fewer than the prefetch window
+        sd_viewer = sc_viewer.SeedViewer(sd_data, max_bytes=1, prefetch=4)
+        monkeypatch.undo()
+        thread = sd_viewer._thread
+        sd_viewer._cond.slow = True
+        with sd_viewer:
+            for n in (10, 3, 15):
+                image = sd_viewer.get_frame(n, timeout=30.)
+                assert image.shape == (500, 1000, 4)
+            assert len(sd_viewer._images._cache) == 1
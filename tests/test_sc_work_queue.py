@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Tests for `simcore_analysis.sc_work_queue` module."""
+
+import os
+import time
+from multiprocessing import Process
+
+from simcore_analysis.sc_work_queue import (WorkQueue, make_tree_tasks,
+                                            parse_task_id, work_dir)
+
+
+def make_tasks(n_params=4, n_seeds=5):
+    tasks = []
+    deps = {}
+    for p in range(n_params):
+        seeds = ['seed:p{}/s{}'.format(p, s) for s in range(n_seeds)]
+        tasks += seeds
+        deps['scan:p{}'.format(p)] = seeds
+    tasks += ['scan:p{}'.format(p) for p in range(n_params)]
+    return tasks, deps
+
+
+def run_worker(queue_dir, log_path):
+    def log_task(task_id):
+        time.sleep(.01)
+        with open(log_path, 'a') as log:
+            log.write('{} {}\n'.format(task_id, time.time()))
+    tasks, deps = make_tasks()
+    WorkQueue(queue_dir, heartbeat_interval=.05).run(
+        tasks, log_task, deps, poll_interval=.01)
+
+
+def test_workers_share_tasks(tmp_path):
+    log_path = tmp_path / 'log.txt'
+    procs = [Process(target=run_worker, args=(tmp_path / 'queue', log_path))
+             for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+        assert proc.exitcode == 0
+
+    finish_times = {}
+    for line in log_path.read_text().splitlines():
+        task_id, t = line.split()
+        assert task_id not in finish_times  # Every task ran exactly once
+        finish_times[task_id] = float(t)
+    tasks, deps = make_tasks()
+    assert sorted(finish_times) == sorted(tasks)
+    for task_id, task_deps in deps.items():
+        assert all(finish_times[d] < finish_times[task_id] for d in task_deps)
+
+
+def test_stale_claims_are_reclaimed(tmp_path):
+    crashed = WorkQueue(tmp_path, stale_time=60., worker_id='crashed')
+    assert crashed.claim('task')
+    worker = WorkQueue(tmp_path, stale_time=60., worker_id='worker')
+    assert not worker.claim('task')
+
+    # Age the claim past the stale time as if no heartbeat came
+    claim_path = tmp_path / 'claimed' / 'task'
+    old = time.time() - 120.
+    os.utime(claim_path, (old, old))
+    assert worker.claim('task')
+    assert not crashed.heartbeat('task')
+    assert worker.heartbeat('task')
+
+    # The crashed worker can not release or complete the new claim
+    crashed.release('task')
+    assert worker.state('task') == 'claimed'
+    worker.complete('task')
+    assert worker.state('task') == 'done'
+    assert not worker.claim('task')
+
+
+def test_failed_tasks_fail_dependents(tmp_path):
+    def fail_seed(task_id):
+        if task_id.startswith('seed'):
+            raise RuntimeError("Bad seed")
+    queue = WorkQueue(tmp_path)
+    queue.run(['seed:a', 'scan:p'], fail_seed, {'scan:p': ['seed:a']},
+              poll_interval=.01)
+    assert queue.state('seed:a') == 'failed'
+    assert queue.state('scan:p') == 'failed'
+
+
+def test_heartbeat_survives_directory_change(tmp_path, monkeypatch, capsys):
+    (tmp_path / 'seed').mkdir()
+    monkeypatch.chdir(tmp_path)
+    queue = WorkQueue('queue', heartbeat_interval=.02)
+
+    def seed_task(task_id):
+        with work_dir('seed'):
+            time.sleep(.2)
+            assert queue.heartbeat(task_id)
+
+    assert queue.claim('seed:seed')
+    assert queue.run_task('seed:seed', seed_task)
+    assert 'Lost claim' not in capsys.readouterr().out
+    assert queue.state('seed:seed') == 'done'
+
+
+def test_reduction_tasks_follow_the_tree(tmp_path):
+    def add_seed(seed_dir):
+        seed_dir.mkdir(parents=True)
+        (seed_dir / 'sd_params.yaml').touch()
+
+    sim_dir = tmp_path / 'simulations'
+    add_seed(sim_dir / 'ks1' / 's0')
+    tasks, deps = make_tree_tasks(sim_dir)
+    assert [parse_task_id(t) for t in tasks] == [
+        ('seed', str(sim_dir / 'ks1' / 's0')), ('scan', str(sim_dir / 'ks1')),
+        ('run', str(sim_dir))]
+
+    # New parameter directories and seeds make new reduction tasks
+    add_seed(sim_dir / 'ks2' / 's0')
+    new_tasks, _ = make_tree_tasks(sim_dir)
+    assert new_tasks[2] == tasks[1] and new_tasks[-1] != tasks[-1]
+    add_seed(sim_dir / 'ks1' / 's1')
+    newest_tasks, newest_deps = make_tree_tasks(sim_dir)
+    assert tasks[1] not in newest_tasks
+    assert newest_deps[newest_tasks[-1]] == newest_tasks[-3:-1]
+
+
+def test_one_worker_takes_over_a_stale_claim(tmp_path):
+    import threading
+    assert WorkQueue(tmp_path, worker_id='crashed').claim('task')
+    claim_path = tmp_path / 'claimed' / 'task'
+    old = time.time() - 120.
+    os.utime(claim_path, (old, old))
+    # A worker that crashed while taking over left a fresh lock behind
+    lock_path = tmp_path / 'claimed' / 'task.takeover.{}.0'.format(
+        claim_path.stat().st_mtime_ns)
+    lock_path.write_text('taker')
+    assert not WorkQueue(tmp_path, stale_time=60.).claim('task')
+    os.utime(lock_path, (old, old))
+
+    workers = [WorkQueue(tmp_path, stale_time=60., worker_id=str(i))
+               for i in range(8)]
+    won = []
+    threads = [threading.Thread(target=lambda w=w: won.append(
+        w.worker_id) if w.claim('task') else None) for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(won) == 1
+    assert claim_path.read_text() == won[0]
+    assert workers[int(won[0])].heartbeat('task')
+
+
+def test_seed_tasks_follow_the_seed_output(tmp_path):
+    seed_dir = tmp_path / 'simulations' / 'ks1' / 's0'
+    seed_dir.mkdir(parents=True)
+    (seed_dir / 'sd_params.yaml').write_text('run_name: sd\n')
+    task_id = make_tree_tasks(tmp_path / 'simulations', False)[0][0]
+    assert parse_task_id(task_id) == ('seed', str(seed_dir))
+    (seed_dir / 'sd_data.h5').write_text('analysis output')
+    assert make_tree_tasks(tmp_path / 'simulations', False)[0][0] == task_id
+    (seed_dir / 'sd_fil.posit').write_text('new output')
+    assert make_tree_tasks(tmp_path / 'simulations', False)[0][0] != task_id
@@ -1,38 +1,60 @@
 # -*- coding: utf-8 -*-
 """Tests for `simcore_analysis` package."""
 
-import pytest
-import random
-
-from simcore_analysis import simcore_analysis
-
-
-@pytest.fixture
-def generate_numbers():
-    """Sample pytest fixture. Generates list of random integers.
-
-    See more at: http://doc.pytest.org/en/latest/fixture.html
-    """
-
-    return random.sample(range(100),10)
-
-
-def test_sum_numbers(generate_numbers):
-    """Sample test function for sum_numbers, using pytest fixture."""
-
-    our_result = simcore_analysis.sum_numbers(generate_numbers)
-    assert our_result == sum(generate_numbers)
-
-
-def test_max_number(generate_numbers):
-    """Sample test function for max_number, using pytest fixture."""
-
-    our_result = simcore_analysis.max_number(generate_numbers)
-    assert our_result == max(generate_numbers)
-
-
-# def test_max_number_bad(generate_numbers):
-#     """Sample test function that fails. Uncomment to see."""
-#
-#     our_result = simcore_analysis.max_number(generate_numbers)
-#     assert our_result == max(generate_numbers) + 1
+import h5py
+import numpy as np
+
+from simcore_analysis.simcore_analysis import (run_seed_analysis,
+                                               run_seed_scan_analysis,
+                                               get_code_files)
+from simcore_analysis.sc_synthetic import (write_synthetic_run,
+                                           write_synthetic_seed_scan)
+from simcore_analysis.sc_work_queue import work_dir
+
+
+def analyze_synthetic_seed(param_file):
+    with work_dir(param_file.parent):
+        run_seed_analysis(param_file.name)
+    return param_file.with_name('synthetic_data.h5')
+
+
+def test_seed_analysis_of_synthetic_run(tmp_path):
+    param_file = write_synthetic_run(tmp_path, n_frames=50, xl_density=.2)
+    with h5py.File(analyze_synthetic_seed(param_file), 'r') as h5_data:
+        assert h5_data['filament_data/filament_position'].shape == (50, 3, 2)
+        assert h5_data['xl_data/doubly_bound'].shape == (50, 2)
+        assert h5_data['analysis/xl_forces'].shape == (50, 3)
+        assert h5_data['optical_trap_data/ot/bead_position'].shape == (
+            50, 3, 2)
+        # Doubly bound heads are shifted so zero is the filament center
+        s_i = np.concatenate(h5_data['xl_data/doubly_bound'][:, 0])
+        assert np.all(np.abs(s_i) <= 20.)
+        np.testing.assert_array_equal(
+            h5_data['analysis/xl_zeroth_moment'][...],
+            [s.size for s in h5_data['xl_data/doubly_bound'][:, 1]])
+
+
+def test_seed_scan_of_synthetic_runs(tmp_path):
+    param_dir = tmp_path / 'ks10'
+    for param_file in write_synthetic_seed_scan(param_dir, 2, n_frames=50,
+                                                xl_density=.2):
+        analyze_synthetic_seed(param_file)
+    run_seed_scan_analysis(param_dir)
+    with h5py.File(param_dir / 'ks10.h5', 'r') as h5_scan:
+        assert h5_scan.attrs['n_seeds'] == 2
+        assert h5_scan['seed_data/xl_forces'].shape == (2, 50, 3)
+        assert h5_scan['time'].size == 50
+        # Averages accumulated seed by seed match the stacked seeds
+        forces = h5_scan['seed_data/xl_forces'][...]
+        np.testing.assert_allclose(h5_scan['xl_forces_mean'],
+                                   forces.mean(axis=0))
+        np.testing.assert_allclose(h5_scan['xl_forces_std'],
+                                   forces.std(axis=0))
+
+
+def test_seed_scan_code_files_follow_imports():
+    names = {f.name for f in get_code_files('sc_analyze_seed_scan.py')}
+    assert {'sc_analyze_seed_scan.py', 'sc_analyze_seed.py', 'sc_lazy.py',
+            'sc_prefetch.py', 'sc_equilibration.py', 'fp_steady_state.py',
+            'sc_helpers.py'} <= names
+    assert 'sc_graphs.py' not in names